@@ -0,0 +1,611 @@
+"""
+Assignment 4 – SIFT engine benchmark
+====================================
+
+Times the stages of ``SIFTFromScratch`` (see ``task2_sift.py``) with the
+reference per-pixel loop engines and with the NumPy engines, and checks that
+both paths agree (identical keypoints, descriptors equal up to float32
+rounding).  With ``--ann-report`` it instead sweeps the ``KDForestIndex``
+settings and reports matching recall and speed against the exact matcher.
+``--suite`` runs the regression benchmark: custom vs OpenCV SIFT over a sweep
+of resize widths and octave/scale settings, on the images and on synthetic
+warped copies with known homographies, appending one row per configuration
+to a results table.
+
+Typical usage (from the assignment4 folder):
+
+    python benchmark_sift.py --images ./images --resize-width 960
+    python benchmark_sift.py --images ./images --resize-width 0 --ann-report
+    python benchmark_sift.py --images ./images --suite --output ./output/bench.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from task2_sift import (
+    KDForestIndex,
+    Keypoint,
+    SIFTFromScratch,
+    StageProfiler,
+    keypoints_to_array,
+    load_image,
+    match_descriptors,
+    match_descriptors_indexed,
+    ransac_homography,
+    to_grayscale_float,
+)
+
+
+ENGINE_SETS = {
+    "loop": {
+        "extrema_engine": "loop",
+        "orientation_engine": "loop",
+        "descriptor_engine": "loop",
+    },
+    "vectorized": {
+        "extrema_engine": "vectorized",
+        "orientation_engine": "batched",
+        "descriptor_engine": "vectorized",
+    },
+}
+
+STAGES = ("pyramid", "extrema", "orientation", "descriptors")
+# Engines differ only by float32 summation order.
+DESCRIPTOR_TOLERANCE = 1e-5
+
+ANN_TREES = (1, 2, 4, 8, 16)
+ANN_LEAF_SIZES = (16, 32, 64)
+
+SUITE_STAGES = ("pyramid", "extrema", "orientation", "descriptors", "features", "match", "ransac")
+# Regression thresholds of --suite; a configuration outside them fails the run.
+SUITE_MIN_KEYPOINTS = 20
+SUITE_MAX_CORNER_ERROR = 3.0
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the loop vs vectorized SIFTFromScratch engines"
+    )
+    parser.add_argument(
+        "--images",
+        type=Path,
+        default=Path("images"),
+        help="Directory with the benchmark images (default: ./images)",
+    )
+    parser.add_argument(
+        "--pattern", type=str, default="*.JPG", help="Glob used to pick images"
+    )
+    parser.add_argument(
+        "--resize-width",
+        type=int,
+        default=960,
+        help="Width the images are resized to before running SIFT",
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=sorted(ENGINE_SETS),
+        default=["loop", "vectorized"],
+        help="Engine sets to benchmark (the first one is the reference)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Optional CSV file receiving one row per (image, engine set)",
+    )
+    parser.add_argument(
+        "--ann-report",
+        action="store_true",
+        help="Report k-d forest recall/speed vs the exact matcher instead",
+    )
+    parser.add_argument(
+        "--ratio-test",
+        type=float,
+        default=0.75,
+        help="Lowe ratio used for the --ann-report and --suite matching",
+    )
+    parser.add_argument(
+        "--suite",
+        action="store_true",
+        help="Run the custom vs OpenCV regression suite (appends to --output)",
+    )
+    parser.add_argument(
+        "--widths",
+        type=int,
+        nargs="+",
+        default=[480, 960, 1920],
+        help="Resize widths swept by --suite",
+    )
+    parser.add_argument(
+        "--octaves",
+        type=int,
+        nargs="+",
+        default=[4],
+        help="Custom SIFT octave counts swept by --suite",
+    )
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=[3],
+        help="Custom SIFT scales per octave swept by --suite",
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=2,
+        help="Synthetic warped copies (known homography) generated per image for --suite",
+    )
+    parser.add_argument(
+        "--warp-strength",
+        type=float,
+        default=0.08,
+        help="Maximum corner displacement of the synthetic warps, as a fraction of the size",
+    )
+    parser.add_argument(
+        "--subpixel",
+        choices=("on", "off", "both"),
+        default="both",
+        help="Custom SIFT sub-pixel refinement setting(s) swept by --suite",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the synthetic warps"
+    )
+    parser.add_argument(
+        "--min-keypoints",
+        type=int,
+        default=SUITE_MIN_KEYPOINTS,
+        help="--suite fails a configuration if any image yields fewer keypoints",
+    )
+    parser.add_argument(
+        "--max-corner-error",
+        type=float,
+        default=SUITE_MAX_CORNER_ERROR,
+        help="--suite fails a configuration whose median corner error (px) is larger",
+    )
+    return parser.parse_args(argv)
+
+
+def time_stages(
+    sift: SIFTFromScratch, image_gray: np.ndarray
+) -> Tuple[Dict[str, float], List[Keypoint], np.ndarray]:
+    """Run ``detect_and_compute`` stage by stage, timing each one."""
+    timings: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    gaussian_pyramid, dog_pyramid = sift._build_pyramids(image_gray)
+    timings["pyramid"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    keypoints = sift._find_scale_space_extrema(gaussian_pyramid, dog_pyramid)
+    timings["extrema"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    oriented = sift._assign_orientations(keypoints, gaussian_pyramid)
+    timings["orientation"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    descriptors = sift._compute_descriptors(oriented, gaussian_pyramid)
+    timings["descriptors"] = time.perf_counter() - start
+    return timings, oriented, descriptors
+
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict[str, object]]:
+    paths = sorted(args.images.glob(args.pattern))
+    if not paths:
+        raise FileNotFoundError(f"No input files matched {args.pattern} inside {args.images}")
+
+    rows: List[Dict[str, object]] = []
+    for path in paths:
+        gray = to_grayscale_float(load_image(path, args.resize_width))
+        reference: Tuple[List[Keypoint], np.ndarray] | None = None
+        for engine in args.engines:
+            sift = SIFTFromScratch(**ENGINE_SETS[engine])
+            timings, keypoints, descriptors = time_stages(sift, gray)
+            row: Dict[str, object] = {
+                "image": path.name,
+                "engines": engine,
+                "keypoints": len(keypoints),
+                **{f"{stage}_s": round(timings[stage], 4) for stage in STAGES},
+                "total_s": round(sum(timings.values()), 4),
+            }
+            if reference is None:
+                reference = (keypoints, descriptors)
+                # An empty reference would make every comparison vacuous.
+                row["same_keypoints"] = len(keypoints) > 0
+                row["max_descriptor_diff"] = 0.0
+            else:
+                ref_kps, ref_desc = reference
+                row["same_keypoints"] = len(keypoints) > 0 and keypoints == ref_kps
+                # Mismatched or empty descriptor arrays cannot be compared.
+                row["max_descriptor_diff"] = (
+                    float(np.abs(descriptors - ref_desc).max())
+                    if descriptors.shape == ref_desc.shape and descriptors.size
+                    else float("inf")
+                )
+            rows.append(row)
+            print(
+                f"[Bench] {path.name} [{engine}] keypoints={row['keypoints']} "
+                + " ".join(f"{stage}={timings[stage]:.3f}s" for stage in STAGES)
+                + f" total={row['total_s']:.3f}s"
+            )
+    return rows
+
+
+def engine_check_failures(rows: List[Dict[str, object]]) -> List[str]:
+    """Describe every row whose engine set disagrees with the reference.
+
+    A row with no keypoints counts as a failure: equal empty sets say nothing
+    about whether the engines agree.
+    """
+    failures = []
+    for row in rows:
+        if not row["keypoints"]:
+            failures.append(f"{row['image']} [{row['engines']}] found no keypoints")
+        elif not row["same_keypoints"]:
+            failures.append(
+                f"{row['image']} [{row['engines']}] keypoints differ from the reference"
+            )
+        elif row["max_descriptor_diff"] > DESCRIPTOR_TOLERANCE:
+            failures.append(
+                f"{row['image']} [{row['engines']}] descriptors differ from the "
+                f"reference by {row['max_descriptor_diff']:.2e}"
+            )
+    return failures
+
+
+def run_ann_report(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """Recall and speed of ``KDForestIndex`` settings vs exact matching.
+
+    OpenCV SIFT descriptors of consecutive images are used so the report has
+    realistic descriptor counts.  Recall is the fraction of exact ratio-test
+    matches that the approximate matcher also returns.
+    """
+    paths = sorted(args.images.glob(args.pattern))
+    if len(paths) < 2:
+        raise FileNotFoundError(f"Need two images matching {args.pattern} inside {args.images}")
+    sift = cv2.SIFT_create()
+    descriptors = []
+    for path in paths:
+        gray = cv2.cvtColor(load_image(path, args.resize_width), cv2.COLOR_BGR2GRAY)
+        descriptors.append(sift.detectAndCompute(gray, None)[1])
+
+    rows: List[Dict[str, object]] = []
+    for (name_a, desc_a), (name_b, desc_b) in zip(
+        zip([p.name for p in paths], descriptors),
+        zip([p.name for p in paths[1:]], descriptors[1:]),
+    ):
+        start = time.perf_counter()
+        exact = match_descriptors(desc_a, desc_b, args.ratio_test)
+        exact_s = time.perf_counter() - start
+        exact_pairs = {(m.idx_a, m.idx_b) for m in exact}
+        print(
+            f"[Bench] {name_a} -> {name_b}: {len(desc_a)} x {len(desc_b)} descriptors, "
+            f"exact matches={len(exact)} in {exact_s:.3f}s"
+        )
+        for n_trees in ANN_TREES:
+            for leaf_size in ANN_LEAF_SIZES:
+                start = time.perf_counter()
+                index = KDForestIndex(desc_b, n_trees=n_trees, leaf_size=leaf_size)
+                build_s = time.perf_counter() - start
+                start = time.perf_counter()
+                approx = match_descriptors_indexed(desc_a, index, args.ratio_test)
+                query_s = time.perf_counter() - start
+                found = {(m.idx_a, m.idx_b) for m in approx}
+                recall = len(found & exact_pairs) / max(len(exact_pairs), 1)
+                precision = len(found & exact_pairs) / max(len(found), 1)
+                rows.append(
+                    {
+                        "pair": f"{name_a}->{name_b}",
+                        "trees": n_trees,
+                        "leaf_size": leaf_size,
+                        "build_s": round(build_s, 4),
+                        "query_s": round(query_s, 4),
+                        "exact_s": round(exact_s, 4),
+                        "speedup": round(exact_s / max(query_s, 1e-9), 2),
+                        "matches": len(approx),
+                        "recall": round(recall, 4),
+                        "precision": round(precision, 4),
+                    }
+                )
+                print(
+                    f"[Bench]   trees={n_trees:<2} leaf={leaf_size:<3} build={build_s:.3f}s "
+                    f"query={query_s:.3f}s recall={recall:.3f} precision={precision:.3f}"
+                )
+    return rows
+
+
+def synthetic_homography(
+    width: int, height: int, strength: float, rng: np.random.Generator
+) -> np.ndarray:
+    """Random perspective warp moving each image corner by up to ``strength``."""
+    corners = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+    jitter = rng.uniform(-strength, strength, size=(4, 2)) * np.float32([width, height])
+    return cv2.getPerspectiveTransform(corners, (corners + jitter).astype(np.float32))
+
+
+def corner_error(H_est: np.ndarray | None, H_true: np.ndarray, width: int, height: int) -> float:
+    """Mean distance (px) between the image corners mapped by both homographies."""
+    if H_est is None:
+        return float("nan")
+    corners = np.float32([[[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]]])
+    est = cv2.perspectiveTransform(corners, np.asarray(H_est, dtype=np.float64))
+    true = cv2.perspectiveTransform(corners, H_true)
+    return float(np.linalg.norm(est - true, axis=2).mean())
+
+
+def _suite_features(
+    pipeline: str, sift: SIFTFromScratch | None, gray: np.ndarray, profiler: StageProfiler
+) -> Tuple[np.ndarray, np.ndarray]:
+    if pipeline == "custom":
+        keypoints, descriptors = sift.detect_and_compute(gray)
+        return keypoints_to_array(keypoints), descriptors
+    with profiler.stage("features") as record:
+        keypoints, descriptors = cv2.SIFT_create().detectAndCompute(
+            (gray * 255).astype(np.uint8), None
+        )
+        record["items"] = len(keypoints)
+    if descriptors is None:
+        descriptors = np.zeros((0, 128), dtype=np.float32)
+    points = np.array([kp.pt for kp in keypoints], dtype=np.float32).reshape(-1, 2)
+    return points, descriptors
+
+
+SuiteConfig = Tuple[str, int, "int | None", "int | None", "bool | None"]
+
+
+def _suite_configs(args: argparse.Namespace) -> List[SuiteConfig]:
+    """(pipeline, width, octaves, scales, subpixel); OpenCV ignores the last three."""
+    subpixel_modes = {"on": [True], "off": [False], "both": [False, True]}[args.subpixel]
+    configs: List[SuiteConfig] = []
+    for width in args.widths:
+        for octaves in args.octaves:
+            for scales in args.scales:
+                for subpixel in subpixel_modes:
+                    configs.append(("custom", width, octaves, scales, subpixel))
+        configs.append(("opencv", width, None, None, None))
+    return configs
+
+
+def run_suite(args: argparse.Namespace) -> List[Dict[str, object]]:
+    """Custom vs OpenCV SIFT regression suite.
+
+    Each image is paired with ``--synthetic`` warped copies of itself, so the
+    ground-truth homography is known.  Per configuration the suite reports
+    extraction throughput, mean per-stage latency, the tracemalloc peak of
+    the Python/NumPy side, the homography corner error after RANSAC and the
+    number of adaptive RANSAC iterations (capped at 2000) that were needed.
+    """
+    paths = sorted(args.images.glob(args.pattern))
+    if not paths:
+        raise FileNotFoundError(f"No input files matched {args.pattern} inside {args.images}")
+    run_id = datetime.datetime.now().isoformat(timespec="seconds")
+    revision = _git_revision()
+
+    rows: List[Dict[str, object]] = []
+    for pipeline, width, octaves, scales, subpixel in _suite_configs(args):
+        rng = np.random.default_rng(args.seed)
+        profiler = StageProfiler(trace_memory=True)
+        sift = None
+        if pipeline == "custom":
+            sift = SIFTFromScratch(num_octaves=octaves, num_scales=scales, subpixel=subpixel)
+            sift.profiler = profiler
+        extracted = 0
+        extract_s = 0.0
+        keypoint_counts: List[int] = []
+        errors: List[float] = []
+        inliers: List[int] = []
+        iterations: List[int] = []
+        for path in paths:
+            gray = to_grayscale_float(load_image(path, width))
+            height, w = gray.shape
+            start = time.perf_counter()
+            pts_a, desc_a = _suite_features(pipeline, sift, gray, profiler)
+            extract_s += time.perf_counter() - start
+            extracted += 1
+            keypoint_counts.append(len(pts_a))
+            for _ in range(args.synthetic):
+                H_true = synthetic_homography(w, height, args.warp_strength, rng)
+                warped = cv2.warpPerspective(
+                    gray, H_true, (w, height), flags=cv2.INTER_LINEAR,
+                    borderMode=cv2.BORDER_REFLECT,
+                )
+                start = time.perf_counter()
+                pts_b, desc_b = _suite_features(pipeline, sift, warped, profiler)
+                extract_s += time.perf_counter() - start
+                extracted += 1
+                keypoint_counts.append(len(pts_b))
+                with profiler.stage("match") as record:
+                    matches = match_descriptors(desc_a, desc_b, args.ratio_test)
+                    record["items"] = len(matches)
+                stats: Dict[str, object] = {}
+                with profiler.stage("ransac") as record:
+                    H, pair_inliers = ransac_homography(
+                        pts_a, pts_b, matches, 2000, 3.0, adaptive=True, refine="lsq",
+                        stats=stats,
+                    )
+                    record["items"] = len(pair_inliers)
+                errors.append(corner_error(H, H_true, w, height))
+                inliers.append(len(pair_inliers))
+                iterations.append(int(stats["iterations"]))
+        profiler.close()
+
+        counts: Dict[str, int] = {}
+        for record in profiler.records:
+            counts[record["stage"]] = counts.get(record["stage"], 0) + 1
+        totals = profiler.totals()
+        finite = [e for e in errors if np.isfinite(e)]
+        row: Dict[str, object] = {
+            "run": run_id,
+            "revision": revision,
+            "pipeline": pipeline,
+            "width": width,
+            "octaves": octaves if octaves is not None else "",
+            "scales": scales if scales is not None else "",
+            "subpixel": subpixel if subpixel is not None else "",
+            "images": extracted,
+            "images_per_s": round(extracted / max(extract_s, 1e-9), 3),
+            "min_keypoints": min(keypoint_counts),
+            "mean_keypoints": round(float(np.mean(keypoint_counts)), 1),
+            **{
+                f"{stage}_ms": round(1000 * totals[stage] / counts[stage], 3)
+                if stage in totals
+                else ""
+                for stage in SUITE_STAGES
+            },
+            "peak_mb": round(
+                max((r["peak_bytes"] or 0) for r in profiler.records) / 2**20, 2
+            ),
+            "pairs": len(errors),
+            "solved": len(finite),
+            "mean_inliers": round(float(np.mean(inliers)), 1) if inliers else 0.0,
+            "mean_ransac_iters": round(float(np.mean(iterations)), 1) if iterations else 0.0,
+            "median_corner_err_px": round(float(np.median(finite)), 3) if finite else "",
+            "max_corner_err_px": round(float(np.max(finite)), 3) if finite else "",
+        }
+        row["status"] = "; ".join(suite_failures(row, args)) or "ok"
+        rows.append(row)
+        print(
+            f"[Bench] {pipeline:<6} width={width:<5} octaves={row['octaves']!s:<2} "
+            f"scales={row['scales']!s:<2} subpixel={row['subpixel']!s:<5} "
+            f"{row['images_per_s']:.2f} img/s keypoints>={row['min_keypoints']} "
+            f"peak={row['peak_mb']:.1f}MB solved={row['solved']}/{row['pairs']} "
+            f"median err={row['median_corner_err_px']} "
+            f"ransac iters={row['mean_ransac_iters']} [{row['status']}]"
+        )
+    report_subpixel_gain(rows)
+    return rows
+
+
+def suite_failures(row: Dict[str, object], args: argparse.Namespace) -> List[str]:
+    """Reasons a suite row misses the regression thresholds (empty when it passes)."""
+    failures = []
+    if row["min_keypoints"] < args.min_keypoints:
+        failures.append(f"{row['min_keypoints']} keypoints < {args.min_keypoints}")
+    if row["solved"] < row["pairs"]:
+        failures.append(f"solved {row['solved']}/{row['pairs']} pairs")
+    error = row["median_corner_err_px"]
+    if error != "" and error > args.max_corner_error:
+        failures.append(f"median corner error {error}px > {args.max_corner_error}px")
+    return failures
+
+
+def report_subpixel_gain(rows: List[Dict[str, object]]) -> None:
+    """Print corner error and RANSAC iterations with vs without sub-pixel refinement."""
+    for on in rows:
+        if on["subpixel"] is not True:
+            continue
+        off = next(
+            (
+                r for r in rows
+                if r["subpixel"] is False
+                and (r["width"], r["octaves"], r["scales"]) == (on["width"], on["octaves"], on["scales"])
+            ),
+            None,
+        )
+        if off is None:
+            continue
+        print(
+            f"[Bench] sub-pixel width={on['width']} octaves={on['octaves']} scales={on['scales']}: "
+            f"median corner error {off['median_corner_err_px'] or '-'} -> "
+            f"{on['median_corner_err_px'] or '-'} px, RANSAC iterations "
+            f"{off['mean_ransac_iters']} -> {on['mean_ransac_iters']}"
+        )
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def append_csv(rows: List[Dict[str, object]], path: Path) -> None:
+    """Append ``rows`` to a results table, widening its header if needed."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    existing: List[Dict[str, object]] = []
+    fieldnames: List[str] = []
+    if path.exists():
+        with path.open(newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fieldnames = list(reader.fieldnames or [])
+            existing = list(reader)
+    for row in rows:
+        fieldnames += [key for key in row if key not in fieldnames]
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval="")
+        writer.writeheader()
+        writer.writerows(existing + rows)
+    print(f"[Bench] {len(rows)} rows appended to {path.resolve()}")
+
+
+def write_csv(rows: List[Dict[str, object]], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"[Bench] Results written to {path.resolve()}")
+
+
+def main(argv: Sequence[str]) -> int:
+    args = parse_args(argv)
+    if args.suite:
+        rows = run_suite(args)
+        if args.output and rows:
+            append_csv(rows, args.output)
+        failed = [row for row in rows if row["status"] != "ok"]
+        for row in failed:
+            print(
+                f"[Bench] Suite check failed: {row['pipeline']} width={row['width']} "
+                f"octaves={row['octaves']} scales={row['scales']} "
+                f"subpixel={row['subpixel']}: {row['status']}"
+            )
+        return 1 if failed else 0
+    if args.ann_report:
+        rows = run_ann_report(args)
+        if args.output and rows:
+            write_csv(rows, args.output)
+        return 0
+
+    rows = run_benchmark(args)
+    failures = engine_check_failures(rows)
+
+    reference = args.engines[0]
+    for row in rows:
+        if row["engines"] == reference:
+            continue
+        ref_row = next(
+            r for r in rows if r["image"] == row["image"] and r["engines"] == reference
+        )
+        speedup = ref_row["total_s"] / max(row["total_s"], 1e-9)
+        print(
+            f"[Bench] {row['image']}: {row['engines']} is {speedup:.1f}x faster than "
+            f"{reference} (same keypoints: {row['same_keypoints']}, "
+            f"max descriptor diff: {row['max_descriptor_diff']:.2e})"
+        )
+
+    if args.output:
+        write_csv(rows, args.output)
+    for failure in failures:
+        print(f"[Bench] Engine check failed: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
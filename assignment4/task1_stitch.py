@@ -15,6 +15,15 @@ Typical usage (from the repository root):
         --reference ./comparisons/mobi_panaroma.JPG \\
         --comparison-output ./output/task1_vs_mobi.jpg
 
+Stitching runs in two stages, both built from the ``cv2.detail`` classes
+the Stitcher uses internally: registration (feature finding, matching and
+camera estimation, as ``Stitcher.estimateTransform``) and compositing
+(warping, exposure compensation, seam finding and blending, as
+``Stitcher.composePanorama``).  With ``--registration-cache DIR`` the
+cameras and the pairwise matches are stored on disk keyed on the input file
+hashes, so re-composing at another resolution or with another exposure
+strategy skips registration entirely.
+
 Requirements:
     - Python 3.9+
     - OpenCV with the contrib stitching module
@@ -24,13 +33,61 @@ Requirements:
 from __future__ import annotations
 
 import argparse
+import dataclasses
+import hashlib
+import json
+import math
+import os
 import sys
+import time
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Sequence, Tuple
 
 import cv2
 import numpy as np
 
+# Bump when the cached registration layout changes.
+REGISTRATION_CACHE_VERSION = 2
+# Seam estimation resolution (megapixels), the Stitcher's default.
+SEAM_MEGAPIX = 0.1
+# Blend width as a percentage of the panorama size (Stitcher default).
+BLEND_STRENGTH = 5.0
+# Registration resolution (megapixels) and match confidence thresholds
+# matching the Stitcher's defaults; used by the incremental stitcher.
+REGISTRATION_MEGAPIX = 0.6
+MATCH_CONFIDENCE = 0.3
+PANO_CONFIDENCE = 1.0
+MATCH_GRAPHS = ("full", "sequential")
+# Incremental stitcher: confident pairs collected before the focal is fixed,
+# and the plausible focal range as multiples of the frame's width + height.
+INCREMENTAL_FOCAL_PAIRS = 3
+FOCAL_RANGE = (0.3, 3.0)
+# Decode depth of the --tiled-output frame stream: the next frame decodes
+# while the current one is composited, so two frames are resident at most.
+TILED_PREFETCH = 2
+
+# Reduced-resolution decode flags, keyed on (colour flag, downscale factor).
+REDUCED_DECODE_FLAGS = {
+    (cv2.IMREAD_COLOR, 2): cv2.IMREAD_REDUCED_COLOR_2,
+    (cv2.IMREAD_COLOR, 4): cv2.IMREAD_REDUCED_COLOR_4,
+    (cv2.IMREAD_COLOR, 8): cv2.IMREAD_REDUCED_COLOR_8,
+    (cv2.IMREAD_GRAYSCALE, 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (cv2.IMREAD_GRAYSCALE, 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (cv2.IMREAD_GRAYSCALE, 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...).
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+EXPOSURE_COMPENSATORS = {
+    "none": cv2.detail.ExposureCompensator_NO,
+    "gain": cv2.detail.ExposureCompensator_GAIN,
+    "gain_blocks": cv2.detail.ExposureCompensator_GAIN_BLOCKS,
+    "channel": cv2.detail.ExposureCompensator_CHANNELS,
+    "channel_blocks": cv2.detail.ExposureCompensator_CHANNELS_BLOCKS,
+}
+
 
 def parse_args(argv: Sequence[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -63,6 +120,20 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
             "Set to 0 to keep the original resolution."
         ),
     )
+    parser.add_argument(
+        "--load-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Threads used to decode and resize frames (default: CPU count).",
+    )
+    parser.add_argument(
+        "--no-reduced-decode",
+        action="store_true",
+        help=(
+            "Always decode JPEGs at full resolution. By default frames are decoded at "
+            "1/2, 1/4 or 1/8 scale when that still covers --resize-max-width."
+        ),
+    )
     parser.add_argument(
         "--reference",
         type=Path,
@@ -79,10 +150,100 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         "--exposure-compensation",
         type=str,
         default="gain_blocks",
-        choices=["none", "gain", "gain_blocks", "channel", "channel_blocks"],
-        help="Exposure compensation strategy passed to the Stitcher.",
+        choices=list(EXPOSURE_COMPENSATORS),
+        help="Exposure compensation strategy used when compositing.",
+    )
+    parser.add_argument(
+        "--compose-megapix",
+        type=float,
+        default=-1.0,
+        help=(
+            "Compositing resolution in megapixels per frame. "
+            "Non-positive values compose at the loaded resolution (default)."
+        ),
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--registration-megapix",
+        type=float,
+        default=REGISTRATION_MEGAPIX,
+        help="Resolution (megapixels) features are found at during registration (default: 0.6).",
+    )
+    parser.add_argument(
+        "--full-res-compose",
+        action="store_true",
+        help=(
+            "Register (and estimate seams) on frames loaded at --resize-max-width, then "
+            "compose from the original files, streamed one at a time."
+        ),
+    )
+    parser.add_argument(
+        "--registration-cache",
+        type=Path,
+        default=None,
+        help=(
+            "Directory that stores registration results keyed on the input file hashes. "
+            "Re-running with the same frames skips feature finding and camera estimation."
+        ),
+    )
+    parser.add_argument(
+        "--tiled-output",
+        type=Path,
+        default=None,
+        help=(
+            "Composite out of core into this directory (tiles/, index.json and a "
+            "memory-mapped panorama.npy) instead of writing --output."
+        ),
+    )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=1024,
+        help="Tile edge in pixels for --tiled-output (default: 1024).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Stream frames one at a time into an IncrementalStitcher (registration "
+            "against the previous --neighbours frames only) instead of stitching in one shot."
+        ),
+    )
+    parser.add_argument(
+        "--neighbours",
+        type=int,
+        default=2,
+        help=(
+            "Neighbouring frames each frame is matched against with --incremental or "
+            "--match-graph sequential (default: 2)."
+        ),
+    )
+    parser.add_argument(
+        "--match-graph",
+        type=str,
+        default="full",
+        choices=MATCH_GRAPHS,
+        help=(
+            "Frame pairs matched during registration: every pair (the Stitcher default) "
+            "or only frames within --neighbours of each other in capture order."
+        ),
+    )
+    parser.add_argument(
+        "--loop-closure",
+        action="store_true",
+        help=(
+            "With --match-graph sequential, also match the last frames against the "
+            "first ones (360° sweeps)."
+        ),
+    )
+    parser.add_argument(
+        "--compare-match-graph",
+        action="store_true",
+        help="With --match-graph sequential, also time matching on the full graph and report both.",
+    )
+    args = parser.parse_args(argv)
+    if args.incremental and args.tiled_output:
+        parser.error("--tiled-output is not supported with --incremental")
+    return args
 
 
 def collect_image_paths(folder: Path, pattern: str) -> List[Path]:
@@ -94,23 +255,128 @@ def collect_image_paths(folder: Path, pattern: str) -> List[Path]:
     return paths
 
 
-def load_images(
-    paths: Iterable[Path], max_width: int = 0, color_flag: int = cv2.IMREAD_COLOR
-) -> List[np.ndarray]:
-    images: List[np.ndarray] = []
-    for path in paths:
-        img = cv2.imread(str(path), color_flag)
+def jpeg_size(path: Path) -> Tuple[int, int] | None:
+    """``(width, height)`` from a JPEG's start-of-frame header, without decoding.
+
+    Returns None for files that are not JPEGs.  The size is the stored one,
+    before any EXIF orientation is applied.
+    """
+    with path.open("rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            return None
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            while marker[1] == 0xFF:  # fill bytes
+                marker = marker[1:] + f.read(1)
+            code = marker[1]
+            if code == 0x01 or 0xD0 <= code <= 0xD8:  # markers without a payload
+                continue
+            length = int.from_bytes(f.read(2), "big")
+            if code in JPEG_SOF_MARKERS:
+                header = f.read(5)
+                return int.from_bytes(header[3:5], "big"), int.from_bytes(header[1:3], "big")
+            if code == 0xD9 or length < 2:
+                return None
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def reduced_decode_flag(path: Path, max_width: int, color_flag: int = cv2.IMREAD_COLOR) -> int:
+    """Largest ``IMREAD_REDUCED_*`` flag whose output is still ``max_width`` wide.
+
+    The check uses the shorter stored side, so it holds whatever the EXIF
+    orientation; ``color_flag`` is returned when no reduction applies.
+    """
+    if not max_width:
+        return color_flag
+    size = jpeg_size(path)
+    if size is None:
+        return color_flag
+    for factor in (8, 4, 2):
+        flag = REDUCED_DECODE_FLAGS.get((color_flag, factor))
+        if flag is not None and -(-min(size) // factor) >= max_width:
+            return flag
+    return color_flag
+
+
+def load_image(
+    path: Path,
+    max_width: int = 0,
+    color_flag: int = cv2.IMREAD_COLOR,
+    reduced_decode: bool = False,
+) -> np.ndarray:
+    flag = reduced_decode_flag(path, max_width, color_flag) if reduced_decode else color_flag
+    img = cv2.imread(str(path), flag)
+    if img is None:
+        raise ValueError(f"Failed to read image: {path}")
+    if max_width and img.shape[1] > max_width:
+        scale = max_width / img.shape[1]
+        new_size = (max_width, int(img.shape[0] * scale))
+        img = cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def decoded_size(path: Path, like: Tuple[int, int]) -> Tuple[int, int]:
+    """Full-resolution ``(width, height)`` of ``path`` as ``cv2.imread`` returns it.
+
+    JPEG sizes come from the header; the stored size is swapped when its
+    orientation differs from ``like`` (a decoded proxy of the same file),
+    which accounts for EXIF rotation.  Other formats are decoded.
+    """
+    size = jpeg_size(path)
+    if size is None:
+        img = cv2.imread(str(path), cv2.IMREAD_COLOR)
         if img is None:
             raise ValueError(f"Failed to read image: {path}")
-        if max_width and img.shape[1] > max_width:
-            scale = max_width / img.shape[1]
-            new_size = (max_width, int(img.shape[0] * scale))
-            img = cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
-        images.append(img)
-    return images
+        return img.shape[1], img.shape[0]
+    width, height = size
+    if (width >= height) != (like[0] >= like[1]):
+        width, height = height, width
+    return width, height
+
+
+def iter_images(
+    paths: Iterable[Path],
+    max_width: int = 0,
+    color_flag: int = cv2.IMREAD_COLOR,
+    workers: int = 1,
+    reduced_decode: bool = False,
+    prefetch: int = 0,
+) -> Iterator[np.ndarray]:
+    """Decode and resize frames in a thread pool, yielding them in input order.
+
+    OpenCV releases the GIL while decoding and resizing, so the threads run
+    in parallel.  At most ``prefetch`` frames (default ``2 * workers``) are
+    decoded or queued at a time, so memory is bounded by that depth rather
+    than the number of frames; the consumer's current frame comes on top.
+    """
+    if workers <= 1:
+        for path in paths:
+            yield load_image(path, max_width, color_flag, reduced_decode)
+        return
+    depth = prefetch if prefetch > 0 else 2 * workers
+    with ThreadPoolExecutor(max_workers=min(workers, depth)) as pool:
+        pending: Deque[Future] = deque()
+        for path in paths:
+            pending.append(pool.submit(load_image, path, max_width, color_flag, reduced_decode))
+            if len(pending) >= depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
-def create_stitcher() -> cv2.Stitcher:
+def load_images(
+    paths: Iterable[Path],
+    max_width: int = 0,
+    color_flag: int = cv2.IMREAD_COLOR,
+    workers: int = 1,
+    reduced_decode: bool = False,
+) -> List[np.ndarray]:
+    return list(iter_images(paths, max_width, color_flag, workers, reduced_decode))
+
+
+def create_stitcher(registration_megapix: float = REGISTRATION_MEGAPIX) -> cv2.Stitcher:
     mode = cv2.Stitcher_PANORAMA
     if hasattr(cv2, "Stitcher_create"):
         stitcher = cv2.Stitcher_create(mode)
@@ -118,49 +384,1009 @@ def create_stitcher() -> cv2.Stitcher:
         stitcher = cv2.createStitcher(mode)
     else:
         raise RuntimeError("This version of OpenCV does not expose the Stitcher API.")
+    if hasattr(stitcher, "setRegistrationResol"):
+        stitcher.setRegistrationResol(registration_megapix)
     return stitcher
 
 
-def set_exposure_compensation(stitcher: cv2.Stitcher, strategy: str) -> None:
+@dataclasses.dataclass
+class Registration:
+    """Output of the registration stage.
+
+    ``cameras`` are expressed at the Stitcher's work scale for the frames of
+    ``component`` (indices into the input list, the frames kept by the
+    confidence threshold).  ``frame_sizes`` holds the ``(width, height)`` of
+    every input frame at registration time, so the cameras can be rescaled
+    to whatever resolution the frames are composed at.  ``pairs`` is the
+    match graph: one entry per matched frame pair (``src < dst``, input
+    indices) with its confidence, inlier count and homography at the work
+    scale.
     """
-    Attempt to set exposure compensation on the stitcher.
-    
-    Note: The high-level cv2.Stitcher API doesn't expose setExposureCompensator.
-    This function gracefully skips exposure compensation if the method isn't available.
-    The stitcher will use its default exposure compensation settings.
+
+    cameras: List[cv2.detail.CameraParams]
+    component: List[int]
+    work_scale: float
+    frame_sizes: List[Tuple[int, int]]
+    pairs: List[Dict[str, object]] = dataclasses.field(default_factory=list)
+
+    @property
+    def warped_image_scale(self) -> float:
+        """Median focal length at the work scale (the Stitcher's warp scale)."""
+        return float(np.median([camera.focal for camera in self.cameras]))
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "version": REGISTRATION_CACHE_VERSION,
+            "component": list(self.component),
+            "work_scale": self.work_scale,
+            "frame_sizes": [list(size) for size in self.frame_sizes],
+            "cameras": [
+                {
+                    "focal": camera.focal,
+                    "aspect": camera.aspect,
+                    "ppx": camera.ppx,
+                    "ppy": camera.ppy,
+                    "R": np.asarray(camera.R, dtype=np.float64).tolist(),
+                    "t": np.asarray(camera.t, dtype=np.float64).ravel().tolist(),
+                }
+                for camera in self.cameras
+            ],
+            "pairs": self.pairs,
+        }
+
+    @classmethod
+    def from_json(cls, payload: Dict[str, object]) -> "Registration":
+        cameras = []
+        for entry in payload["cameras"]:
+            camera = cv2.detail.CameraParams()
+            camera.focal = entry["focal"]
+            camera.aspect = entry["aspect"]
+            camera.ppx = entry["ppx"]
+            camera.ppy = entry["ppy"]
+            camera.R = np.array(entry["R"], dtype=np.float32)
+            camera.t = np.array(entry["t"], dtype=np.float64).reshape(3, 1)
+            cameras.append(camera)
+        return cls(
+            cameras=cameras,
+            component=[int(idx) for idx in payload["component"]],
+            work_scale=float(payload["work_scale"]),
+            frame_sizes=[(int(w), int(h)) for w, h in payload["frame_sizes"]],
+            pairs=list(payload["pairs"]),
+        )
+
+
+def register_images(
+    images: Sequence[np.ndarray], registration_megapix: float = REGISTRATION_MEGAPIX
+) -> Registration:
+    """Registration stage: features, pairwise matching and camera estimation.
+
+    The frames are downsampled to ``registration_megapix`` before finding
+    features, so ``images`` can themselves be low-resolution proxies of the
+    frames that are composed later.  Every pair of frames is matched; see
+    :func:`_register` for the pipeline.
     """
-    # Check if the method exists (it won't on the high-level Stitcher API)
-    if not hasattr(stitcher, "setExposureCompensator"):
-        # High-level API doesn't support this - use default compensation
-        return
-    if not hasattr(cv2, "detail") or not hasattr(cv2.detail, "ExposureCompensator"):
-        return
-    compensator_map = {
-        "none": cv2.detail.ExposureCompensator_NO,
-        "gain": cv2.detail.ExposureCompensator_GAIN,
-        "gain_blocks": cv2.detail.ExposureCompensator_GAIN_BLOCKS,
-        "channel": cv2.detail.ExposureCompensator_CHANNELS,
-        "channel_blocks": cv2.detail.ExposureCompensator_CHANNELS_BLOCKS,
+    registration, _ = _register(images, None, registration_megapix)
+    return registration
+
+
+def sequential_match_mask(
+    num_images: int, neighbours: int, loop_closure: bool = False
+) -> np.ndarray:
+    """Upper-triangular pair mask linking each frame to its next ``neighbours`` frames.
+
+    With ``loop_closure`` the window wraps around, so the last frames are
+    also matched against the first ones.
+    """
+    mask = np.zeros((num_images, num_images), dtype=np.uint8)
+    for i in range(num_images):
+        for step in range(1, neighbours + 1):
+            j = i + step
+            if loop_closure:
+                j %= num_images
+            elif j >= num_images:
+                break
+            if i != j:
+                mask[min(i, j), max(i, j)] = 1
+    return mask
+
+
+def _match_pairs(
+    features: Sequence[cv2.detail.ImageFeatures], mask: np.ndarray | None = None
+) -> Tuple[List[cv2.detail.MatchesInfo], float]:
+    """Pairwise matches (all pairs, or those set in ``mask``) and the matching time."""
+    matcher = cv2.detail_BestOf2NearestMatcher(False, MATCH_CONFIDENCE)
+    start = time.perf_counter()
+    if mask is None:
+        pairwise = matcher.apply2(features)
+    else:
+        pairwise = matcher.apply2(features, mask)
+    seconds = time.perf_counter() - start
+    matcher.collectGarbage()
+    return list(pairwise), seconds
+
+
+def _matched_pairs(
+    pairwise: Sequence[cv2.detail.MatchesInfo], indices: Sequence[int]
+) -> List[Dict[str, object]]:
+    """JSON-ready match graph: pairs with any confidence, as input indices."""
+    pairs = []
+    for info in pairwise:
+        if info.src_img_idx >= info.dst_img_idx or info.confidence <= 0:
+            continue
+        pairs.append(
+            {
+                "src": int(indices[info.src_img_idx]),
+                "dst": int(indices[info.dst_img_idx]),
+                "confidence": float(info.confidence),
+                "inliers": int(info.num_inliers),
+                "H": np.asarray(info.H, dtype=np.float64).tolist(),
+            }
+        )
+    return pairs
+
+
+def _register(
+    images: Sequence[np.ndarray],
+    mask: np.ndarray | None = None,
+    registration_megapix: float = REGISTRATION_MEGAPIX,
+    compare_full: bool = False,
+) -> Tuple[Registration, Dict[str, float]]:
+    """Registration with the ``cv2.detail`` classes over the pairs set in ``mask``.
+
+    Mirrors the Stitcher's registration (ORB features at
+    ``registration_megapix``, best-of-2-nearest matching, homography-based
+    initialisation, ray bundle adjustment and horizontal wave correction) and
+    gives the same cameras as ``Stitcher.estimateTransform``; the Python
+    Stitcher does not expose its pairwise matches, which the registration
+    keeps.  ``mask`` is an upper-triangular pair mask (None matches every
+    pair).
+
+    Returns the registration and its stats: matching time, matched pairs
+    and, with ``compare_full``, the time needed to match the full graph of
+    the same features.
+    """
+    if len(images) < 2:
+        raise ValueError("Need at least two images to perform stitching.")
+    area = images[0].shape[0] * images[0].shape[1]
+    work_scale = min(1.0, math.sqrt(registration_megapix * 1e6 / area))
+    finder = cv2.ORB_create()
+    features = []
+    for idx, image in enumerate(images):
+        small = cv2.resize(
+            image, None, fx=work_scale, fy=work_scale, interpolation=cv2.INTER_LINEAR_EXACT
+        )
+        feature = cv2.detail.computeImageFeatures2(finder, small)
+        feature.img_idx = idx
+        features.append(feature)
+
+    pairwise, match_seconds = _match_pairs(features, mask)
+    full_pairs = len(images) * (len(images) - 1) // 2
+    stats = {
+        "match_seconds": match_seconds,
+        "pairs": full_pairs if mask is None else int(mask.sum()),
     }
-    stitcher.setExposureCompensator(cv2.detail.ExposureCompensator_createDefault(
-        compensator_map[strategy]
-    ))
+    if compare_full:
+        _, stats["full_match_seconds"] = _match_pairs(features)
+        stats["full_pairs"] = full_pairs
+    pairs = _matched_pairs(pairwise, range(len(images)))
 
+    kept = cv2.detail.leaveBiggestComponent(features, pairwise, PANO_CONFIDENCE)
+    component = [int(idx) for idx in np.ravel(kept)]
+    if len(component) < 2:
+        raise RuntimeError("Registration failed: no two frames match with enough confidence")
+    if len(component) < len(images):
+        # The estimators expect matches indexed within the kept frames.
+        features = [features[idx] for idx in component]
+        for new_idx, feature in enumerate(features):
+            feature.img_idx = new_idx
+        if mask is not None:
+            mask = mask[np.ix_(component, component)]
+        pairwise, _ = _match_pairs(features, mask)
 
-def stitch_images(
+    ok, cameras = cv2.detail_HomographyBasedEstimator().apply(features, pairwise, None)
+    if not ok:
+        raise RuntimeError("Registration failed: homography-based camera estimation")
+    for camera in cameras:
+        camera.R = camera.R.astype(np.float32)
+    adjuster = cv2.detail_BundleAdjusterRay()
+    adjuster.setConfThresh(PANO_CONFIDENCE)
+    ok, cameras = adjuster.apply(features, pairwise, cameras)
+    if not ok:
+        raise RuntimeError("Registration failed: bundle adjustment")
+    rotations = cv2.detail.waveCorrect(
+        [np.copy(camera.R) for camera in cameras], cv2.detail.WAVE_CORRECT_HORIZ
+    )
+    for camera, rotation in zip(cameras, rotations):
+        camera.R = rotation
+    registration = Registration(
+        cameras=list(cameras),
+        component=component,
+        work_scale=work_scale,
+        frame_sizes=[(img.shape[1], img.shape[0]) for img in images],
+        pairs=pairs,
+    )
+    return registration, stats
+
+
+def register_images_sequential(
+    images: Sequence[np.ndarray],
+    neighbours: int = 2,
+    loop_closure: bool = False,
+    registration_megapix: float = REGISTRATION_MEGAPIX,
+    compare_full: bool = False,
+) -> Tuple[Registration, Dict[str, float]]:
+    """Registration that only matches frames close to each other in capture order.
+
+    Runs :func:`_register` on the pairs of :func:`sequential_match_mask`,
+    which is O(n * neighbours) instead of O(n^2).
+    ``BestOf2NearestRangeMatcher`` cannot wrap around for loop closure, so
+    the window is passed as a pair mask to the same matcher.
+
+    Returns the registration and its stats: matching time, matched pairs
+    and, with ``compare_full``, the time needed to match the full graph of
+    the same features.
+    """
+    mask = sequential_match_mask(len(images), neighbours, loop_closure)
+    return _register(images, mask, registration_megapix, compare_full)
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def registration_cache_key(
+    paths: Sequence[Path],
+    max_width: int,
+    reduced_decode: bool = False,
+    registration_megapix: float = REGISTRATION_MEGAPIX,
+    match_graph: Dict[str, object] | None = None,
+) -> str:
+    """Cache key: input file hashes (in order) plus the registration settings.
+
+    ``match_graph`` describes a restricted match graph (None for the full one).
+    """
+    stitcher = create_stitcher(registration_megapix)
+    params = {
+        "version": REGISTRATION_CACHE_VERSION,
+        "frames": [file_digest(path) for path in paths],
+        "max_width": max_width,
+        "reduced_decode": reduced_decode,
+        "registration_resol": stitcher.registrationResol(),
+        "confidence": stitcher.panoConfidenceThresh(),
+        "wave_correction": stitcher.waveCorrection(),
+    }
+    if match_graph is not None:
+        params["match_graph"] = match_graph
+    payload = json.dumps(params, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_registration(cache_dir: Path, key: str) -> Registration | None:
+    path = cache_dir / f"{key}.json"
+    if not path.exists():
+        return None
+    payload = json.loads(path.read_text())
+    if payload.get("version") != REGISTRATION_CACHE_VERSION:
+        return None
+    return Registration.from_json(payload)
+
+
+def save_registration(cache_dir: Path, key: str, registration: Registration) -> Path:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{key}.json"
+    staging = path.with_suffix(".json.tmp")
+    staging.write_text(json.dumps(registration.to_json(), indent=2))
+    os.replace(staging, path)
+    return path
+
+
+def _scaled_intrinsics(camera: cv2.detail.CameraParams, scale: float) -> np.ndarray:
+    K = camera.K().astype(np.float32)
+    K[0, 0] *= scale
+    K[0, 2] *= scale
+    K[1, 1] *= scale
+    K[1, 2] *= scale
+    return K
+
+
+def _warp_frame(
+    warper: cv2.PyRotationWarper, image: np.ndarray, K: np.ndarray, R: np.ndarray
+) -> Tuple[Tuple[int, int], np.ndarray, np.ndarray]:
+    """Warp ``image`` and its full-frame mask; returns ``(corner, image, mask)``."""
+    corner, warped = warper.warp(image, K, R, cv2.INTER_LINEAR, cv2.BORDER_REFLECT)
+    mask = np.full(image.shape[:2], 255, dtype=np.uint8)
+    _, warped_mask = warper.warp(mask, K, R, cv2.INTER_NEAREST, cv2.BORDER_CONSTANT)
+    return corner, warped, warped_mask
+
+
+@dataclasses.dataclass
+class SeamPlan:
+    """Exposure compensator and per-frame seam masks, estimated at seam resolution."""
+
+    compensator: cv2.detail.ExposureCompensator
+    seam_masks: List[np.ndarray]
+    # Seam-resolution warped corners and spherical warp scale, used to look
+    # up seam masks and gains from compositing-resolution coordinates.
+    corners: List[Tuple[int, int]]
+    warp_scale: float
+    exposure_strategy: str
+
+    def gain_map(self, idx: int) -> np.ndarray:
+        """Per-pixel BGR gains of frame ``idx`` over its seam-resolution warped image."""
+        height, width = self.seam_masks[idx].shape[:2]
+        if self.exposure_strategy == "none":
+            return np.ones((height, width, 3), dtype=np.float32)
+        gains = np.asarray(self.compensator.getMatGains()[idx], dtype=np.float32)
+        if self.exposure_strategy == "gain":
+            return np.full((height, width, 3), gains.item(), dtype=np.float32)
+        if self.exposure_strategy == "channel":
+            return np.broadcast_to(gains.ravel()[:3], (height, width, 3)).copy()
+        gains = cv2.resize(gains, (width, height), interpolation=cv2.INTER_LINEAR)
+        if gains.ndim == 2:
+            gains = np.repeat(gains[..., None], 3, axis=2)
+        return gains
+
+
+def _camera_aspects(sizes: Sequence[Tuple[int, int]], registration: Registration) -> List[float]:
+    """Scale from registration work pixels to frames of ``sizes`` (component order)."""
+    return [
+        size[0] / registration.frame_sizes[idx][0] / registration.work_scale
+        for size, idx in zip(sizes, registration.component)
+    ]
+
+
+def estimate_seams(
     images: Sequence[np.ndarray],
+    registration: Registration,
     exposure_strategy: str = "gain_blocks",
+) -> SeamPlan:
+    """Exposure compensation and graph-cut seams on frames warped at seam resolution.
+
+    The result does not depend on the resolution of ``images`` beyond the
+    seam resolution, so low-resolution proxies give the same plan as the
+    original frames.
+    """
+    frames = [images[idx] for idx in registration.component]
+    aspects = _camera_aspects([(f.shape[1], f.shape[0]) for f in frames], registration)
+    seam_scale = min(1.0, math.sqrt(SEAM_MEGAPIX * 1e6 / (frames[0].shape[0] * frames[0].shape[1])))
+    warp_scale = registration.warped_image_scale * seam_scale * aspects[0]
+    warper = cv2.PyRotationWarper("spherical", warp_scale)
+    corners, warped_images, warped_masks = [], [], []
+    for frame, camera, aspect in zip(frames, registration.cameras, aspects):
+        small = cv2.resize(
+            frame, None, fx=seam_scale, fy=seam_scale, interpolation=cv2.INTER_LINEAR_EXACT
+        )
+        corner, warped, mask = _warp_frame(
+            warper, small, _scaled_intrinsics(camera, seam_scale * aspect), camera.R
+        )
+        corners.append(corner)
+        warped_images.append(warped)
+        warped_masks.append(mask)
+    compensator = cv2.detail.ExposureCompensator_createDefault(
+        EXPOSURE_COMPENSATORS[exposure_strategy]
+    )
+    compensator.feed(corners=corners, images=warped_images, masks=warped_masks)
+    seam_finder = cv2.detail_GraphCutSeamFinder("COST_COLOR")
+    seam_masks = seam_finder.find(
+        [img.astype(np.float32) for img in warped_images], corners, warped_masks
+    )
+    return SeamPlan(
+        compensator=compensator,
+        seam_masks=[mask.get() if isinstance(mask, cv2.UMat) else mask for mask in seam_masks],
+        corners=[tuple(corner) for corner in corners],
+        warp_scale=warp_scale,
+        exposure_strategy=exposure_strategy,
+    )
+
+
+@dataclasses.dataclass
+class ComposeLayout:
+    """Compositing-resolution geometry of the registered frames."""
+
+    scale: float
+    warp_scale: float
+    intrinsics: List[np.ndarray]
+    rois: List[Tuple[int, int, int, int]]
+    result_roi: Tuple[int, int, int, int]
+
+
+def compose_layout(
+    sizes: Sequence[Tuple[int, int]], registration: Registration, compose_megapix: float = -1.0
+) -> ComposeLayout:
+    """Warped ROIs of frames of ``sizes`` (component order) and of the whole panorama."""
+    aspects = _camera_aspects(sizes, registration)
+    compose_scale = 1.0
+    if compose_megapix > 0:
+        compose_scale = min(1.0, math.sqrt(compose_megapix * 1e6 / (sizes[0][0] * sizes[0][1])))
+    warp_scale = registration.warped_image_scale * compose_scale * aspects[0]
+    warper = cv2.PyRotationWarper("spherical", warp_scale)
+    intrinsics = [
+        _scaled_intrinsics(camera, compose_scale * aspect)
+        for camera, aspect in zip(registration.cameras, aspects)
+    ]
+    rois = [
+        tuple(
+            warper.warpRoi(
+                (round(size[0] * compose_scale), round(size[1] * compose_scale)), K, camera.R
+            )
+        )
+        for size, K, camera in zip(sizes, intrinsics, registration.cameras)
+    ]
+    result_roi = cv2.detail.resultRoi(
+        corners=[roi[:2] for roi in rois], sizes=[roi[2:] for roi in rois]
+    )
+    return ComposeLayout(compose_scale, warp_scale, intrinsics, rois, tuple(result_roi))
+
+
+def blend_frames(
+    frames: Iterable[np.ndarray],
+    sizes: Sequence[Tuple[int, int]],
+    registration: Registration,
+    seams: SeamPlan,
+    compose_megapix: float = -1.0,
 ) -> np.ndarray:
-    if len(images) < 2:
-        raise ValueError("Need at least two images to perform stitching.")
-    stitcher = create_stitcher()
-    set_exposure_compensation(stitcher, exposure_strategy)
-    status, panorama = stitcher.stitch(images)
-    if status != cv2.Stitcher_OK:
-        raise RuntimeError(f"Stitching failed with status code {status}")
+    """Warp ``frames`` at compositing resolution and merge them with multi-band blending.
+
+    ``frames`` are the registered component in order, given as any iterable
+    (e.g. a stream from :func:`iter_images`) of images of ``sizes``
+    ``(width, height)``; only one frame is held at a time.
+    """
+    layout = compose_layout(sizes, registration, compose_megapix)
+    warper = cv2.PyRotationWarper("spherical", layout.warp_scale)
+    blender = cv2.detail_MultiBandBlender()
+    blend_width = math.sqrt(layout.result_roi[2] * layout.result_roi[3]) * BLEND_STRENGTH / 100
+    blender.setNumBands(max(1, int(math.ceil(math.log2(blend_width)) - 1)))
+    blender.prepare(layout.result_roi)
+    for idx, (frame, K, camera) in enumerate(zip(frames, layout.intrinsics, registration.cameras)):
+        if layout.scale != 1.0:
+            frame = cv2.resize(
+                frame, None, fx=layout.scale, fy=layout.scale, interpolation=cv2.INTER_LINEAR_EXACT
+            )
+        corner, warped, mask = _warp_frame(warper, frame, K, camera.R)
+        seams.compensator.apply(idx, corner, warped, mask)
+        seam = cv2.resize(
+            cv2.dilate(seams.seam_masks[idx], None),
+            (mask.shape[1], mask.shape[0]),
+            interpolation=cv2.INTER_LINEAR_EXACT,
+        )
+        blender.feed(warped.astype(np.int16), cv2.bitwise_and(seam, mask), corner)
+    panorama, _ = blender.blend(None, None)
+    return cv2.convertScaleAbs(panorama)
+
+
+def _spherical_backward_map(
+    u0: int, v0: int, width: int, height: int, scale: float, K: np.ndarray, R: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Source-image ``(xmap, ymap)`` of a ``width`` x ``height`` block of the warped plane.
+
+    NumPy version of the spherical projector's ``mapBackward`` for the block
+    whose top-left warped coordinate is ``(u0, v0)``; points behind the
+    camera map to -1.
+    """
+    u = (np.arange(u0, u0 + width, dtype=np.float64) / scale)[None, :]
+    v = (np.arange(v0, v0 + height, dtype=np.float64) / scale)[:, None]
+    sin_v = np.sin(np.pi - v)
+    rays = (
+        sin_v * np.sin(u),
+        np.broadcast_to(np.cos(np.pi - v), (height, width)),
+        sin_v * np.cos(u),
+    )
+    k_rinv = np.asarray(K, dtype=np.float64) @ np.asarray(R, dtype=np.float64).T
+    x, y, z = (
+        k_rinv[row, 0] * rays[0] + k_rinv[row, 1] * rays[1] + k_rinv[row, 2] * rays[2]
+        for row in range(3)
+    )
+    front = z > 0
+    z = np.where(front, z, 1.0)
+    xmap = np.where(front, x / z, -1.0).astype(np.float32)
+    ymap = np.where(front, y / z, -1.0).astype(np.float32)
+    return xmap, ymap
+
+
+def composite_tiled(
+    frames: Iterable[np.ndarray],
+    sizes: Sequence[Tuple[int, int]],
+    registration: Registration,
+    seams: SeamPlan,
+    output_dir: Path,
+    tile_size: int = 1024,
+    compose_megapix: float = -1.0,
+    tile_format: str = ".jpg",
+    feather_sharpness: float = 0.1,
+) -> np.ndarray:
+    """Out-of-core compositing: warp and blend frames tile by tile into memory maps on disk.
+
+    Every frame is warped one output tile at a time (backward spherical
+    mapping plus ``cv2.remap``) and accumulated as weighted colour into a
+    float32 memory-mapped buffer.  The blend weights are feathered seam
+    masks sampled from seam resolution (multi-band blending is not
+    tile-local), and exposure gains are looked up the same way.  A final
+    pass normalises each tile into ``panorama.npy`` (a uint8 ``.npy``
+    memory map) and writes it to ``tiles/`` with an ``index.json`` that
+    describes the grid.  Besides a few tile-sized buffers, resident memory
+    is whatever ``frames`` holds: pass a stream (``iter_images`` with a small
+    ``prefetch``) rather than a list to keep it independent of the number
+    of frames and of the panorama size.
+
+    Returns the memory-mapped panorama.
+    """
+    layout = compose_layout(sizes, registration, compose_megapix)
+    rx, ry, width, height = layout.result_roi
+    output_dir.mkdir(parents=True, exist_ok=True)
+    accumulator_path = output_dir / "accumulator.npy"
+    accumulator = np.lib.format.open_memmap(
+        accumulator_path, mode="w+", dtype=np.float32, shape=(height, width, 4)
+    )
+    ratio = seams.warp_scale / layout.warp_scale
+    for idx, (frame, K, camera, roi) in enumerate(
+        zip(frames, layout.intrinsics, registration.cameras, layout.rois)
+    ):
+        if layout.scale != 1.0:
+            frame = cv2.resize(
+                frame, None, fx=layout.scale, fy=layout.scale, interpolation=cv2.INTER_LINEAR_EXACT
+            )
+        # Feathered seam weights and exposure gains at seam resolution.
+        seam = cv2.dilate(seams.seam_masks[idx], None)
+        weights = np.minimum(
+            cv2.distanceTransform(seam, cv2.DIST_L2, 3) * feather_sharpness, 1.0
+        ).astype(np.float32)
+        gains = seams.gain_map(idx)
+        seam_x, seam_y = seams.corners[idx]
+        x0, y0 = roi[0] - rx, roi[1] - ry
+        x1, y1 = x0 + roi[2], y0 + roi[3]
+        for ty in range(y0 // tile_size * tile_size, y1, tile_size):
+            for tx in range(x0 // tile_size * tile_size, x1, tile_size):
+                bx0, by0 = max(tx, x0), max(ty, y0)
+                bx1, by1 = min(tx + tile_size, x1, width), min(ty + tile_size, y1, height)
+                if bx0 >= bx1 or by0 >= by1:
+                    continue
+                block_w, block_h = bx1 - bx0, by1 - by0
+                xmap, ymap = _spherical_backward_map(
+                    bx0 + rx, by0 + ry, block_w, block_h, layout.warp_scale, K, camera.R
+                )
+                inside = (
+                    (xmap >= 0)
+                    & (xmap <= frame.shape[1] - 1)
+                    & (ymap >= 0)
+                    & (ymap <= frame.shape[0] - 1)
+                )
+                if not inside.any():
+                    continue
+                patch = cv2.remap(
+                    frame, xmap, ymap, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT
+                )
+                # Same block in seam-resolution warped coordinates.
+                su = ((np.arange(bx0, bx1) + rx) * ratio - seam_x).astype(np.float32)
+                sv = ((np.arange(by0, by1) + ry) * ratio - seam_y).astype(np.float32)
+                smap_x = np.broadcast_to(su[None, :], (block_h, block_w))
+                smap_y = np.broadcast_to(sv[:, None], (block_h, block_w))
+                weight = cv2.remap(weights, smap_x, smap_y, cv2.INTER_LINEAR, borderValue=0)
+                weight *= inside
+                gain = cv2.remap(
+                    gains, smap_x, smap_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+                )
+                block = accumulator[by0:by1, bx0:bx1]
+                block[..., :3] += patch.astype(np.float32) * gain * weight[..., None]
+                block[..., 3] += weight
+        del frame
+    accumulator.flush()
+
+    panorama = np.lib.format.open_memmap(
+        output_dir / "panorama.npy", mode="w+", dtype=np.uint8, shape=(height, width, 3)
+    )
+    tiles_dir = output_dir / "tiles"
+    tiles_dir.mkdir(exist_ok=True)
+    tiles = []
+    for ty in range(0, height, tile_size):
+        for tx in range(0, width, tile_size):
+            block = accumulator[ty : ty + tile_size, tx : tx + tile_size]
+            weight = np.maximum(block[..., 3:], 1e-6)
+            tile = np.clip(block[..., :3] / weight + 0.5, 0, 255).astype(np.uint8)
+            panorama[ty : ty + tile_size, tx : tx + tile_size] = tile
+            name = f"r{ty // tile_size:03d}_c{tx // tile_size:03d}{tile_format}"
+            cv2.imwrite(str(tiles_dir / name), tile)
+            tiles.append(
+                {
+                    "row": ty // tile_size,
+                    "col": tx // tile_size,
+                    "x": tx,
+                    "y": ty,
+                    "width": tile.shape[1],
+                    "height": tile.shape[0],
+                    "file": f"tiles/{name}",
+                }
+            )
+    panorama.flush()
+    # Views of the memory map keep the file mapped; drop them all before
+    # removing it (unlinking a mapped file fails on Windows).
+    del block, accumulator
+    accumulator_path.unlink()
+    index = {
+        "width": width,
+        "height": height,
+        "tile_size": tile_size,
+        "rows": -(-height // tile_size),
+        "cols": -(-width // tile_size),
+        "buffer": "panorama.npy",
+        "tiles": tiles,
+    }
+    (output_dir / "index.json").write_text(json.dumps(index, indent=2))
     return panorama
 
 
+def compose_panorama(
+    images: Sequence[np.ndarray],
+    registration: Registration,
+    exposure_strategy: str = "gain_blocks",
+    compose_megapix: float = -1.0,
+) -> np.ndarray:
+    """Compositing stage, mirroring ``Stitcher.composePanorama``.
+
+    Frames are warped onto a sphere with the registered cameras, exposure
+    compensated and seamed (graph cut) at seam resolution, then warped again
+    at compositing resolution and merged with a multi-band blender.  The
+    frames may be given at any resolution: cameras are rescaled from the
+    registered frame sizes.
+    """
+    seams = estimate_seams(images, registration, exposure_strategy)
+    frames = [images[idx] for idx in registration.component]
+    sizes = [(frame.shape[1], frame.shape[0]) for frame in frames]
+    return blend_frames(frames, sizes, registration, seams, compose_megapix)
+
+
+def stitch_images(
+    images: Sequence[np.ndarray],
+    exposure_strategy: str = "gain_blocks",
+    compose_megapix: float = -1.0,
+) -> np.ndarray:
+    registration = register_images(images)
+    return compose_panorama(images, registration, exposure_strategy, compose_megapix)
+
+
+def _focals_from_homography(H: np.ndarray) -> Tuple[float | None, float | None]:
+    """Shum & Szeliski focal estimates ``(f0, f1)`` from a rotation homography.
+
+    Port of ``cv2.detail.focalsFromHomography``, whose outputs are not
+    returned by the Python binding.  ``None`` marks a failed estimate.
+    """
+    h = (H / H[2, 2]).ravel()
+
+    def pick(d1: float, d2: float, v1: float, v2: float) -> float | None:
+        if v1 < v2:
+            v1, v2 = v2, v1
+        if v1 > 0 and v2 > 0:
+            return math.sqrt(v1 if abs(d1) > abs(d2) else v2)
+        if v1 > 0:
+            return math.sqrt(v1)
+        return None
+
+    d1 = h[6] * h[7]
+    d2 = (h[7] - h[6]) * (h[7] + h[6])
+    f1 = None
+    if d1 != 0 and d2 != 0:
+        v1 = -(h[0] * h[1] + h[3] * h[4]) / d1
+        v2 = (h[0] * h[0] + h[3] * h[3] - h[1] * h[1] - h[4] * h[4]) / d2
+        f1 = pick(d1, d2, v1, v2)
+    d1 = h[0] * h[3] + h[1] * h[4]
+    d2 = h[0] * h[0] + h[1] * h[1] - h[3] * h[3] - h[4] * h[4]
+    f0 = None
+    if d1 != 0 and d2 != 0:
+        v1 = -h[2] * h[5] / d1
+        v2 = (h[5] * h[5] - h[2] * h[2]) / d2
+        f0 = pick(d1, d2, v1, v2)
+    return f0, f1
+
+
+def _pair_focals(H: np.ndarray) -> List[float]:
+    """``sqrt(f0 * f1)`` estimates of a pair, from ``H`` and its inverse.
+
+    The matcher only reports one direction of a pair; ``estimateFocal``
+    sees both (``H`` and ``H^-1``), and the two are not equally conditioned.
+    """
+    samples = []
+    for M in (H, np.linalg.inv(H)):
+        f0, f1 = _focals_from_homography(M)
+        if f0 is not None and f1 is not None:
+            samples.append(math.sqrt(f0 * f1))
+    return samples
+
+
+def _rays(points: np.ndarray, focal: float) -> np.ndarray:
+    """Unit rays of pixel offsets from the image centre."""
+    rays = np.column_stack([points, np.full(len(points), focal)])
+    return rays / np.linalg.norm(rays, axis=1, keepdims=True)
+
+
+def _kabsch(world_rays: np.ndarray, frame_rays: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Rotation taking ``frame_rays`` onto ``world_rays`` and its summed squared error."""
+    u, sv, vt = np.linalg.svd(world_rays.T @ frame_rays)
+    flip = np.sign(np.linalg.det(u @ vt))
+    rotation = u @ np.diag([1.0, 1.0, flip]) @ vt
+    # sum |w - R f|^2 over unit rays = 2 (n - trace(R^T W^T F)).
+    error = 2.0 * (len(world_rays) - (sv[0] + sv[1] + flip * sv[2]))
+    return rotation, max(error, 0.0)
+
+
+def refine_focal(
+    pairs: Sequence[Tuple[np.ndarray, np.ndarray]], low: float, high: float
+) -> float:
+    """Focal in ``[low, high]`` under which matched rays are best related by rotations.
+
+    ``pairs`` holds the inlier pixel offsets (from the image centre) of
+    matched frame pairs.  For each candidate focal every pair's rotation is
+    solved in closed form (Kabsch); the mean squared ray error, scaled by
+    ``focal^2`` to pixels, is minimised by a log-spaced scan and a golden
+    section search around its best sample.
+    """
+    count = sum(len(a) for a, _ in pairs)
+
+    def cost(focal: float) -> float:
+        error = sum(_kabsch(_rays(a, focal), _rays(b, focal))[1] for a, b in pairs)
+        return focal * focal * error / count
+
+    grid = np.geomspace(low, high, 24)
+    best = int(np.argmin([cost(focal) for focal in grid]))
+    lo, hi = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+    golden = (math.sqrt(5) - 1) / 2
+    for _ in range(30):
+        a, b = hi - golden * (hi - lo), lo + golden * (hi - lo)
+        if cost(a) < cost(b):
+            hi = b
+        else:
+            lo = a
+    return (lo + hi) / 2
+
+
+class IncrementalStitcher:
+    """Streaming panorama builder that accepts frames one at a time.
+
+    Each new frame is matched only against the last ``neighbours`` accepted
+    frames (captures are assumed to arrive in order).  Its rotation is the
+    least-squares (Kabsch) fit of the inlier rays of all confident
+    neighbour matches, expressed in the frame of the first image, so the
+    cost of ``add`` does not grow with the number of frames.  The frame is
+    then warped onto a spherical canvas and feather-blended into running
+    colour/weight accumulators in place; the canvas grows geometrically
+    when a frame falls outside it.
+
+    Unless ``focal`` is given (in registration pixels), the first frames
+    are held back until ``focal_pairs`` confident pairs have been matched.
+    The focal is then initialised with the median of the plausible
+    (``FOCAL_RANGE``) Shum-Szeliski estimates of those pairs in both
+    directions, as ``estimateFocal`` does, and refined with
+    :func:`refine_focal` on their inlier rays.  The held frames' rotations
+    are re-solved with it before they are blended, and the focal stays
+    fixed afterwards.  There is no global bundle adjustment, wave
+    correction or exposure compensation, so long sweeps accumulate some
+    drift compared with :func:`stitch_images`.
+    """
+
+    def __init__(
+        self,
+        neighbours: int = 2,
+        registration_megapix: float = REGISTRATION_MEGAPIX,
+        compose_megapix: float = -1.0,
+        confidence_threshold: float = PANO_CONFIDENCE,
+        focal: float | None = None,
+        blend_sharpness: float = 0.02,
+        focal_pairs: int = INCREMENTAL_FOCAL_PAIRS,
+    ) -> None:
+        if neighbours < 1:
+            raise ValueError("neighbours must be at least 1")
+        self.registration_megapix = registration_megapix
+        self.compose_megapix = compose_megapix
+        self.confidence_threshold = confidence_threshold
+        self.focal = focal
+        self.blend_sharpness = blend_sharpness
+        self.focal_pairs = max(1, focal_pairs)
+        self.finder = cv2.ORB_create()
+        self.matcher = cv2.detail_BestOf2NearestMatcher(False, MATCH_CONFIDENCE)
+        # (frame index, features) of the most recent accepted frames.
+        self.window: Deque[Tuple[int, cv2.detail.ImageFeatures]] = deque(maxlen=neighbours)
+        self.rotations: List[np.ndarray] = []
+        self.work_scale = 1.0
+        self.compose_scale = 1.0
+        self.warper: cv2.PyRotationWarper | None = None
+        # Frames held back until the focal is known, with the inlier pixel
+        # offsets (neighbour index, neighbour points, frame points) of each
+        # one's confident matches and the focal estimates of those pairs.
+        self._pending: List[np.ndarray] = []
+        self._links: List[List[Tuple[int, np.ndarray, np.ndarray]]] = []
+        self._focal_samples: List[float] = []
+        self._work_size = (0, 0)
+        # Canvas accumulators and the warped-plane position of their origin.
+        self._color: np.ndarray | None = None
+        self._weight: np.ndarray | None = None
+        self._origin = (0, 0)
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.rotations)
+
+    def add(self, frame: np.ndarray) -> bool:
+        """Register ``frame`` and blend it into the canvas.
+
+        Returns False (leaving the panorama unchanged) when no neighbour
+        matches with at least ``confidence_threshold``.  Like the Stitcher's
+        matcher, near-duplicates of a neighbour get zero confidence and are
+        skipped as well.
+        """
+        if not self.rotations:
+            area = frame.shape[0] * frame.shape[1]
+            self.work_scale = min(1.0, math.sqrt(self.registration_megapix * 1e6 / area))
+            if self.compose_megapix > 0:
+                self.compose_scale = min(1.0, math.sqrt(self.compose_megapix * 1e6 / area))
+        small = cv2.resize(
+            frame,
+            None,
+            fx=self.work_scale,
+            fy=self.work_scale,
+            interpolation=cv2.INTER_LINEAR_EXACT,
+        )
+        features = cv2.detail.computeImageFeatures2(self.finder, small)
+        if not self.window:
+            # The first frame defines the panorama's reference rotation.
+            self._work_size = (small.shape[1], small.shape[0])
+            self.window.append((0, features))
+            self.rotations.append(np.eye(3))
+            self._pending.append(frame)
+            self._links.append([])
+            if self.focal is not None:
+                self._flush_pending()
+            return True
+
+        links = []
+        for index, neighbour in self.window:
+            info = self.matcher.apply(neighbour, features)
+            if info.confidence < self.confidence_threshold:
+                continue
+            if self._pending:
+                self._focal_samples += _pair_focals(np.asarray(info.H, dtype=np.float64))
+            inliers = [
+                match
+                for match, keep in zip(info.getMatches(), np.ravel(info.inliers_mask))
+                if keep
+            ]
+            links.append(
+                (
+                    index,
+                    self._points(neighbour, [m.queryIdx for m in inliers]),
+                    self._points(features, [m.trainIdx for m in inliers]),
+                )
+            )
+        self.matcher.collectGarbage()
+        if not links:
+            return False
+
+        self.window.append((len(self.rotations), features))
+        if self._pending:
+            # Provisional rotation; re-solved once the focal is settled.
+            self._links.append(links)
+            self._pending.append(frame)
+            self.rotations.append(self._solve_rotation(links, self._estimate_focal()))
+            if sum(len(frame_links) for frame_links in self._links) >= self.focal_pairs:
+                self._flush_pending()
+            return True
+        rotation = self._solve_rotation(links, self.focal)
+        self.rotations.append(rotation)
+        self._blend(frame, rotation)
+        return True
+
+    def panorama(self) -> np.ndarray:
+        """Current mosaic, cropped to the covered area."""
+        if len(self._pending) == 1:
+            # A single frame so far (focal still unknown): nothing to warp.
+            return self._pending[0].copy()
+        # Fewer than ``focal_pairs`` pairs seen: settle on what there is.
+        self._flush_pending()
+        if self._weight is None:
+            raise ValueError("No frames have been added.")
+        covered = self._weight > 0
+        rows = np.flatnonzero(covered.any(axis=1))
+        cols = np.flatnonzero(covered.any(axis=0))
+        window = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+        weight = np.maximum(self._weight[window], 1e-6)[..., None]
+        return np.clip(self._color[window] / weight + 0.5, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def _points(features: cv2.detail.ImageFeatures, indices: List[int]) -> np.ndarray:
+        """Keypoint positions as offsets from the image centre."""
+        keypoints = features.getKeypoints()
+        pts = np.array([keypoints[i].pt for i in indices], dtype=np.float64).reshape(-1, 2)
+        return pts - np.array(features.img_size, dtype=np.float64) / 2
+
+    def _solve_rotation(
+        self, links: List[Tuple[int, np.ndarray, np.ndarray]], focal: float
+    ) -> np.ndarray:
+        """Kabsch fit of the frame's rays onto its neighbours' world rays."""
+        world_rays = [_rays(ours, focal) @ self.rotations[index].T for index, ours, _ in links]
+        frame_rays = [_rays(theirs, focal) for _, _, theirs in links]
+        return _kabsch(np.concatenate(world_rays), np.concatenate(frame_rays))[0]
+
+    def _estimate_focal(self) -> float:
+        """Focal (registration pixels) from the pairs matched so far."""
+        size = float(sum(self._work_size))
+        low, high = FOCAL_RANGE[0] * size, FOCAL_RANGE[1] * size
+        plausible = [f for f in self._focal_samples if low <= f <= high]
+        pairs = [(ours, theirs) for links in self._links for _, ours, theirs in links]
+        if not pairs:
+            return float(np.median(plausible)) if plausible else size
+        if plausible:
+            # The median is a reliable bracket, not a precise estimate.
+            initial = float(np.median(plausible))
+            low, high = max(low, initial / 2), min(high, initial * 2)
+        return refine_focal(pairs, low, high)
+
+    def _flush_pending(self) -> None:
+        """Fix the focal, re-solve the held frames' rotations and blend them."""
+        if not self._pending:
+            return
+        if self.focal is None:
+            self.focal = self._estimate_focal()
+            for index in range(1, len(self._links)):
+                self.rotations[index] = self._solve_rotation(self._links[index], self.focal)
+        self.warper = cv2.PyRotationWarper(
+            "spherical", self.focal * self.compose_scale / self.work_scale
+        )
+        frames, self._pending, self._links = self._pending, [], []
+        for frame, rotation in zip(frames, self.rotations):
+            self._blend(frame, rotation)
+
+    def _blend(self, frame: np.ndarray, rotation: np.ndarray) -> None:
+        if self.compose_scale != 1.0:
+            frame = cv2.resize(
+                frame,
+                None,
+                fx=self.compose_scale,
+                fy=self.compose_scale,
+                interpolation=cv2.INTER_AREA,
+            )
+        focal = self.focal * self.compose_scale / self.work_scale
+        K = np.array(
+            [[focal, 0, frame.shape[1] / 2], [0, focal, frame.shape[0] / 2], [0, 0, 1]],
+            dtype=np.float32,
+        )
+        corner, warped, mask = _warp_frame(self.warper, frame, K, rotation.astype(np.float32))
+        weight = np.minimum(
+            cv2.distanceTransform(mask, cv2.DIST_L1, 3) * self.blend_sharpness, 1.0
+        ).astype(np.float32)
+        x, y = self._reserve(corner, warped.shape[:2])
+        region = (slice(y, y + warped.shape[0]), slice(x, x + warped.shape[1]))
+        self._color[region] += warped.astype(np.float32) * weight[..., None]
+        self._weight[region] += weight
+
+    def _reserve(self, corner: Tuple[int, int], shape: Tuple[int, int]) -> Tuple[int, int]:
+        """Grow the canvas to hold ``shape`` at ``corner``; returns the local offset."""
+        x0, y0 = corner
+        x1, y1 = x0 + shape[1], y0 + shape[0]
+        if self._weight is None:
+            self._origin = (x0, y0)
+            self._color = np.zeros((shape[0], shape[1], 3), dtype=np.float32)
+            self._weight = np.zeros(shape, dtype=np.float32)
+            return 0, 0
+        ox, oy = self._origin
+        height, width = self._weight.shape
+        if x0 < ox or y0 < oy or x1 > ox + width or y1 > oy + height:
+            # Over-allocate by the growth amount so reallocations stay rare.
+            pad_x, pad_y = width // 2, height // 2
+            nx0 = min(ox, x0 - pad_x) if x0 < ox else ox
+            ny0 = min(oy, y0 - pad_y) if y0 < oy else oy
+            nx1 = max(ox + width, x1 + pad_x) if x1 > ox + width else ox + width
+            ny1 = max(oy + height, y1 + pad_y) if y1 > oy + height else oy + height
+            color = np.zeros((ny1 - ny0, nx1 - nx0, 3), dtype=np.float32)
+            weight = np.zeros((ny1 - ny0, nx1 - nx0), dtype=np.float32)
+            region = (slice(oy - ny0, oy - ny0 + height), slice(ox - nx0, ox - nx0 + width))
+            color[region] = self._color
+            weight[region] = self._weight
+            self._color, self._weight, self._origin = color, weight, (nx0, ny0)
+        return x0 - self._origin[0], y0 - self._origin[1]
+
+
 def make_side_by_side(
     stitched: np.ndarray,
     reference_path: Path,
@@ -192,17 +1418,145 @@ def make_side_by_side(
     return output_path
 
 
+def stitch_incrementally(image_paths: Sequence[Path], args: argparse.Namespace) -> np.ndarray:
+    stitcher = IncrementalStitcher(
+        neighbours=args.neighbours,
+        registration_megapix=args.registration_megapix,
+        compose_megapix=args.compose_megapix,
+    )
+    frames = iter_images(
+        image_paths,
+        max_width=max(0, args.resize_max_width),
+        workers=args.load_workers,
+        reduced_decode=not args.no_reduced_decode,
+    )
+    latencies = []
+    for idx, (path, frame) in enumerate(zip(image_paths, frames), start=1):
+        start = time.perf_counter()
+        accepted = stitcher.add(frame)
+        latencies.append(time.perf_counter() - start)
+        status = "added" if accepted else "skipped (no confident match)"
+        print(f"Frame {idx}/{len(image_paths)} {path.name}: {status} in {latencies[-1]:.2f}s")
+    print(
+        f"Incremental stitching: {stitcher.num_frames}/{len(image_paths)} frames, "
+        f"mean {np.mean(latencies):.2f}s / max {np.max(latencies):.2f}s per frame"
+    )
+    return stitcher.panorama()
+
+
+def stitch_in_stages(image_paths: Sequence[Path], args: argparse.Namespace) -> np.ndarray:
+    start = time.perf_counter()
+    images = load_images(
+        image_paths,
+        max_width=max(0, args.resize_max_width),
+        workers=args.load_workers,
+        reduced_decode=not args.no_reduced_decode,
+    )
+    load_seconds = time.perf_counter() - start
+    print(
+        f"Loaded {len(images)} frames for stitching in {load_seconds:.2f}s "
+        f"({len(images) / load_seconds:.1f} frames/s)."
+    )
+    match_graph = None
+    if args.match_graph == "sequential":
+        match_graph = {"neighbours": args.neighbours, "loop_closure": args.loop_closure}
+    registration = None
+    if args.registration_cache:
+        key = registration_cache_key(
+            image_paths,
+            max(0, args.resize_max_width),
+            not args.no_reduced_decode,
+            args.registration_megapix,
+            match_graph,
+        )
+        registration = load_registration(args.registration_cache, key)
+        if registration is not None:
+            print(f"Registration loaded from cache ({key[:12]}).")
+    if registration is None:
+        start = time.perf_counter()
+        if match_graph is None:
+            registration = register_images(images, args.registration_megapix)
+        else:
+            registration, stats = register_images_sequential(
+                images,
+                args.neighbours,
+                args.loop_closure,
+                args.registration_megapix,
+                compare_full=args.compare_match_graph,
+            )
+            report = f"Matching: {stats['pairs']} pairs in {stats['match_seconds']:.2f}s"
+            if "full_match_seconds" in stats:
+                report += (
+                    f" (full graph: {stats['full_pairs']} pairs in "
+                    f"{stats['full_match_seconds']:.2f}s)"
+                )
+            print(report)
+        print(
+            f"Registration: {len(registration.component)}/{len(images)} frames "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        if args.registration_cache:
+            save_registration(args.registration_cache, key, registration)
+
+    start = time.perf_counter()
+    seams = estimate_seams(images, registration, args.exposure_compensation)
+    if args.full_res_compose or args.tiled_output:
+        # Seams from the proxies; the frames are streamed into the compositor
+        # instead of being held in ``images``: at full resolution, or (tiled
+        # output) decoded again exactly like the registration proxies.
+        paths = [image_paths[idx] for idx in registration.component]
+        if args.full_res_compose:
+            sizes = [
+                decoded_size(path, registration.frame_sizes[idx])
+                for path, idx in zip(paths, registration.component)
+            ]
+            max_width, reduced_decode = 0, False
+        else:
+            sizes = [registration.frame_sizes[idx] for idx in registration.component]
+            max_width, reduced_decode = max(0, args.resize_max_width), not args.no_reduced_decode
+        del images
+        frames = iter_images(
+            paths,
+            max_width,
+            workers=args.load_workers,
+            reduced_decode=reduced_decode,
+            # Tiled output keeps memory bounded whatever --load-workers is.
+            prefetch=TILED_PREFETCH if args.tiled_output else 0,
+        )
+    else:
+        frames = [images[idx] for idx in registration.component]
+        sizes = [(frame.shape[1], frame.shape[0]) for frame in frames]
+    if args.tiled_output:
+        panorama = composite_tiled(
+            frames,
+            sizes,
+            registration,
+            seams,
+            args.tiled_output,
+            tile_size=args.tile_size,
+            compose_megapix=args.compose_megapix,
+            tile_format=args.output.suffix or ".jpg",
+        )
+    else:
+        panorama = blend_frames(frames, sizes, registration, seams, args.compose_megapix)
+    print(f"Compositing: {time.perf_counter() - start:.2f}s")
+    return panorama
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     args = parse_args(argv or sys.argv[1:])
     image_paths = collect_image_paths(args.images, args.pattern)
-    images = load_images(image_paths, max_width=max(0, args.resize_max_width))
-
-    print(f"Loaded {len(images)} frames for stitching.")
-    panorama = stitch_images(images, args.exposure_compensation)
+    if args.incremental:
+        panorama = stitch_incrementally(image_paths, args)
+    else:
+        panorama = stitch_in_stages(image_paths, args)
 
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    cv2.imwrite(str(args.output), panorama)
-    print(f"Panorama saved to {args.output.resolve()}")
+    if args.tiled_output:
+        print(f"Tiled panorama saved to {(args.tiled_output / 'index.json').resolve()}")
+    else:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(args.output), panorama)
+        print(f"Panorama saved to {args.output.resolve()}")
 
     if args.reference:
         comparison_path = make_side_by_side(panorama, args.reference, args.comparison_output)
@@ -213,4 +1567,3 @@ def main(argv: Sequence[str] | None = None) -> int:
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
@@ -17,12 +17,26 @@ primitive operations (Gaussian blur, colour conversion, drawing).
 from __future__ import annotations
 
 import argparse
+import contextlib
+import cProfile
+import csv
 import dataclasses
+import functools
+import hashlib
+import json
 import math
+import os
+import pstats
 import random
+import shutil
 import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import Dict, Iterable, List, Sequence, Tuple
 
 import cv2
 import numpy as np
@@ -44,6 +58,96 @@ class Keypoint:
     orientation: float
 
 
+class KeypointSet:
+    """Structure-of-arrays container for many keypoints.
+
+    Holds the ``Keypoint`` fields as parallel NumPy arrays so large keypoint
+    sets carry no per-object overhead.  Integer indexing returns a
+    ``Keypoint``; slices, index arrays and boolean masks return a new set.
+    """
+
+    FIELDS = ("x", "y", "octave", "layer", "sigma", "orientation")
+
+    def __init__(
+        self,
+        x: np.ndarray | Sequence[float] = (),
+        y: np.ndarray | Sequence[float] = (),
+        octave: np.ndarray | Sequence[int] = (),
+        layer: np.ndarray | Sequence[int] = (),
+        sigma: np.ndarray | Sequence[float] = (),
+        orientation: np.ndarray | Sequence[float] | None = None,
+    ) -> None:
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.octave = np.asarray(octave, dtype=np.int32)
+        self.layer = np.asarray(layer, dtype=np.int32)
+        self.sigma = np.asarray(sigma, dtype=np.float64)
+        if orientation is None:
+            orientation = np.zeros(len(self.x))
+        self.orientation = np.asarray(orientation, dtype=np.float64)
+
+    @classmethod
+    def from_keypoints(cls, keypoints: Iterable[Keypoint]) -> "KeypointSet":
+        if isinstance(keypoints, KeypointSet):
+            return keypoints
+        keypoints = list(keypoints)
+        return cls(
+            *(np.array([getattr(kp, name) for kp in keypoints]) for name in cls.FIELDS)
+        )
+
+    @classmethod
+    def concatenate(cls, sets: Sequence["KeypointSet"]) -> "KeypointSet":
+        if not sets:
+            return cls()
+        return cls(*(np.concatenate([getattr(s, name) for s in sets]) for name in cls.FIELDS))
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Keypoint(
+                x=float(self.x[index]),
+                y=float(self.y[index]),
+                octave=int(self.octave[index]),
+                layer=int(self.layer[index]),
+                sigma=float(self.sigma[index]),
+                orientation=float(self.orientation[index]),
+            )
+        return KeypointSet(*(getattr(self, name)[index] for name in self.FIELDS))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, KeypointSet):
+            if not isinstance(other, (list, tuple)):
+                return NotImplemented
+            other = KeypointSet.from_keypoints(other)
+        return len(self) == len(other) and all(
+            np.array_equal(getattr(self, name), getattr(other, name)) for name in self.FIELDS
+        )
+
+    def __repr__(self) -> str:
+        return f"KeypointSet(n={len(self)})"
+
+    def with_orientation(self, orientation: np.ndarray) -> "KeypointSet":
+        return KeypointSet(self.x, self.y, self.octave, self.layer, self.sigma, orientation)
+
+    def to_array(self) -> np.ndarray:
+        """(N, 2) float32 array of image coordinates."""
+        return np.stack([self.x, self.y], axis=1).astype(np.float32)
+
+    def to_cv2(self) -> List[cv2.KeyPoint]:
+        """Equivalent ``cv2.KeyPoint`` list (size = 2 * sigma, angle in degrees)."""
+        angles = np.degrees(self.orientation)
+        return [
+            cv2.KeyPoint(float(x), float(y), float(2 * s), float(a), 0.0, int(o))
+            for x, y, s, a, o in zip(self.x, self.y, self.sigma, angles, self.octave)
+        ]
+
+
 @dataclasses.dataclass
 class Match:
     idx_a: int
@@ -51,16 +155,195 @@ class Match:
     distance: float
 
 
+# ---------------------------------------------------------------------------
+# Stage instrumentation
+
+
+class StageProfiler:
+    """Records wall time, tracemalloc peak and item counts per pipeline stage.
+
+    Stages are appended in execution order and must not nest.  By default
+    only ``perf_counter`` times are taken.  With ``trace_memory=True`` (or
+    ``profile=True``) tracemalloc is started and ``peak_bytes`` is the
+    highest traced allocation above the level at stage entry (NumPy reports
+    its buffers to tracemalloc); otherwise it is ``None``.  Tracing slows
+    allocation-heavy Python loops by an order of magnitude, so it is opt-in.
+    With ``profile=True`` every stage also runs under its own
+    ``cProfile.Profile`` so the slowest one can be dumped with
+    ``dump_slowest``.
+    """
+
+    def __init__(self, profile: bool = False, trace_memory: bool = False) -> None:
+        self.profile = profile
+        self.trace_memory = profile or trace_memory
+        self.records: List[Dict[str, object]] = []
+        self._profiles: List[cProfile.Profile | None] = []
+        self._tags: Dict[str, object] = {}
+        self._owns_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+
+    def close(self) -> None:
+        if self._owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._owns_tracing = False
+
+    @contextlib.contextmanager
+    def tags(self, **tags: object):
+        """Attach ``tags`` (e.g. ``image="A"``) to the stages opened inside."""
+        previous = self._tags
+        self._tags = {**previous, **tags}
+        try:
+            yield
+        finally:
+            self._tags = previous
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block; the yielded dict accepts an ``items`` count."""
+        record: Dict[str, object] = {"stage": name, **self._tags}
+        profiler = cProfile.Profile() if self.profile else None
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        base = tracemalloc.get_traced_memory()[0] if tracing else 0
+        if tracing:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            record["peak_bytes"] = (
+                max(0, tracemalloc.get_traced_memory()[1] - base) if tracing else None
+            )
+            record.setdefault("items", None)
+            self.records.append(record)
+            self._profiles.append(profiler)
+
+    def totals(self) -> Dict[str, float]:
+        """Seconds per stage name, summed over tags."""
+        totals: Dict[str, float] = {}
+        for record in self.records:
+            totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["seconds"]
+        return {name: round(seconds, 6) for name, seconds in totals.items()}
+
+    def slowest(self) -> int | None:
+        if not self.records:
+            return None
+        return max(range(len(self.records)), key=lambda i: self.records[i]["seconds"])
+
+    def report(self) -> Dict[str, object]:
+        slowest = self.slowest()
+        return {
+            "stages": self.records,
+            "totals": self.totals(),
+            "slowest": self.records[slowest] if slowest is not None else None,
+        }
+
+    def write_json(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def dump_slowest(self, output_dir: Path, top: int = 30) -> Path | None:
+        """Write cProfile stats of the slowest stage (``.prof`` + text listing)."""
+        index = self.slowest()
+        if index is None or self._profiles[index] is None:
+            return None
+        record = self.records[index]
+        label = "_".join(
+            str(value) for key, value in record.items()
+            if key not in ("seconds", "peak_bytes", "items")
+        )
+        prof_path = output_dir / f"profile_{label}.prof"
+        stats = pstats.Stats(self._profiles[index])
+        stats.dump_stats(str(prof_path))
+        with prof_path.with_suffix(".txt").open("w", encoding="utf-8") as f:
+            pstats.Stats(self._profiles[index], stream=f).sort_stats("cumulative").print_stats(top)
+        return prof_path
+
+
+def _stage(profiler: StageProfiler | None, name: str):
+    """``profiler.stage(name)``, or a no-op context when profiling is off."""
+    if profiler is None:
+        return contextlib.nullcontext({})
+    return profiler.stage(name)
+
+
 # ---------------------------------------------------------------------------
 # Utility helpers
 
 
+EXTREMA_ENGINES = ("loop", "vectorized")
+ORIENTATION_ENGINES = ("loop", "batched")
+DESCRIPTOR_ENGINES = ("loop", "vectorized")
+DESCRIPTOR_TYPES = ("sift", "binary")
+RANSAC_SAMPLERS = ("uniform", "prosac")
+HOMOGRAPHY_REFINEMENTS = ("none", "lsq", "lm")
+BATCH_PAIRINGS = ("consecutive", "all")
+
+# Upper bound on (keypoints x window samples) gathered at once by the batched
+# orientation/descriptor engines; keeps temporaries to a few tens of MB.
+BATCH_SAMPLE_BUDGET = 1 << 21
+
+# Maximum number of times a sub-pixel candidate may move to a neighbouring
+# sample before it is rejected (Lowe uses 5).
+SUBPIXEL_MAX_STEPS = 5
+
+# Inputs that are memory-mapped instead of decoded with cv2.imread.
+MEMMAP_SUFFIXES = (".npy", ".raw")
+
+# Steered-BRIEF binary descriptors: number of intensity tests (packed into
+# BINARY_DESCRIPTOR_BITS // 8 bytes) and the seed of the fixed test pattern.
+BINARY_DESCRIPTOR_BITS = 256
+BRIEF_PATTERN_SEED = 2011
+
+# Upper bound on bytes of XOR temporaries per block of the Hamming matcher.
+HAMMING_BLOCK_BUDGET = 1 << 25
+
+_POPCOUNT_TABLE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+# Popcount of every 16-bit value: halves the table lookups per descriptor.
+_POPCOUNT_TABLE16 = (_POPCOUNT_TABLE[:, None] + _POPCOUNT_TABLE[None, :]).ravel()
+
+
 def parse_args(argv: Sequence[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Task 2 – SIFT from scratch with RANSAC comparison"
     )
-    parser.add_argument("--image-a", type=Path, required=True, help="First image")
-    parser.add_argument("--image-b", type=Path, required=True, help="Second image")
+    parser.add_argument("--image-a", type=Path, default=None, help="First image")
+    parser.add_argument("--image-b", type=Path, default=None, help="Second image")
+    parser.add_argument(
+        "--batch-manifest",
+        type=Path,
+        default=None,
+        help="CSV of image_a,image_b pairs (relative to the manifest) to process in batch mode",
+    )
+    parser.add_argument(
+        "--batch-dir",
+        type=Path,
+        default=None,
+        help="Directory whose images are paired up and processed in batch mode",
+    )
+    parser.add_argument(
+        "--batch-pattern",
+        type=str,
+        default="*.JPG",
+        help="Glob used to pick images from --batch-dir",
+    )
+    parser.add_argument(
+        "--batch-pairs",
+        choices=BATCH_PAIRINGS,
+        default="consecutive",
+        help="How --batch-dir images are paired: consecutive neighbours or all pairs",
+    )
+    parser.add_argument(
+        "--batch-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes running the batch matching/RANSAC jobs (default: CPU count)",
+    )
     parser.add_argument(
         "--resize-width",
         type=int,
@@ -88,6 +371,73 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         default=10.0,
         help="R parameter used to suppress edge responses",
     )
+    parser.add_argument(
+        "--extrema-engine",
+        choices=EXTREMA_ENGINES,
+        default="vectorized",
+        help="Scale-space extrema detector: reference per-pixel loop or NumPy vectorized",
+    )
+    parser.add_argument(
+        "--orientation-engine",
+        choices=ORIENTATION_ENGINES,
+        default="batched",
+        help="Orientation assignment: reference per-keypoint loop or batched histograms",
+    )
+    parser.add_argument(
+        "--descriptor-engine",
+        choices=DESCRIPTOR_ENGINES,
+        default="vectorized",
+        help="Descriptor extraction: reference per-pixel loop or NumPy vectorized",
+    )
+    parser.add_argument(
+        "--descriptor",
+        choices=DESCRIPTOR_TYPES,
+        default="sift",
+        help="Custom descriptor: float SIFT histograms or packed binary (steered BRIEF) tests",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to run the custom SIFT octaves in parallel (1 = serial)",
+    )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=0,
+        help=(
+            "Run the custom SIFT over overlapping tiles of this size (0 = whole image); "
+            "each padded tile holds at most (size + 2 * margin)^2 pixels"
+        ),
+    )
+    parser.add_argument(
+        "--tile-margin",
+        type=int,
+        default=None,
+        help=(
+            "Tile overlap in pixels, at most half the tile size (default: the support "
+            "of the octaves that fit, so coarse keypoints near tile borders may differ)"
+        ),
+    )
+    parser.add_argument(
+        "--raw-shape",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Rows, cols[, channels] of headerless .raw inputs",
+    )
+    parser.add_argument(
+        "--raw-dtype",
+        type=str,
+        default="uint8",
+        help="NumPy dtype of .raw inputs (default: uint8)",
+    )
+    parser.add_argument(
+        "--no-subpixel",
+        dest="subpixel",
+        action="store_false",
+        help="Keep custom keypoints at integer sample positions (skip quadratic refinement)",
+    )
     parser.add_argument(
         "--sigma",
         type=float,
@@ -100,6 +450,35 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         default=0.75,
         help="Lowe's ratio test threshold for descriptor matching",
     )
+    parser.add_argument(
+        "--match-chunk-size",
+        type=int,
+        default=1024,
+        help="Rows of image A descriptors matched per block (bounds matcher memory)",
+    )
+    parser.add_argument(
+        "--cross-check",
+        action="store_true",
+        help="Keep only mutual nearest-neighbour matches (both pipelines)",
+    )
+    parser.add_argument(
+        "--matcher",
+        choices=("exact", "kdforest"),
+        default="exact",
+        help="Descriptor matcher for both pipelines: brute force or approximate k-d forest",
+    )
+    parser.add_argument(
+        "--kd-trees",
+        type=int,
+        default=8,
+        help="Number of randomized trees in the k-d forest (--matcher kdforest)",
+    )
+    parser.add_argument(
+        "--kd-leaf-size",
+        type=int,
+        default=32,
+        help="Maximum points per k-d forest leaf (--matcher kdforest)",
+    )
     parser.add_argument(
         "--ransac-iters",
         type=int,
@@ -112,17 +491,118 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         default=3.0,
         help="Inlier threshold (pixels) used during RANSAC",
     )
+    parser.add_argument(
+        "--ransac-seed",
+        type=int,
+        default=42,
+        help="Seed for RANSAC sampling (negative = unseeded NumPy sampling)",
+    )
+    parser.add_argument(
+        "--ransac-adaptive",
+        action="store_true",
+        help="Stop RANSAC early once --ransac-confidence is reached (--ransac-iters is the cap)",
+    )
+    parser.add_argument(
+        "--ransac-confidence",
+        type=float,
+        default=0.99,
+        help="Confidence used by --ransac-adaptive to bound the iteration count",
+    )
+    parser.add_argument(
+        "--ransac-sampler",
+        choices=RANSAC_SAMPLERS,
+        default="uniform",
+        help="Minimal-set sampler: uniform, or PROSAC ordered by match distance",
+    )
+    parser.add_argument(
+        "--refine",
+        choices=HOMOGRAPHY_REFINEMENTS,
+        default="none",
+        help=(
+            "Final homography refinement on the RANSAC inliers: none, normalised "
+            "least-squares DLT, or DLT followed by Levenberg-Marquardt"
+        ),
+    )
+    parser.add_argument(
+        "--guided",
+        action="store_true",
+        help="Second matching pass restricted to the neighbourhood predicted by the RANSAC homography",
+    )
+    parser.add_argument(
+        "--guided-radius",
+        type=float,
+        default=8.0,
+        help="Search radius (pixels in image B) of the --guided pass",
+    )
+    parser.add_argument(
+        "--guided-ratio",
+        type=float,
+        default=0.9,
+        help="Ratio test applied among the --guided candidates of each keypoint",
+    )
     parser.add_argument(
         "--output-dir",
         type=Path,
         default=Path("output/task2"),
         help="Directory that will store diagnostic artefacts",
     )
-    return parser.parse_args(argv)
-
-
-def load_image(path: Path, resize_width: int | None) -> np.ndarray:
-    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run each stage under cProfile and dump the slowest stage's stats",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Record the tracemalloc peak of each stage (implied by --profile)",
+    )
+    parser.add_argument(
+        "--feature-cache",
+        type=Path,
+        default=None,
+        help="Directory of the on-disk keypoint/descriptor cache (disabled if omitted)",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=1024.0,
+        help="Size bound of --feature-cache; least recently used entries are evicted",
+    )
+    args = parser.parse_args(argv)
+    if args.batch_manifest and args.batch_dir:
+        parser.error("--batch-manifest and --batch-dir are mutually exclusive")
+    if not (args.batch_manifest or args.batch_dir) and (args.image_a is None or args.image_b is None):
+        parser.error("--image-a and --image-b are required unless a batch mode is selected")
+    if args.tile_size and args.tile_margin is not None and 2 * args.tile_margin > args.tile_size:
+        parser.error("--tile-margin must not exceed half of --tile-size")
+    return args
+
+
+def open_image_source(
+    path: Path, raw_shape: Sequence[int] | None = None, raw_dtype: str = "uint8"
+) -> np.ndarray:
+    """Memory-map an ``.npy`` or headerless ``.raw`` image without reading it.
+
+    Raw files need ``raw_shape`` (rows, cols[, channels]).  Colour images are
+    expected in BGR order, like ``cv2.imread`` output.
+    """
+    if path.suffix.lower() == ".npy":
+        return np.load(path, mmap_mode="r")
+    if raw_shape is None:
+        raise ValueError(f"--raw-shape is required to read {path}")
+    return np.memmap(path, dtype=np.dtype(raw_dtype), mode="r", shape=tuple(raw_shape))
+
+
+def load_image(
+    path: Path,
+    resize_width: int | None,
+    raw_shape: Sequence[int] | None = None,
+    raw_dtype: str = "uint8",
+) -> np.ndarray:
+    if path.suffix.lower() in MEMMAP_SUFFIXES:
+        image = _to_bgr_u8(open_image_source(path, raw_shape, raw_dtype))
+    else:
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
     if image is None:
         raise FileNotFoundError(f"Unable to read image: {path}")
     if resize_width and image.shape[1] > resize_width:
@@ -132,6 +612,36 @@ def load_image(path: Path, resize_width: int | None) -> np.ndarray:
     return image
 
 
+def _to_bgr_u8(image: np.ndarray) -> np.ndarray:
+    """In-memory uint8 BGR copy of a (memory-mapped) gray/BGR image."""
+    image = np.asarray(image)
+    if image.dtype != np.uint8:
+        scaled = image.astype(np.float32) * (255.0 / _dtype_scale(image.dtype))
+        image = np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+
+def _to_gray_float_tile(tile: np.ndarray) -> np.ndarray:
+    """float32 gray in [0, 1] from a gray/BGR tile of any dtype.
+
+    uint8 BGR input gives exactly ``to_grayscale_float``'s result.
+    """
+    tile = np.asarray(tile)
+    scale = _dtype_scale(tile.dtype)
+    if tile.ndim == 3:
+        if tile.dtype == np.uint8:
+            tile = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+        else:
+            tile = cv2.cvtColor(tile.astype(np.float32), cv2.COLOR_BGR2GRAY)
+    return tile.astype(np.float32) / scale
+
+
+def _dtype_scale(dtype: np.dtype) -> float:
+    return float(np.iinfo(dtype).max) if np.issubdtype(dtype, np.integer) else 1.0
+
+
 def to_grayscale_float(image_bgr: np.ndarray) -> np.ndarray:
     gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
     return gray.astype(np.float32) / 255.0
@@ -149,28 +659,269 @@ class SIFTFromScratch:
         sigma: float = 1.6,
         contrast_threshold: float = 0.04,
         edge_threshold: float = 10.0,
+        extrema_engine: str = "vectorized",
+        orientation_engine: str = "batched",
+        descriptor_engine: str = "vectorized",
+        batch_size: int = 256,
+        workers: int = 1,
+        reuse_buffers: bool = True,
+        subpixel: bool = True,
+        descriptor: str = "sift",
     ) -> None:
+        if extrema_engine not in EXTREMA_ENGINES:
+            raise ValueError(f"Unknown extrema engine: {extrema_engine}")
+        if orientation_engine not in ORIENTATION_ENGINES:
+            raise ValueError(f"Unknown orientation engine: {orientation_engine}")
+        if descriptor_engine not in DESCRIPTOR_ENGINES:
+            raise ValueError(f"Unknown descriptor engine: {descriptor_engine}")
+        if descriptor not in DESCRIPTOR_TYPES:
+            raise ValueError(f"Unknown descriptor type: {descriptor}")
         self.num_octaves = num_octaves
         self.num_scales = num_scales
         self.sigma = sigma
         self.contrast_threshold = contrast_threshold
         self.edge_threshold = edge_threshold
+        self.extrema_engine = extrema_engine
+        self.orientation_engine = orientation_engine
+        self.descriptor_engine = descriptor_engine
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        # Optional StageProfiler; not part of _config, workers run unprofiled.
+        self.profiler: StageProfiler | None = None
+        self.reuse_buffers = reuse_buffers
+        self.subpixel = subpixel
+        self.descriptor = descriptor
+        self._buffers: _PyramidBuffers | None = None
 
     # ------------------------ Public API ---------------------------------
 
     def detect_and_compute(
         self, image_gray: np.ndarray
-    ) -> Tuple[List[Keypoint], np.ndarray]:
-        base = cv2.GaussianBlur(image_gray, (0, 0), self.sigma, borderType=cv2.BORDER_REPLICATE)
-        gaussian_pyramid = self._build_gaussian_pyramid(base)
-        dog_pyramid = self._build_dog_pyramid(gaussian_pyramid)
-        keypoints = self._find_scale_space_extrema(gaussian_pyramid, dog_pyramid)
-        oriented_keypoints = self._assign_orientations(keypoints, gaussian_pyramid)
-        descriptors = self._compute_descriptors(oriented_keypoints, gaussian_pyramid)
+    ) -> Tuple[KeypointSet, np.ndarray]:
+        with _stage(self.profiler, "pyramid") as record:
+            gaussian_pyramid, dog_pyramid = self._build_pyramids(image_gray)
+            record["items"] = sum(len(octave) for octave in gaussian_pyramid)
+        if self.workers > 1 and len(gaussian_pyramid) > 1:
+            with _stage(self.profiler, "octaves_parallel") as record:
+                keypoints, descriptors = self._detect_octaves_parallel(
+                    gaussian_pyramid, dog_pyramid
+                )
+                record["items"] = len(keypoints)
+            return keypoints, descriptors
+        return self._detect_from_pyramids(gaussian_pyramid, dog_pyramid)
+
+    def _detect_from_pyramids(
+        self,
+        gaussian_pyramid: List[List[np.ndarray]],
+        dog_pyramid: List[List[np.ndarray]],
+    ) -> Tuple[KeypointSet, np.ndarray]:
+        with _stage(self.profiler, "extrema") as record:
+            keypoints = self._find_scale_space_extrema(gaussian_pyramid, dog_pyramid)
+            record["items"] = len(keypoints)
+        gradients = _GradientCache(gaussian_pyramid)
+        with _stage(self.profiler, "orientation") as record:
+            oriented_keypoints = self._assign_orientations(
+                keypoints, gaussian_pyramid, gradients
+            )
+            record["items"] = len(oriented_keypoints)
+        with _stage(self.profiler, "descriptors") as record:
+            descriptors = self._compute_descriptors(
+                oriented_keypoints, gaussian_pyramid, gradients
+            )
+            record["items"] = len(descriptors)
         return oriented_keypoints, descriptors
 
+    def _config(self) -> Dict[str, object]:
+        """Constructor arguments needed to rebuild this detector in a worker."""
+        return {
+            "num_octaves": self.num_octaves,
+            "num_scales": self.num_scales,
+            "sigma": self.sigma,
+            "contrast_threshold": self.contrast_threshold,
+            "edge_threshold": self.edge_threshold,
+            "extrema_engine": self.extrema_engine,
+            "orientation_engine": self.orientation_engine,
+            "descriptor_engine": self.descriptor_engine,
+            "batch_size": self.batch_size,
+            "subpixel": self.subpixel,
+            "descriptor": self.descriptor,
+        }
+
+    # ----------------------- Parallel execution --------------------------
+
+    def _detect_octaves_parallel(
+        self,
+        gaussian_pyramid: List[List[np.ndarray]],
+        dog_pyramid: List[List[np.ndarray]],
+    ) -> Tuple[KeypointSet, np.ndarray]:
+        """Run extrema/orientation/descriptors for each octave in a process pool.
+
+        Each octave's Gaussian and DoG stacks are copied once into shared
+        memory; workers attach to them by name instead of receiving pickled
+        arrays.  Results are concatenated in octave order, which is the order
+        the serial pipeline produces, so keypoint indices are stable.
+        """
+        blocks: List[shared_memory.SharedMemory] = []
+        jobs = []
+        try:
+            for octave_idx, (gauss_octave, dog_octave) in enumerate(
+                zip(gaussian_pyramid, dog_pyramid)
+            ):
+                specs = []
+                for stack in (gauss_octave, dog_octave):
+                    block, spec = _to_shared_stack(stack)
+                    blocks.append(block)
+                    specs.append(spec)
+                jobs.append((octave_idx, specs[0], specs[1]))
+
+            config = self._config()
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                futures = [
+                    pool.submit(_detect_octave_worker, config, octave_idx, g_spec, d_spec)
+                    for octave_idx, g_spec, d_spec in jobs
+                ]
+                results = [future.result() for future in futures]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        keypoints = KeypointSet.concatenate([octave_keypoints for octave_keypoints, _ in results])
+        descriptors = np.vstack([octave_descriptors for _, octave_descriptors in results])
+        return keypoints, descriptors
+
     # ----------------------- Pyramid construction ------------------------
 
+    def detect_and_compute_tiled(
+        self, image: np.ndarray, tile_size: int = 2048, margin: int | None = None
+    ) -> Tuple[KeypointSet, np.ndarray]:
+        """``detect_and_compute`` over overlapping tiles of ``image``.
+
+        ``image`` may be any gray/BGR array, including a ``np.memmap``; only
+        one padded tile is read and converted at a time, so peak memory
+        follows ``(tile_size + 2 * margin) ** 2`` rather than the image size.
+        Tile origins are multiples of the coarsest octave step, so every tile
+        samples the same pyramid grid as the whole image.  Each keypoint is
+        kept only by the tile whose core contains its (integer) sample
+        position, which removes the duplicates detected in the overlaps.
+
+        The default ``margin`` is the largest per-octave :meth:`tile_margin`
+        that fits in half a tile, so a padded tile is at most twice the tile
+        size per side.  Keypoints of the octaves it covers match whole-image
+        detection exactly; coarser keypoints within their (larger) support of
+        a tile border may be missed or get clipped descriptors.  Pass
+        ``margin=self.tile_margin()`` for exact results at any tile size.
+        """
+        rows, cols = image.shape[:2]
+        align = 2 ** (self.num_octaves - 1)
+        tile_size = max(align, tile_size // align * align)
+        if margin is None:
+            margin = self.tile_margin(0)
+            for octave in range(1, self.num_octaves):
+                if 2 * self.tile_margin(octave) > tile_size:
+                    break
+                margin = self.tile_margin(octave)
+        else:
+            margin = -(-margin // align) * align
+        keypoint_sets: List[KeypointSet] = []
+        descriptor_blocks: List[np.ndarray] = []
+        for y0 in range(0, rows, tile_size):
+            for x0 in range(0, cols, tile_size):
+                y1, x1 = min(y0 + tile_size, rows), min(x0 + tile_size, cols)
+                py0, px0 = max(0, y0 - margin), max(0, x0 - margin)
+                py1, px1 = min(rows, y1 + margin), min(cols, x1 + margin)
+                tile = _to_gray_float_tile(image[py0:py1, px0:px1])
+                keypoints, descriptors = self.detect_and_compute(tile)
+                if not len(keypoints):
+                    continue
+                step = 2.0 ** keypoints.octave
+                sample_x = np.rint(keypoints.x / step) * step + px0
+                sample_y = np.rint(keypoints.y / step) * step + py0
+                owned = (
+                    (sample_x >= x0) & (sample_x < x1) & (sample_y >= y0) & (sample_y < y1)
+                )
+                keypoints = keypoints[owned]
+                keypoints.x += px0
+                keypoints.y += py0
+                keypoint_sets.append(keypoints)
+                descriptor_blocks.append(descriptors[owned])
+        if not descriptor_blocks:
+            return KeypointSet(), self._empty_descriptors()
+        return KeypointSet.concatenate(keypoint_sets), np.vstack(descriptor_blocks)
+
+    def tile_margin(self, octave: int | None = None) -> int:
+        """Full-resolution tile overlap covering a keypoint's support.
+
+        Sum of the descriptor window (``4 * sigma`` octave pixels, the
+        largest of the per-keypoint windows) of the coarsest keypoint scale
+        of ``octave`` (default: the coarsest octave) and the 4-sigma support
+        of that octave's coarsest blur, rounded up to the coarsest octave
+        step.  The support grows about fourfold per octave: 1104 px for the
+        coarsest of the default 4 octaves against 40 px for octave 0.
+        """
+        if octave is None:
+            octave = self.num_octaves - 1
+        step = 2**octave
+        max_kp_sigma = self.sigma * step * 2 ** ((self.num_scales + 0.5) / self.num_scales)
+        max_blur = self.sigma * step * 2 ** ((self.num_scales + 2) / self.num_scales)
+        support = step * (4 * max_kp_sigma + 2) + 4 * max_blur
+        align = 2 ** (self.num_octaves - 1)
+        return int(math.ceil(support / align)) * align
+
+
+    def _build_pyramids(
+        self, image_gray: np.ndarray
+    ) -> Tuple[List[List[np.ndarray]], List[List[np.ndarray]]]:
+        """Gaussian and DoG pyramids of ``image_gray`` (base blur included).
+
+        With ``reuse_buffers`` the levels are views into float32 stacks that
+        are allocated once per input size and overwritten on the next call;
+        otherwise every level is a fresh array.
+        """
+        if not self.reuse_buffers:
+            base = cv2.GaussianBlur(
+                image_gray, (0, 0), self.sigma, borderType=cv2.BORDER_REPLICATE
+            )
+            gaussian_pyramid = self._build_gaussian_pyramid(base)
+            return gaussian_pyramid, self._build_dog_pyramid(gaussian_pyramid)
+
+        image = np.asarray(image_gray, dtype=np.float32)
+        if self._buffers is None or self._buffers.shape != image.shape:
+            self._buffers = _PyramidBuffers(image.shape, self.num_octaves, self.num_scales)
+        buffers = self._buffers
+        k = 2 ** (1 / self.num_scales)
+        for octave_idx, (gauss, dog) in enumerate(zip(buffers.gaussian, buffers.dog)):
+            if octave_idx == 0:
+                cv2.GaussianBlur(
+                    image, (0, 0), self.sigma, dst=gauss[0], borderType=cv2.BORDER_REPLICATE
+                )
+            else:
+                # Same nearest-neighbour halving of layer -3 as the allocating path.
+                cv2.resize(
+                    buffers.gaussian[octave_idx - 1][-3],
+                    (gauss.shape[2], gauss.shape[1]),
+                    dst=gauss[0],
+                    interpolation=cv2.INTER_NEAREST,
+                )
+            sigma_prev = self.sigma
+            for scale_idx in range(1, self.num_scales + 3):
+                sigma_total = self.sigma * (k ** scale_idx)
+                sigma_diff = math.sqrt(max(sigma_total**2 - sigma_prev**2, 1e-6))
+                cv2.GaussianBlur(
+                    gauss[scale_idx - 1],
+                    (0, 0),
+                    sigma_diff,
+                    dst=gauss[scale_idx],
+                    borderType=cv2.BORDER_REPLICATE,
+                )
+                sigma_prev = sigma_total
+            for i in range(1, len(gauss)):
+                cv2.subtract(gauss[i], gauss[i - 1], dst=dog[i - 1])
+        return (
+            [list(stack) for stack in buffers.gaussian],
+            [list(stack) for stack in buffers.dog],
+        )
+
     def _build_gaussian_pyramid(self, base: np.ndarray) -> List[List[np.ndarray]]:
         pyramid: List[List[np.ndarray]] = []
         k = 2 ** (1 / self.num_scales)
@@ -223,6 +974,111 @@ class SIFTFromScratch:
         self,
         gaussian_pyramid: List[List[np.ndarray]],
         dog_pyramid: List[List[np.ndarray]],
+    ) -> KeypointSet:
+        if self.extrema_engine == "vectorized":
+            keypoints = self._find_scale_space_extrema_vectorized(dog_pyramid)
+        else:
+            keypoints = KeypointSet.from_keypoints(
+                self._find_scale_space_extrema_loop(gaussian_pyramid, dog_pyramid)
+            )
+        if self.subpixel:
+            keypoints = self._refine_subpixel(keypoints, dog_pyramid)
+        return keypoints
+
+    def _refine_subpixel(
+        self, keypoints: KeypointSet, dog_pyramid: List[List[np.ndarray]]
+    ) -> KeypointSet:
+        """Quadratic (Taylor) interpolation of x, y and scale for all extrema.
+
+        The DoG gradient ``g`` and Hessian ``H`` are taken by finite
+        differences and the offset ``-H^-1 g`` is solved for every candidate
+        of an octave at once.  Candidates whose offset is >= 0.5 in any
+        dimension move to the neighbouring sample and are refitted, up to
+        ``SUBPIXEL_MAX_STEPS`` times.  Candidates that leave the volume, never
+        converge, have a singular Hessian, or whose interpolated contrast
+        falls below the threshold are dropped; the others keep their order.
+        """
+        if len(keypoints) == 0:
+            return keypoints
+        threshold = self.contrast_threshold / self.num_scales
+        keep = np.zeros(len(keypoints), dtype=bool)
+        x_out = keypoints.x.copy()
+        y_out = keypoints.y.copy()
+        layer_out = keypoints.layer.copy()
+        sigma_out = keypoints.sigma.copy()
+
+        for octave_idx in np.unique(keypoints.octave):
+            idx = np.flatnonzero(keypoints.octave == octave_idx)
+            volume = _stack_levels(dog_pyramid[octave_idx])
+            n_layers, rows, cols = volume.shape
+            scale = 2 ** int(octave_idx)
+            s = keypoints.layer[idx].astype(np.int64)
+            y = np.rint(keypoints.y[idx] / scale).astype(np.int64)
+            x = np.rint(keypoints.x[idx] / scale).astype(np.int64)
+            offset = np.zeros((len(idx), 3))
+            contrast = np.zeros(len(idx))
+            converged = np.zeros(len(idx), dtype=bool)
+            active = np.ones(len(idx), dtype=bool)
+
+            for _ in range(SUBPIXEL_MAX_STEPS):
+                current = np.flatnonzero(active)
+                if current.size == 0:
+                    break
+                value, grad, hessian = _dog_derivatives(
+                    volume, s[current], y[current], x[current]
+                )
+                solvable = np.abs(np.linalg.det(hessian)) > 1e-12
+                step = np.zeros((current.size, 3))
+                step[solvable] = -np.linalg.solve(
+                    hessian[solvable], grad[solvable][..., None]
+                )[..., 0]
+                done = solvable & (np.abs(step).max(axis=1) < 0.5)
+                offset[current[done]] = step[done]
+                contrast[current[done]] = value[done] + 0.5 * np.einsum(
+                    "ij,ij->i", grad[done], step[done]
+                )
+                converged[current[done]] = True
+                active[current[~solvable | done]] = False
+
+                moving = current[solvable & ~done]
+                shift = np.sign(step[solvable & ~done]) * np.floor(
+                    np.abs(step[solvable & ~done]) + 0.5
+                )
+                x[moving] += shift[:, 0].astype(np.int64)
+                y[moving] += shift[:, 1].astype(np.int64)
+                s[moving] += shift[:, 2].astype(np.int64)
+                inside = (
+                    (s[moving] >= 1)
+                    & (s[moving] <= n_layers - 2)
+                    & (y[moving] >= 1)
+                    & (y[moving] <= rows - 2)
+                    & (x[moving] >= 1)
+                    & (x[moving] <= cols - 2)
+                )
+                active[moving[~inside]] = False
+
+            accepted = converged & (np.abs(contrast) >= threshold)
+            keep[idx] = accepted
+            x_out[idx] = (x + offset[:, 0]) * scale
+            y_out[idx] = (y + offset[:, 1]) * scale
+            layer_out[idx] = s
+            sigma_out[idx] = (
+                self.sigma * scale * 2 ** ((s + offset[:, 2]) / self.num_scales)
+            )
+
+        return KeypointSet(
+            x=x_out[keep],
+            y=y_out[keep],
+            octave=keypoints.octave[keep],
+            layer=layer_out[keep],
+            sigma=sigma_out[keep],
+            orientation=keypoints.orientation[keep],
+        )
+
+    def _find_scale_space_extrema_loop(
+        self,
+        gaussian_pyramid: List[List[np.ndarray]],
+        dog_pyramid: List[List[np.ndarray]],
     ) -> List[Keypoint]:
         keypoints: List[Keypoint] = []
         threshold = self.contrast_threshold / self.num_scales
@@ -264,6 +1120,65 @@ class SIFTFromScratch:
 
         return keypoints
 
+    def _find_scale_space_extrema_vectorized(
+        self, dog_pyramid: List[List[np.ndarray]]
+    ) -> KeypointSet:
+        """Whole-array equivalent of :meth:`_find_scale_space_extrema_loop`.
+
+        Each octave's DoG layers are stacked into a (layers, rows, cols) volume
+        and the 26-neighbour test, contrast mask and Hessian edge test are
+        evaluated for every interior sample at once.  Candidates are emitted in
+        the same (layer, y, x) order as the loop implementation.
+        """
+        octave_sets: List[KeypointSet] = []
+        threshold = self.contrast_threshold / self.num_scales
+
+        for octave_idx, dog_octave in enumerate(dog_pyramid):
+            if len(dog_octave) < 3:
+                continue
+            volume = _stack_levels(dog_octave)
+            _, rows, cols = volume.shape
+            if rows < 3 or cols < 3:
+                continue
+            centre = volume[1:-1, 1:-1, 1:-1]
+            neigh_max, neigh_min = _neighbourhood_max_min(volume)
+            candidates = (np.abs(centre) >= threshold) & (
+                ((centre > 0) & (centre == neigh_max))
+                | ((centre < 0) & (centre == neigh_min))
+            )
+
+            # Hessian edge test on the current layer (same finite differences
+            # as ``_is_edge_response``).
+            dxx = volume[1:-1, 1:-1, 2:] + volume[1:-1, 1:-1, :-2] - 2 * centre
+            dyy = volume[1:-1, 2:, 1:-1] + volume[1:-1, :-2, 1:-1] - 2 * centre
+            dxy = (
+                volume[1:-1, 2:, 2:]
+                + volume[1:-1, :-2, :-2]
+                - volume[1:-1, 2:, :-2]
+                - volume[1:-1, :-2, 2:]
+            )
+            candidates &= ~self._edge_rejected(dxx + dyy, dxx * dyy - dxy**2)
+
+            layers, ys, xs = np.nonzero(candidates)
+            scale = 2**octave_idx
+            layer_sigmas = np.array(
+                [
+                    self.sigma * (2 ** octave_idx) * (2 ** (layer_idx / self.num_scales))
+                    for layer_idx in range(len(dog_octave))
+                ]
+            )
+            octave_sets.append(
+                KeypointSet(
+                    x=(xs + 1) * scale,
+                    y=(ys + 1) * scale,
+                    octave=np.full(len(xs), octave_idx),
+                    layer=layers + 1,
+                    sigma=layer_sigmas[layers + 1],
+                )
+            )
+
+        return KeypointSet.concatenate(octave_sets)
+
     def _is_edge_response(self, image: np.ndarray, x: int, y: int) -> bool:
         dxx = image[y, x + 1] + image[y, x - 1] - 2 * image[y, x]
         dyy = image[y + 1, x] + image[y - 1, x] - 2 * image[y, x]
@@ -273,17 +1188,36 @@ class SIFTFromScratch:
             - image[y + 1, x - 1]
             - image[y - 1, x + 1]
         )
-        tr = dxx + dyy
-        det = dxx * dyy - dxy**2
-        if det <= 0:
-            return True
-        r = (self.edge_threshold + 1) ** 2 / self.edge_threshold
-        return (tr * tr) * r >= det
+        return bool(self._edge_rejected(dxx + dyy, dxx * dyy - dxy**2))
+
+    def _edge_rejected(self, tr, det):
+        """Edge-response predicate shared by both extrema engines.
+
+        Works element-wise, so ``tr``/``det`` may be scalars or arrays.  A
+        candidate is kept when ``tr^2 / det < (r + 1)^2 / r`` (Lowe 2004).
+        """
+        r = self.edge_threshold
+        return (det <= 0) | ((tr * tr) * r >= (r + 1) ** 2 * det)
 
     # ----------------------- Orientation assignment ----------------------
 
     def _assign_orientations(
-        self, keypoints: List[Keypoint], gaussian_pyramid: List[List[np.ndarray]]
+        self,
+        keypoints: KeypointSet,
+        gaussian_pyramid: List[List[np.ndarray]],
+        gradients: "_GradientCache | None" = None,
+    ) -> KeypointSet:
+        keypoints = KeypointSet.from_keypoints(keypoints)
+        if self.orientation_engine == "batched":
+            if gradients is None:
+                gradients = _GradientCache(gaussian_pyramid)
+            return self._assign_orientations_batched(keypoints, gradients)
+        return KeypointSet.from_keypoints(
+            self._assign_orientations_loop(keypoints, gaussian_pyramid)
+        )
+
+    def _assign_orientations_loop(
+        self, keypoints: Iterable[Keypoint], gaussian_pyramid: List[List[np.ndarray]]
     ) -> List[Keypoint]:
         oriented: List[Keypoint] = []
         for kp in keypoints:
@@ -333,10 +1267,82 @@ class SIFTFromScratch:
 
         return oriented
 
+    def _assign_orientations_batched(
+        self, keypoints: KeypointSet, gradients: "_GradientCache"
+    ) -> KeypointSet:
+        """Batched equivalent of :meth:`_assign_orientations_loop`.
+
+        Keypoints sharing a pyramid level and window radius are gathered
+        together from the cached gradient images and accumulated with
+        ``np.add.at``; the Gaussian weight uses each keypoint's own sigma
+        (which varies within a level after sub-pixel refinement).
+        Contributions are added in the same (keypoint, dy, dx) order and
+        float32 precision as the loop, so the selected peaks are unchanged.
+        """
+        if not len(keypoints):
+            return KeypointSet()
+        hists = np.zeros((len(keypoints), 36), dtype=np.float32)
+        all_radii = np.rint(3 * keypoints.sigma).astype(np.int64)
+        for (octave, layer), level_indices in _group_by_level(keypoints).items():
+            magnitude, angle = gradients.get(octave, layer)
+            rows, cols = magnitude.shape[0] + 2, magnitude.shape[1] + 2
+            for radius, indices in _split_by(level_indices, all_radii):
+                offsets = np.arange(-radius, radius + 1)
+                dy, dx = np.meshgrid(offsets, offsets, indexing="ij")
+                dy, dx = dy.ravel(), dx.ravel()
+                squared_dist = dx * dx + dy * dy
+
+                for batch in self._batches(indices, len(dx)):
+                    weight_factor = -0.5 / keypoints.sigma[batch] ** 2
+                    weights = np.exp(weight_factor[:, None] * squared_dist[None, :])
+                    xs = np.rint(keypoints.x[batch] / (2**octave)).astype(np.int64)
+                    ys = np.rint(keypoints.y[batch] / (2**octave)).astype(np.int64)
+                    yy = ys[:, None] + dy[None, :]
+                    xx = xs[:, None] + dx[None, :]
+                    valid = (yy > 0) & (yy < rows - 1) & (xx > 0) & (xx < cols - 1)
+                    kp_rows, window_pos = np.nonzero(valid)
+                    gy_idx = yy[kp_rows, window_pos] - 1
+                    gx_idx = xx[kp_rows, window_pos] - 1
+                    mags = magnitude[gy_idx, gx_idx]
+                    bins = (
+                        np.round(np.mod(angle[gy_idx, gx_idx], 360) / 10).astype(np.int64)
+                        % 36
+                    )
+                    contrib = (weights[kp_rows, window_pos] * mags).astype(np.float32)
+                    flat = np.zeros(len(batch) * 36, dtype=np.float32)
+                    np.add.at(flat, kp_rows * 36 + bins, contrib)
+                    hists[batch] = flat.reshape(len(batch), 36)
+
+        max_vals = hists.max(axis=1)
+        peaks = (hists >= 0.8 * max_vals[:, None]) & (max_vals[:, None] != 0)
+        kp_idx, bin_idx = np.nonzero(peaks)
+        return keypoints[kp_idx].with_orientation(np.radians((bin_idx * 10) % 360))
+
+    def _batches(self, indices: np.ndarray, window_len: int) -> Iterable[np.ndarray]:
+        """Split ``indices`` into chunks bounded by ``batch_size`` and memory."""
+        step = max(1, min(self.batch_size, BATCH_SAMPLE_BUDGET // max(window_len, 1)))
+        for start in range(0, len(indices), step):
+            yield np.asarray(indices[start : start + step])
+
     # ----------------------- Descriptor computation ----------------------
 
     def _compute_descriptors(
-        self, keypoints: List[Keypoint], gaussian_pyramid: List[List[np.ndarray]]
+        self,
+        keypoints: KeypointSet,
+        gaussian_pyramid: List[List[np.ndarray]],
+        gradients: "_GradientCache | None" = None,
+    ) -> np.ndarray:
+        keypoints = KeypointSet.from_keypoints(keypoints)
+        if self.descriptor == "binary":
+            return self._compute_binary_descriptors(keypoints, gaussian_pyramid)
+        if self.descriptor_engine == "vectorized":
+            if gradients is None:
+                gradients = _GradientCache(gaussian_pyramid)
+            return self._compute_descriptors_vectorized(keypoints, gradients)
+        return self._compute_descriptors_loop(keypoints, gaussian_pyramid)
+
+    def _compute_descriptors_loop(
+        self, keypoints: Iterable[Keypoint], gaussian_pyramid: List[List[np.ndarray]]
     ) -> np.ndarray:
         descriptors: List[np.ndarray] = []
         for kp in keypoints:
@@ -393,34 +1399,730 @@ class SIFTFromScratch:
             descriptors.append(vec)
 
         if not descriptors:
-            return np.zeros((0, 128), dtype=np.float32)
+            return self._empty_descriptors()
         return np.vstack(descriptors)
 
+    def _empty_descriptors(self) -> np.ndarray:
+        if self.descriptor == "binary":
+            return np.zeros((0, BINARY_DESCRIPTOR_BITS // 8), dtype=np.uint8)
+        return np.zeros((0, 128), dtype=np.float32)
+
+    def _compute_binary_descriptors(
+        self, keypoints: KeypointSet, gaussian_pyramid: List[List[np.ndarray]]
+    ) -> np.ndarray:
+        """Steered BRIEF descriptors packed into uint8 rows.
+
+        Every bit compares two samples of the keypoint's (already smoothed)
+        Gaussian level at a fixed random point pair.  The pair is rotated by
+        the keypoint orientation and scaled to the SIFT descriptor window, so
+        the binary and float descriptors describe the same support.
+        """
+        pattern = _brief_pattern(BINARY_DESCRIPTOR_BITS)
+        descriptors = np.zeros((len(keypoints), BINARY_DESCRIPTOR_BITS // 8), dtype=np.uint8)
+        for (octave, layer), indices in _group_by_level(keypoints).items():
+            image = gaussian_pyramid[octave][layer]
+            for batch in self._batches(indices, 2 * len(pattern)):
+                cos_o = np.cos(keypoints.orientation[batch])[:, None]
+                sin_o = np.sin(keypoints.orientation[batch])[:, None]
+                half_width = (np.rint(8 * keypoints.sigma[batch]) // 2)[:, None]
+                base_x = (keypoints.x[batch] / (2**octave))[:, None]
+                base_y = (keypoints.y[batch] / (2**octave))[:, None]
+                first = _sample_rotated(
+                    image, base_x, base_y, cos_o, sin_o, half_width, pattern[:, 0], pattern[:, 1]
+                )
+                second = _sample_rotated(
+                    image, base_x, base_y, cos_o, sin_o, half_width, pattern[:, 2], pattern[:, 3]
+                )
+                descriptors[batch] = np.packbits(first < second, axis=1)
+        return descriptors
+
+    def _compute_descriptors_vectorized(
+        self, keypoints: KeypointSet, gradients: "_GradientCache"
+    ) -> np.ndarray:
+        """Vectorized equivalent of :meth:`_compute_descriptors_loop`.
+
+        For every pyramid level and window size the rotated sampling grid of a
+        batch of keypoints is built at once, gradients are gathered from the cached
+        level images and binned into the 4x4x8 histogram with ``np.add.at``.
+        Normalisation, clipping and renormalisation run on the whole
+        (N, 128) matrix.
+        """
+        descriptors = np.zeros((len(keypoints), 128), dtype=np.float32)
+        all_windows = np.rint(8 * keypoints.sigma).astype(np.int64)
+        for (octave, layer), level_indices in _group_by_level(keypoints).items():
+            magnitude, angle = gradients.get(octave, layer)
+            rows, cols = magnitude.shape[0] + 2, magnitude.shape[1] + 2
+            for window_size, indices in _split_by(level_indices, all_windows):
+                half_width = window_size // 2
+                cell_width = half_width / 2 + 1e-5
+                offsets = np.arange(-half_width, half_width)
+                dy, dx = np.meshgrid(offsets, offsets, indexing="ij")
+                dy, dx = dy.ravel(), dx.ravel()
+                weights = np.exp(-((dx**2 + dy**2) / (2 * (0.5 * window_size) ** 2)))
+
+                for batch in self._batches(indices, len(dx)):
+                    orientation = keypoints.orientation[batch]
+                    cos_o = np.cos(orientation)[:, None]
+                    sin_o = np.sin(orientation)[:, None]
+                    base_x = keypoints.x[batch] / (2**octave)
+                    base_y = keypoints.y[batch] / (2**octave)
+
+                    rot_x = cos_o * dx - sin_o * dy
+                    rot_y = sin_o * dx + cos_o * dy
+                    ix = np.rint(rot_x + base_x[:, None]).astype(np.int64)
+                    iy = np.rint(rot_y + base_y[:, None]).astype(np.int64)
+                    cell_x = np.floor((rot_x + half_width) / cell_width).astype(np.int64)
+                    cell_y = np.floor((rot_y + half_width) / cell_width).astype(np.int64)
+                    valid = (
+                        (iy > 0)
+                        & (iy < rows - 1)
+                        & (ix > 0)
+                        & (ix < cols - 1)
+                        & (cell_x >= 0)
+                        & (cell_x < 4)
+                        & (cell_y >= 0)
+                        & (cell_y < 4)
+                    )
+                    kp_rows, window_pos = np.nonzero(valid)
+                    gy_idx = iy[kp_rows, window_pos] - 1
+                    gx_idx = ix[kp_rows, window_pos] - 1
+                    theta = np.mod(
+                        angle[gy_idx, gx_idx] - np.degrees(orientation[kp_rows]), 360
+                    )
+                    bins = np.rint(theta / 45).astype(np.int64) % 8
+                    contrib = (magnitude[gy_idx, gx_idx] * weights[window_pos]).astype(
+                        np.float32
+                    )
+                    cells = cell_y[kp_rows, window_pos] * 4 + cell_x[kp_rows, window_pos]
+                    flat = np.zeros(len(batch) * 128, dtype=np.float32)
+                    np.add.at(flat, kp_rows * 128 + cells * 8 + bins, contrib)
+                    descriptors[batch] = flat.reshape(len(batch), 128)
+
+        norms = np.linalg.norm(descriptors, axis=1)
+        keep = norms > 1e-6
+        normalised = descriptors[keep] / norms[keep, None]
+        np.clip(normalised, 0, 0.2, out=normalised)
+        normalised /= np.linalg.norm(normalised, axis=1, keepdims=True) + 1e-6
+        descriptors[keep] = normalised
+        return descriptors
+
+
+@functools.lru_cache(maxsize=None)
+def _brief_pattern(bits: int) -> np.ndarray:
+    """(bits, 4) test pairs ``x1, y1, x2, y2`` in units of the window half width.
+
+    Drawn once from an isotropic Gaussian with sigma = 0.4 (BRIEF's
+    ``S^2 / 25`` rule for a patch of side 2) and clipped to the window.
+    """
+    rng = np.random.default_rng(BRIEF_PATTERN_SEED)
+    return np.clip(rng.normal(0.0, 0.4, size=(bits, 4)), -1.0, 1.0)
+
+
+def _sample_rotated(
+    image: np.ndarray,
+    base_x: np.ndarray,
+    base_y: np.ndarray,
+    cos_o: np.ndarray,
+    sin_o: np.ndarray,
+    scale: np.ndarray,
+    px: np.ndarray,
+    py: np.ndarray,
+) -> np.ndarray:
+    """Nearest samples of ``image`` at pattern points rotated/scaled per keypoint."""
+    rows, cols = image.shape
+    x = (cos_o * px - sin_o * py) * scale + base_x
+    y = (sin_o * px + cos_o * py) * scale + base_y
+    ix = np.clip(np.rint(x).astype(np.int64), 0, cols - 1)
+    iy = np.clip(np.rint(y).astype(np.int64), 0, rows - 1)
+    return image[iy, ix]
+
+
+def _to_shared_stack(
+    images: List[np.ndarray],
+) -> Tuple[shared_memory.SharedMemory, Tuple[str, Tuple[int, ...]]]:
+    """Copy equally sized float32 images into one shared-memory stack."""
+    shape = (len(images),) + images[0].shape
+    block = shared_memory.SharedMemory(
+        create=True, size=max(1, int(np.prod(shape)) * np.dtype(np.float32).itemsize)
+    )
+    stack = np.ndarray(shape, dtype=np.float32, buffer=block.buf)
+    for idx, image in enumerate(images):
+        stack[idx] = image
+    return block, (block.name, shape)
+
+
+def _detect_octave_worker(
+    config: Dict[str, object],
+    octave_idx: int,
+    gaussian_spec: Tuple[str, Tuple[int, ...]],
+    dog_spec: Tuple[str, Tuple[int, ...]],
+) -> Tuple[KeypointSet, np.ndarray]:
+    """Process-pool entry point: run one octave from shared-memory stacks."""
+    gauss_block = shared_memory.SharedMemory(name=gaussian_spec[0])
+    dog_block = shared_memory.SharedMemory(name=dog_spec[0])
+    try:
+        gauss = np.ndarray(gaussian_spec[1], dtype=np.float32, buffer=gauss_block.buf)
+        dog = np.ndarray(dog_spec[1], dtype=np.float32, buffer=dog_block.buf)
+        # Other octaves are left empty: every stage indexes the pyramid by
+        # keypoint octave, and empty octaves yield no extrema.
+        gaussian_pyramid: List[List[np.ndarray]] = [[] for _ in range(octave_idx)]
+        dog_pyramid: List[List[np.ndarray]] = [[] for _ in range(octave_idx)]
+        gaussian_pyramid.append(list(gauss))
+        dog_pyramid.append(list(dog))
+        sift = SIFTFromScratch(**config)
+        keypoints, descriptors = sift._detect_from_pyramids(gaussian_pyramid, dog_pyramid)
+        # Drop views into the shared buffers before closing them.
+        del gauss, dog, gaussian_pyramid, dog_pyramid
+        return keypoints, np.array(descriptors)
+    finally:
+        gauss_block.close()
+        dog_block.close()
+
+
+class _PyramidBuffers:
+    """Preallocated float32 Gaussian/DoG stacks for one input size.
+
+    Octave ``o`` owns a ``(num_scales + 3, rows, cols)`` Gaussian stack and a
+    ``(num_scales + 2, rows, cols)`` DoG stack, with the same octave count and
+    halving rule as ``SIFTFromScratch._build_gaussian_pyramid``.
+    """
+
+    def __init__(self, shape: Tuple[int, int], num_octaves: int, num_scales: int) -> None:
+        self.shape = tuple(shape)
+        self.gaussian: List[np.ndarray] = []
+        self.dog: List[np.ndarray] = []
+        rows, cols = self.shape
+        for _ in range(num_octaves):
+            self.gaussian.append(np.empty((num_scales + 3, rows, cols), dtype=np.float32))
+            self.dog.append(np.empty((num_scales + 2, rows, cols), dtype=np.float32))
+            if rows <= 16 or cols <= 16:
+                break
+            rows, cols = rows // 2, cols // 2
+
+
+def _stack_levels(levels: List[np.ndarray]) -> np.ndarray:
+    """(levels, rows, cols) volume; no copy when ``levels`` are rows of one stack."""
+    stack = levels[0].base
+    if (
+        isinstance(stack, np.ndarray)
+        and stack.ndim == 3
+        and stack.shape[0] == len(levels)
+        and all(
+            level.base is stack and level.ctypes.data == stack[i].ctypes.data
+            for i, level in enumerate(levels)
+        )
+    ):
+        return stack
+    return np.stack(levels)
+
+
+def _dog_derivatives(
+    volume: np.ndarray, s: np.ndarray, y: np.ndarray, x: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Value, gradient (N, 3) and Hessian (N, 3, 3) of a DoG volume.
+
+    Central finite differences at integer samples; the axis order is
+    (x, y, scale).
+    """
+
+    def at(ds: int, dy: int, dx: int) -> np.ndarray:
+        return volume[s + ds, y + dy, x + dx].astype(np.float64)
+
+    value = at(0, 0, 0)
+    grad = np.stack(
+        [
+            (at(0, 0, 1) - at(0, 0, -1)) / 2,
+            (at(0, 1, 0) - at(0, -1, 0)) / 2,
+            (at(1, 0, 0) - at(-1, 0, 0)) / 2,
+        ],
+        axis=1,
+    )
+    dxx = at(0, 0, 1) + at(0, 0, -1) - 2 * value
+    dyy = at(0, 1, 0) + at(0, -1, 0) - 2 * value
+    dss = at(1, 0, 0) + at(-1, 0, 0) - 2 * value
+    dxy = (at(0, 1, 1) - at(0, 1, -1) - at(0, -1, 1) + at(0, -1, -1)) / 4
+    dxs = (at(1, 0, 1) - at(1, 0, -1) - at(-1, 0, 1) + at(-1, 0, -1)) / 4
+    dys = (at(1, 1, 0) - at(1, -1, 0) - at(-1, 1, 0) + at(-1, -1, 0)) / 4
+    hessian = np.stack(
+        [
+            np.stack([dxx, dxy, dxs], axis=1),
+            np.stack([dxy, dyy, dys], axis=1),
+            np.stack([dxs, dys, dss], axis=1),
+        ],
+        axis=1,
+    )
+    return value, grad, hessian
+
+
+def _group_by_level(keypoints: KeypointSet) -> Dict[Tuple[int, int], np.ndarray]:
+    """Map ``(octave, layer)`` to the (ascending) indices of keypoints on that level."""
+    levels = np.stack([keypoints.octave, keypoints.layer], axis=1)
+    unique, inverse = np.unique(levels, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    return {
+        (int(octave), int(layer)): np.nonzero(inverse == group)[0]
+        for group, (octave, layer) in enumerate(unique)
+    }
+
+
+def _split_by(indices: np.ndarray, keys: np.ndarray) -> Iterable[Tuple[int, np.ndarray]]:
+    """Split ``indices`` by the integer ``keys[indices]``, keeping their order."""
+    sub_keys = keys[indices]
+    for key in np.unique(sub_keys):
+        yield int(key), indices[sub_keys == key]
+
+
+class _GradientCache:
+    """Lazily computed gradient magnitude/angle images per pyramid level.
+
+    Uses the same central differences as the per-pixel loops.  Arrays cover
+    the interior of the level, i.e. entry ``[y - 1, x - 1]`` holds the
+    gradient at pixel ``(x, y)``.  Angles are in degrees, not yet wrapped.
+    """
+
+    def __init__(self, gaussian_pyramid: List[List[np.ndarray]]) -> None:
+        self._pyramid = gaussian_pyramid
+        self._levels: dict = {}
+
+    def get(self, octave: int, layer: int) -> Tuple[np.ndarray, np.ndarray]:
+        key = (octave, layer)
+        if key not in self._levels:
+            img = self._pyramid[octave][layer]
+            gx = img[1:-1, 2:] - img[1:-1, :-2]
+            gy = img[:-2, 1:-1] - img[2:, 1:-1]
+            magnitude = np.sqrt((gx * gx + gy * gy).astype(np.float64))
+            angle = np.degrees(np.arctan2(gy.astype(np.float64), gx.astype(np.float64)))
+            self._levels[key] = (magnitude, angle)
+        return self._levels[key]
+
+
+def _neighbourhood_max_min(volume: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Max/min over the 3x3x3 neighbourhood of every interior voxel."""
+    depth, rows, cols = volume.shape
+    # Start from the (0, 0, 0) offset and fold in the remaining 26 shifts.
+    neigh_max = volume[:-2, :-2, :-2].copy()
+    neigh_min = neigh_max.copy()
+    for dz in range(3):
+        for dy in range(3):
+            for dx in range(3):
+                if dz == dy == dx == 0:
+                    continue
+                shifted = volume[
+                    dz : depth - 2 + dz, dy : rows - 2 + dy, dx : cols - 2 + dx
+                ]
+                np.maximum(neigh_max, shifted, out=neigh_max)
+                np.minimum(neigh_min, shifted, out=neigh_min)
+    return neigh_max, neigh_min
+
 
 # ---------------------------------------------------------------------------
 # Matching + RANSAC helpers
 
 
 def match_descriptors(
-    desc_a: np.ndarray, desc_b: np.ndarray, ratio: float
+    desc_a: np.ndarray,
+    desc_b: np.ndarray,
+    ratio: float,
+    chunk_size: int = 1024,
+    cross_check: bool = False,
 ) -> List[Match]:
+    """Nearest-neighbour matching with Lowe's ratio test.
+
+    Squared distances are computed block-wise as ``|a|^2 + |b|^2 - 2 a.b^T``
+    for ``chunk_size`` rows of ``desc_a`` at a time, so memory stays bounded
+    by ``chunk_size x len(desc_b)``.  The two nearest candidates are found
+    with ``argpartition`` and their distances recomputed exactly before the
+    ratio test.  With ``cross_check`` only mutual nearest neighbours are kept.
+    """
     matches: List[Match] = []
-    if desc_a.size == 0 or desc_b.size == 0:
+    if desc_a.size == 0 or desc_b.size == 0 or len(desc_b) < 2:
         return matches
-    for idx_a, vector in enumerate(desc_a):
-        distances = np.linalg.norm(desc_b - vector, axis=1)
-        if len(distances) < 2:
-            continue
-        best_idx = np.argmin(distances)
-        best = distances[best_idx]
-        distances[best_idx] = np.inf
-        second = np.min(distances)
-        if best < ratio * second:
-            matches.append(Match(idx_a=idx_a, idx_b=int(best_idx), distance=float(best)))
-    return matches
+    desc_a = np.asarray(desc_a, dtype=np.float32)
+    desc_b = np.asarray(desc_b, dtype=np.float32)
+    chunk_size = max(1, chunk_size)
+    sq_norm_b = np.einsum("ij,ij->i", desc_b, desc_b)
+
+    best_b = np.empty(len(desc_a), dtype=np.int64)
+    best_dist = np.empty(len(desc_a), dtype=np.float64)
+    second_dist = np.empty(len(desc_a), dtype=np.float64)
+    # Best row of desc_a for every row of desc_b (only needed for cross-check).
+    reverse_best = np.zeros(len(desc_b), dtype=np.int64)
+    reverse_dist = np.full(len(desc_b), np.inf, dtype=np.float32)
+
+    for start in range(0, len(desc_a), chunk_size):
+        block = desc_a[start : start + chunk_size]
+        sq_dist = np.einsum("ij,ij->i", block, block)[:, None] + sq_norm_b[None, :]
+        sq_dist -= 2.0 * (block @ desc_b.T)
+        np.maximum(sq_dist, 0, out=sq_dist)
+
+        top2 = np.argpartition(sq_dist, 1, axis=1)[:, :2]
+        rows = np.arange(len(block))
+        first, second = top2[:, 0], top2[:, 1]
+        swap = sq_dist[rows, second] < sq_dist[rows, first]
+        first, second = np.where(swap, second, first), np.where(swap, first, second)
+        best_b[start : start + len(block)] = first
+        best_dist[start : start + len(block)] = np.linalg.norm(
+            desc_b[first] - block, axis=1
+        )
+        second_dist[start : start + len(block)] = np.linalg.norm(
+            desc_b[second] - block, axis=1
+        )
 
+        if cross_check:
+            col_best = np.argmin(sq_dist, axis=0)
+            col_dist = sq_dist[col_best, np.arange(len(desc_b))]
+            improved = col_dist < reverse_dist
+            reverse_dist[improved] = col_dist[improved]
+            reverse_best[improved] = col_best[improved] + start
+
+    return _ratio_test_matches(
+        best_b, best_dist, second_dist, ratio, reverse_best if cross_check else None
+    )
 
-def compute_homography(pairs: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+
+def hamming_distances(desc_a: np.ndarray, desc_b: np.ndarray) -> np.ndarray:
+    """(len(desc_a), len(desc_b)) Hamming distances of packed uint8 descriptors.
+
+    Rows whose length is a multiple of 8 bytes are XOR-ed as uint64 words and
+    counted through the 16-bit popcount table; others byte by byte.
+    """
+    desc_a = np.ascontiguousarray(desc_a, dtype=np.uint8)
+    desc_b = np.ascontiguousarray(desc_b, dtype=np.uint8)
+    if desc_a.shape[1] % 8 == 0:
+        xor = np.bitwise_xor(
+            desc_a.view(np.uint64)[:, None, :], desc_b.view(np.uint64)[None, :, :]
+        )
+        return _POPCOUNT_TABLE16[xor.view(np.uint16)].sum(axis=2, dtype=np.int32)
+    xor = np.bitwise_xor(desc_a[:, None, :], desc_b[None, :, :])
+    return _POPCOUNT_TABLE[xor].sum(axis=2, dtype=np.int32)
+
+
+def match_binary_descriptors(
+    desc_a: np.ndarray,
+    desc_b: np.ndarray,
+    ratio: float,
+    chunk_size: int = 1024,
+    cross_check: bool = False,
+) -> List[Match]:
+    """Hamming-distance counterpart of :func:`match_descriptors`.
+
+    XOR + popcount lookup table over blocks of ``desc_a`` rows (also bounded
+    by ``HAMMING_BLOCK_BUDGET``), then the same top-2 ratio test and
+    optional mutual-nearest-neighbour check.
+    """
+    matches: List[Match] = []
+    if desc_a.size == 0 or desc_b.size == 0 or len(desc_b) < 2:
+        return matches
+    desc_a = np.asarray(desc_a, dtype=np.uint8)
+    desc_b = np.asarray(desc_b, dtype=np.uint8)
+    chunk_size = max(1, min(chunk_size, HAMMING_BLOCK_BUDGET // max(desc_b.size, 1)))
+
+    best_b = np.empty(len(desc_a), dtype=np.int64)
+    best_dist = np.empty(len(desc_a), dtype=np.float64)
+    second_dist = np.empty(len(desc_a), dtype=np.float64)
+    reverse_best = np.zeros(len(desc_b), dtype=np.int64)
+    reverse_dist = np.full(len(desc_b), np.iinfo(np.int32).max, dtype=np.int32)
+
+    for start in range(0, len(desc_a), chunk_size):
+        block = desc_a[start : start + chunk_size]
+        dist = hamming_distances(block, desc_b)
+        top2 = np.sort(np.partition(dist, 1, axis=1)[:, :2], axis=1)
+        best = np.argmin(dist, axis=1)
+        best_b[start : start + len(block)] = best
+        best_dist[start : start + len(block)] = top2[:, 0]
+        second_dist[start : start + len(block)] = top2[:, 1]
+
+        if cross_check:
+            col_best = np.argmin(dist, axis=0)
+            col_dist = dist[col_best, np.arange(len(desc_b))]
+            improved = col_dist < reverse_dist
+            reverse_dist[improved] = col_dist[improved]
+            reverse_best[improved] = col_best[improved] + start
+
+    return _ratio_test_matches(
+        best_b, best_dist, second_dist, ratio, reverse_best if cross_check else None
+    )
+
+
+def _ratio_test_matches(
+    best_b: np.ndarray,
+    best_dist: np.ndarray,
+    second_dist: np.ndarray,
+    ratio: float,
+    reverse_best: np.ndarray | None = None,
+) -> List[Match]:
+    """Turn per-query top-2 results into ``Match`` objects (Lowe + mutual NN)."""
+    keep = best_dist < ratio * second_dist
+    if reverse_best is not None:
+        keep &= reverse_best[best_b] == np.arange(len(best_b))
+    return [
+        Match(idx_a=int(idx_a), idx_b=int(best_b[idx_a]), distance=float(best_dist[idx_a]))
+        for idx_a in np.nonzero(keep)[0]
+    ]
+
+
+class KDForestIndex:
+    """Approximate nearest-neighbour index: a randomized k-d forest in NumPy.
+
+    Every tree is a complete binary tree built by median splits on a
+    dimension drawn at random from the ``top_dims`` highest-variance ones
+    (estimated from a ~100 point sample of the node), so
+    all leaves sit at the same depth and hold ``leaf_size`` points or fewer.
+    Queries descend every tree together (one vectorized comparison per level,
+    no backtracking); the union of the reached leaves is re-ranked with exact
+    distances.  More trees / bigger leaves trade speed for recall.
+    """
+
+    def __init__(
+        self,
+        descriptors: np.ndarray,
+        n_trees: int = 8,
+        leaf_size: int = 32,
+        top_dims: int = 5,
+        seed: int = 42,
+    ) -> None:
+        self.descriptors = np.asarray(descriptors, dtype=np.float32)
+        self._sq_norms = np.einsum("ij,ij->i", self.descriptors, self.descriptors)
+        self.n_trees = max(1, n_trees)
+        self.leaf_size = max(2, leaf_size)
+        count = len(self.descriptors)
+        self.depth = max(0, math.ceil(math.log2(max(count, 1) / self.leaf_size)))
+        rng = np.random.default_rng(seed)
+        self._trees = [self._build_tree(rng, top_dims) for _ in range(self.n_trees)]
+
+    def __len__(self) -> int:
+        return len(self.descriptors)
+
+    def _build_tree(
+        self, rng: np.random.Generator, top_dims: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n_inner = 2**self.depth - 1
+        split_dims = np.zeros(n_inner, dtype=np.int64)
+        split_vals = np.zeros(n_inner, dtype=np.float32)
+        nodes = [np.arange(len(self.descriptors))]
+        for level in range(self.depth):
+            children = []
+            for offset, members in enumerate(nodes):
+                node = 2**level - 1 + offset
+                points = self.descriptors[members]
+                if len(members) < 2:
+                    split_vals[node] = np.inf
+                    children.extend([members, members[:0]])
+                    continue
+                # Like FLANN, estimate the spread from a small sample.
+                variances = points[:: max(1, len(points) // 100)].var(axis=0)
+                candidates = np.argsort(variances)[-top_dims:]
+                dim = int(rng.choice(candidates))
+                order = np.argsort(points[:, dim], kind="stable")
+                half = len(members) // 2
+                split_dims[node] = dim
+                split_vals[node] = 0.5 * (
+                    points[order[half - 1], dim] + points[order[half], dim]
+                )
+                children.extend([members[order[:half]], members[order[half:]]])
+            nodes = children
+        leaves = np.full((len(nodes), max(len(m) for m in nodes)), -1, dtype=np.int64)
+        for leaf, members in enumerate(nodes):
+            leaves[leaf, : len(members)] = members
+        return split_dims, split_vals, leaves
+
+    def _leaf_members(self, queries: np.ndarray) -> np.ndarray:
+        """Indices stored in the leaves reached by each query, across all trees."""
+        members = []
+        for split_dims, split_vals, leaves in self._trees:
+            node = np.zeros(len(queries), dtype=np.int64)
+            for _ in range(self.depth):
+                go_right = queries[np.arange(len(queries)), split_dims[node]] >= split_vals[node]
+                node = 2 * node + 1 + go_right
+            members.append(leaves[node - (2**self.depth - 1)])
+        return np.concatenate(members, axis=1)
+
+    def knn2(
+        self, queries: np.ndarray, chunk_size: int = 512
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate two nearest neighbours for every query row.
+
+        Returns ``(indices, distances)``, both shaped (N, 2).  Missing
+        neighbours are reported as index -1 with an infinite distance.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        indices = np.full((len(queries), 2), -1, dtype=np.int64)
+        distances = np.full((len(queries), 2), np.inf, dtype=np.float64)
+        for start in range(0, len(queries), chunk_size):
+            block = queries[start : start + chunk_size]
+            candidates = np.sort(self._leaf_members(block), axis=1)
+            # The same point can be reached through several trees.
+            duplicate = np.zeros_like(candidates, dtype=bool)
+            duplicate[:, 1:] = candidates[:, 1:] == candidates[:, :-1]
+            invalid = duplicate | (candidates < 0)
+            safe = np.maximum(candidates, 0)
+            sq_dist = self._sq_norms[safe] - 2.0 * np.matmul(
+                self.descriptors[safe], block[:, :, None]
+            )[..., 0]
+            sq_dist[invalid] = np.inf
+            k = min(2, sq_dist.shape[1])
+            top = np.argsort(sq_dist, axis=1, kind="stable")[:, :k]
+            rows = np.arange(len(block))[:, None]
+            top_idx = np.where(np.isfinite(sq_dist[rows, top]), candidates[rows, top], -1)
+            diff = self.descriptors[np.maximum(top_idx, 0)] - block[:, None, :]
+            top_dist = np.linalg.norm(diff, axis=2).astype(np.float64)
+            top_dist[top_idx < 0] = np.inf
+            indices[start : start + len(block), :k] = top_idx
+            distances[start : start + len(block), :k] = top_dist
+        return indices, distances
+
+
+def match_descriptors_indexed(
+    desc_a: np.ndarray,
+    index_b: KDForestIndex,
+    ratio: float,
+    index_a: KDForestIndex | None = None,
+    desc_b: np.ndarray | None = None,
+) -> List[Match]:
+    """Ratio-test matching against a prebuilt approximate index of image B.
+
+    Pass ``index_a`` and ``desc_b`` to keep only mutual nearest neighbours.
+    """
+    if len(desc_a) == 0 or len(index_b) < 2:
+        return []
+    nn_idx, nn_dist = index_b.knn2(desc_a)
+    reverse_best = None
+    if index_a is not None and desc_b is not None:
+        reverse_best = index_a.knn2(desc_b)[0][:, 0]
+    found = nn_idx[:, 0] >= 0
+    best_b = np.where(found, nn_idx[:, 0], 0)
+    best_dist = np.where(found, nn_dist[:, 0], np.inf)
+    return _ratio_test_matches(best_b, best_dist, nn_dist[:, 1], ratio, reverse_best)
+
+
+class KeypointGrid:
+    """Uniform grid over 2D keypoint positions for fixed-radius queries.
+
+    Points are bucketed by cell (CSR layout: ``order`` sorted by cell id and
+    ``starts`` offsets), so the candidates of many query centres are gathered
+    with a few vectorized operations per neighbouring cell offset.
+    """
+
+    def __init__(self, points: np.ndarray, cell_size: float) -> None:
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.cell_size = float(cell_size)
+        cells = np.floor(self.points / self.cell_size).astype(np.int64)
+        self.origin = cells.min(axis=0) if len(cells) else np.zeros(2, dtype=np.int64)
+        cells -= self.origin
+        self.cols, self.rows = (cells.max(axis=0) + 1) if len(cells) else (1, 1)
+        cell_id = cells[:, 1] * self.cols + cells[:, 0]
+        self.order = np.argsort(cell_id, kind="stable")
+        counts = np.bincount(cell_id, minlength=self.cols * self.rows)
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def query_radius(self, centres: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """``(centre_idx, point_idx)`` pairs with ``|point - centre| <= radius``."""
+        centres = np.asarray(centres, dtype=np.float64).reshape(-1, 2)
+        reach = int(math.ceil(radius / self.cell_size))
+        cells = np.floor(centres / self.cell_size).astype(np.int64) - self.origin
+        query_parts: List[np.ndarray] = []
+        point_parts: List[np.ndarray] = []
+        for oy in range(-reach, reach + 1):
+            for ox in range(-reach, reach + 1):
+                cx, cy = cells[:, 0] + ox, cells[:, 1] + oy
+                queries = np.flatnonzero((cx >= 0) & (cx < self.cols) & (cy >= 0) & (cy < self.rows))
+                cell_id = cy[queries] * self.cols + cx[queries]
+                begin = self.starts[cell_id]
+                counts = self.starts[cell_id + 1] - begin
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                # Expand every (query, cell) to the run of points in that cell.
+                run_start = np.repeat(begin - (np.cumsum(counts) - counts), counts)
+                query_parts.append(np.repeat(queries, counts))
+                point_parts.append(self.order[run_start + np.arange(total)])
+        if not query_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        query_idx = np.concatenate(query_parts)
+        point_idx = np.concatenate(point_parts)
+        sq_dist = ((self.points[point_idx] - centres[query_idx]) ** 2).sum(axis=1)
+        keep = sq_dist <= radius * radius
+        return query_idx[keep], point_idx[keep]
+
+
+def pair_distances(
+    desc_a: np.ndarray, desc_b: np.ndarray, idx_a: np.ndarray, idx_b: np.ndarray
+) -> np.ndarray:
+    """Descriptor distance of each ``(idx_a[i], idx_b[i])`` pair.
+
+    L2 for float descriptors, Hamming (popcount table) for packed uint8 ones.
+    """
+    distances = np.empty(len(idx_a), dtype=np.float64)
+    step = max(1, HAMMING_BLOCK_BUDGET // max(desc_a.shape[1] * desc_a.itemsize, 1))
+    for start in range(0, len(idx_a), step):
+        rows_a = desc_a[idx_a[start : start + step]]
+        rows_b = desc_b[idx_b[start : start + step]]
+        if desc_a.dtype == np.uint8:
+            distances[start : start + step] = _POPCOUNT_TABLE[
+                np.bitwise_xor(rows_a, rows_b)
+            ].sum(axis=1)
+        else:
+            distances[start : start + step] = np.linalg.norm(
+                rows_a.astype(np.float32) - rows_b, axis=1
+            )
+    return distances
+
+
+def guided_match_descriptors(
+    pts_a: np.ndarray,
+    pts_b: np.ndarray,
+    desc_a: np.ndarray,
+    desc_b: np.ndarray,
+    H: np.ndarray,
+    radius: float,
+    ratio: float,
+) -> List[Match]:
+    """Homography-guided matching restricted to a neighbourhood in image B.
+
+    Every keypoint of A is projected with ``H`` and compared only with the
+    keypoints of B within ``radius`` pixels of the prediction (looked up in a
+    :class:`KeypointGrid`).  The nearest candidate is kept if it passes the
+    ratio test against the second nearest candidate in the same neighbourhood
+    (a lone candidate always passes), and each keypoint of B keeps only its
+    closest keypoint of A.
+    """
+    if len(pts_a) == 0 or len(pts_b) == 0:
+        return []
+    projected = _project(H, pts_a)
+    finite = np.flatnonzero(np.isfinite(projected).all(axis=1))
+    grid = KeypointGrid(pts_b, radius)
+    query, cand = grid.query_radius(projected[finite], radius)
+    if query.size == 0:
+        return []
+    query = finite[query]
+    dist = pair_distances(desc_a, desc_b, query, cand)
+
+    order = np.lexsort((dist, query))
+    query, cand, dist = query[order], cand[order], dist[order]
+    heads = np.flatnonzero(np.r_[True, query[1:] != query[:-1]])
+    nxt = np.minimum(heads + 1, len(query) - 1)
+    has_second = (heads + 1 < len(query)) & (query[nxt] == query[heads])
+    second = np.where(has_second, dist[nxt], np.inf)
+    keep = heads[dist[heads] < ratio * second]
+
+    # One-to-one: a keypoint of B keeps only its closest keypoint of A.
+    best_a, best_b, best_d = query[keep], cand[keep], dist[keep]
+    order = np.lexsort((best_d, best_b))
+    unique = order[np.r_[True, best_b[order][1:] != best_b[order][:-1]]]
+    unique = unique[np.argsort(best_a[unique])]
+    return [
+        Match(idx_a=int(best_a[i]), idx_b=int(best_b[i]), distance=float(best_d[i]))
+        for i in unique
+    ]
+
+
+def compute_homography(
+    pairs: List[Tuple[np.ndarray, np.ndarray]], normalize: bool = False
+) -> np.ndarray:
+    if normalize:
+        src = np.array([pair[0] for pair in pairs], dtype=np.float64)
+        dst = np.array([pair[1] for pair in pairs], dtype=np.float64)
+        return fit_homography(src, dst)
     A = []
     for src, dst in pairs:
         x, y = src
@@ -434,66 +2136,357 @@ def compute_homography(pairs: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray
     return H / H[2, 2]
 
 
+def _hartley_transform(points: np.ndarray) -> np.ndarray:
+    """Similarity moving ``points`` to zero mean and mean distance sqrt(2)."""
+    centroid = points.mean(axis=0)
+    mean_dist = np.mean(np.linalg.norm(points - centroid, axis=1))
+    scale = math.sqrt(2) / mean_dist if mean_dist > 1e-12 else 1.0
+    return np.array(
+        [
+            [scale, 0.0, -scale * centroid[0]],
+            [0.0, scale, -scale * centroid[1]],
+            [0.0, 0.0, 1.0],
+        ]
+    )
+
+
+def fit_homography(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Least-squares DLT over N >= 4 correspondences with Hartley normalisation.
+
+    Both point sets are conditioned (centroid at the origin, mean distance
+    sqrt(2)) before solving, which keeps the system well scaled in pixel
+    coordinates, and the result is mapped back to the original frames.
+    """
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.asarray(dst, dtype=np.float64)
+    T_src = _hartley_transform(src)
+    T_dst = _hartley_transform(dst)
+    src_n = src @ T_src[:2, :2].T + T_src[:2, 2]
+    dst_n = dst @ T_dst[:2, :2].T + T_dst[:2, 2]
+    x, y = src_n[:, 0], src_n[:, 1]
+    u, v = dst_n[:, 0], dst_n[:, 1]
+    zeros, ones = np.zeros_like(x), np.ones_like(x)
+    A = np.empty((2 * len(src), 9))
+    A[0::2] = np.stack([-x, -y, -ones, zeros, zeros, zeros, u * x, u * y, u], axis=1)
+    A[1::2] = np.stack([zeros, zeros, zeros, -x, -y, -ones, v * x, v * y, v], axis=1)
+    # The (2N, 2N) U factor is never needed; full V is only required when the
+    # system has fewer rows than unknowns (N = 4).
+    _, _, vt = np.linalg.svd(A, full_matrices=len(A) < 9)
+    H = np.linalg.inv(T_dst) @ vt[-1].reshape(3, 3) @ T_src
+    return H / H[2, 2]
+
+
+def _project(H: np.ndarray, points: np.ndarray) -> np.ndarray:
+    projected = np.asarray(points, dtype=np.float64) @ H[:, :2].T + H[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return projected[:, :2] / projected[:, 2:3]
+
+
+def reprojection_rmse(H: np.ndarray, src: np.ndarray, dst: np.ndarray) -> float:
+    """Root-mean-square transfer error (pixels) of ``src`` mapped onto ``dst``."""
+    if len(src) == 0:
+        return float("nan")
+    residuals = _project(H, src) - np.asarray(dst, dtype=np.float64)
+    return float(np.sqrt(np.mean(np.sum(residuals**2, axis=1))))
+
+
+def refine_homography_lm(
+    H: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    max_iterations: int = 50,
+    tolerance: float = 1e-10,
+) -> np.ndarray:
+    """Levenberg-Marquardt minimisation of the transfer error of ``H``.
+
+    The eight free entries of ``H`` (``H[2, 2]`` fixed to 1) are refined over
+    all correspondences with an analytic Jacobian.  As in
+    :func:`fit_homography`, the problem is solved in Hartley-normalised
+    coordinates, where the entries are of comparable magnitude, and the result
+    is mapped back to pixels.
+    """
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.asarray(dst, dtype=np.float64)
+    T_src = _hartley_transform(src)
+    T_dst = _hartley_transform(dst)
+    src = src @ T_src[:2, :2].T + T_src[:2, 2]
+    dst = dst @ T_dst[:2, :2].T + T_dst[:2, 2]
+    H = T_dst @ H @ np.linalg.inv(T_src)
+    h = (H / H[2, 2]).ravel()[:8].copy()
+    x, y = src[:, 0], src[:, 1]
+
+    def residuals(params: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        w = params[6] * x + params[7] * y + 1.0
+        px = (params[0] * x + params[1] * y + params[2]) / w
+        py = (params[3] * x + params[4] * y + params[5]) / w
+        return np.concatenate([px - dst[:, 0], py - dst[:, 1]]), np.stack([px, py]), w
+
+    # Trial steps may push a point onto the line at infinity; such candidates
+    # get a non-finite cost and are rejected below.
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        r, (px, py), w = residuals(h)
+        cost = float(r @ r)
+        damping = 1e-3
+        for _ in range(max_iterations):
+            zeros = np.zeros_like(x)
+            xw, yw, iw = x / w, y / w, 1 / w
+            J = np.concatenate(
+                [
+                    np.stack([xw, yw, iw, zeros, zeros, zeros, -px * xw, -px * yw], axis=1),
+                    np.stack([zeros, zeros, zeros, xw, yw, iw, -py * xw, -py * yw], axis=1),
+                ]
+            )
+            JtJ = J.T @ J
+            gradient = J.T @ r
+            improved = False
+            while damping < 1e10:
+                step = np.linalg.solve(JtJ + damping * np.diag(np.diag(JtJ) + 1e-12), -gradient)
+                candidate = h + step
+                r_new, (px_new, py_new), w_new = residuals(candidate)
+                cost_new = float(r_new @ r_new)
+                if np.isfinite(cost_new) and cost_new < cost:
+                    improved = True
+                    break
+                damping *= 10
+            if not improved:
+                break
+            converged = cost - cost_new < tolerance * max(cost, 1.0)
+            h, r, px, py, w, cost = candidate, r_new, px_new, py_new, w_new, cost_new
+            damping = max(damping / 10, 1e-12)
+            if converged:
+                break
+    H = np.linalg.inv(T_dst) @ np.append(h, 1.0).reshape(3, 3) @ T_src
+    return H / H[2, 2]
+
+
+def match_index_arrays(
+    matches: List[Match] | List[cv2.DMatch],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Keypoint indices (image A, image B) of custom ``Match`` or ``cv2.DMatch``."""
+    idx_a = np.array(
+        [m.queryIdx if hasattr(m, "queryIdx") else m.idx_a for m in matches], dtype=np.int64
+    )
+    idx_b = np.array(
+        [m.trainIdx if hasattr(m, "trainIdx") else m.idx_b for m in matches], dtype=np.int64
+    )
+    return idx_a, idx_b
+
+
+def compute_homographies(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Batched :func:`compute_homography` for (K, 4, 2) minimal samples.
+
+    Like the single-sample version, the DLT rows are formed in the input
+    dtype and only the assembled system is promoted to float64.
+    """
+    x, y = src[..., 0], src[..., 1]
+    u, v = dst[..., 0], dst[..., 1]
+    zeros, ones = np.zeros_like(x), np.ones_like(x)
+    rows_u = np.stack([-x, -y, -ones, zeros, zeros, zeros, u * x, u * y, u], axis=-1)
+    rows_v = np.stack([zeros, zeros, zeros, -x, -y, -ones, v * x, v * y, v], axis=-1)
+    # Interleave so each system matches the row order of compute_homography.
+    A = np.stack([rows_u, rows_v], axis=2).reshape(len(src), -1, 9).astype(np.float64)
+    _, _, vt = np.linalg.svd(A)
+    H = vt[:, -1, :].reshape(-1, 3, 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return H / H[:, 2:3, 2:3]
+
+
+def _sample_minimal_sets(
+    num_matches: int, iterations: int, seed: int | None
+) -> np.ndarray:
+    """Draw ``iterations`` 4-subsets of match indices, shaped (iterations, 4).
+
+    With an integer ``seed`` the draws replay ``random.Random(seed).sample``
+    exactly, so results are reproducible and identical to the historical
+    per-iteration loop.  ``seed=None`` draws all sets at once with NumPy.
+    """
+    if seed is not None:
+        rng = random.Random(seed)
+        population = range(num_matches)
+        return np.array([rng.sample(population, 4) for _ in range(iterations)], dtype=np.int64)
+    np_rng = np.random.default_rng()
+    samples = np_rng.integers(0, num_matches, size=(iterations, 4))
+    while True:
+        ordered = np.sort(samples, axis=1)
+        repeated = np.any(ordered[:, 1:] == ordered[:, :-1], axis=1)
+        if not repeated.any():
+            return samples
+        samples[repeated] = np_rng.integers(0, num_matches, size=(int(repeated.sum()), 4))
+
+
+def _sample_prosac_sets(
+    num_matches: int, iterations: int, seed: int | None
+) -> np.ndarray:
+    """PROSAC minimal sets over matches pre-sorted by quality (best first).
+
+    Follows the growth function of Chum & Matas (2005): hypothesis ``t``
+    draws from the ``n`` best matches, always including the ``n``-th, and
+    ``n`` grows so that after ``iterations`` draws sampling is uniform.
+    Indices refer to positions in the quality-sorted order.
+    """
+    m = 4
+    rng = random.Random(seed)
+    t_n = float(iterations)
+    for i in range(m):
+        t_n *= (m - i) / (num_matches - i)
+    t_prime = 1
+    n = m
+    samples = np.empty((iterations, m), dtype=np.int64)
+    for t in range(1, iterations + 1):
+        if t == t_prime and n < num_matches:
+            t_next = t_n * (n + 1) / (n + 1 - m)
+            t_prime += max(1, math.ceil(t_next - t_n))
+            t_n = t_next
+            n += 1
+        if n < num_matches and t < t_prime:
+            samples[t - 1, : m - 1] = rng.sample(range(n - 1), m - 1)
+            samples[t - 1, m - 1] = n - 1
+        else:
+            samples[t - 1] = rng.sample(range(n), m)
+    return samples
+
+
+def _required_iterations(inlier_ratio: float, confidence: float, sample_size: int = 4) -> float:
+    """Iterations needed to draw one all-inlier sample with ``confidence``."""
+    p_good = inlier_ratio**sample_size
+    if p_good >= 1.0:
+        return 0.0
+    if p_good <= 0.0:
+        return math.inf
+    return math.log(1.0 - confidence) / math.log(1.0 - p_good)
+
+
+def _count_inliers(
+    H: np.ndarray, src: np.ndarray, dst: np.ndarray, threshold: float
+) -> np.ndarray:
+    """Inlier mask (K, N) of every hypothesis in ``H`` over all matches."""
+    src_h = np.vstack([src.T, np.ones(len(src))])
+    projected = H @ src_h
+    with np.errstate(divide="ignore", invalid="ignore"):
+        projected = projected[:, :2, :] / projected[:, 2:3, :]
+        errors = np.hypot(projected[:, 0, :] - dst[:, 0], projected[:, 1, :] - dst[:, 1])
+    return errors < threshold
+
+
+# Upper bound on (hypotheses x matches) projected at once while scoring.
+RANSAC_SCORE_BUDGET = 1 << 22
+
+
 def ransac_homography(
     pts_a: np.ndarray,
     pts_b: np.ndarray,
     matches: List[Match] | List[cv2.DMatch],
     iterations: int,
     threshold: float,
+    seed: int | None = 42,
+    adaptive: bool = False,
+    confidence: float = 0.99,
+    sampler: str = "uniform",
+    refine: str = "none",
+    stats: Dict[str, object] | None = None,
 ) -> Tuple[np.ndarray | None, List[int]]:
-    if len(matches) < 4:
+    """Estimate a homography with RANSAC, returning ``(H, inlier_indices)``.
+
+    Matched points are extracted once, all minimal sets are sampled up front,
+    the DLT systems are solved with one stacked SVD and every hypothesis is
+    scored by projecting the whole point set with a single batched matrix
+    multiply (in chunks bounded by ``RANSAC_SCORE_BUDGET``).  Ties keep the
+    earliest hypothesis, as the sequential loop did.
+
+    ``iterations`` is an upper bound: with ``adaptive`` the run stops as soon
+    as the best inlier ratio implies a ``confidence`` chance of having drawn
+    an all-inlier sample.  ``sampler="prosac"`` draws first from the matches
+    with the lowest distance.
+
+    ``refine="lsq"`` refits the winning model to its whole consensus set with
+    the Hartley-normalised DLT, ``"lm"`` additionally runs Levenberg-Marquardt
+    on the reprojection error; inliers are then re-evaluated with the refined
+    model, which is kept unless it supports fewer matches.
+
+    When a dict is passed as ``stats`` it receives the number of hypotheses
+    evaluated (``"iterations"``) and the inlier reprojection RMSE (``"rmse"``).
+    """
+    if stats is not None:
+        stats["iterations"] = 0
+        stats["rmse"] = None
+    if len(matches) < 4 or iterations <= 0:
         return None, []
-    best_inliers: List[int] = []
+    if sampler not in RANSAC_SAMPLERS:
+        raise ValueError(f"Unknown RANSAC sampler: {sampler}")
+    if refine not in HOMOGRAPHY_REFINEMENTS:
+        raise ValueError(f"Unknown homography refinement: {refine}")
+    idx_a, idx_b = match_index_arrays(matches)
+    src = np.asarray(pts_a)[idx_a]
+    dst = np.asarray(pts_b)[idx_b]
+
+    if sampler == "prosac":
+        by_quality = np.argsort([m.distance for m in matches], kind="stable")
+        samples = by_quality[_sample_prosac_sets(len(matches), iterations, seed)]
+    else:
+        samples = _sample_minimal_sets(len(matches), iterations, seed)
+    src_float = src.astype(np.float64)
+
+    best_count = 0
     best_H: np.ndarray | None = None
-    rng = random.Random(42)
-    match_indices = list(range(len(matches)))
-
-    for _ in range(iterations):
-        sample_ids = rng.sample(match_indices, 4)
-        pair_samples = []
-        for idx in sample_ids:
-            match = matches[idx]
-            ia = match.queryIdx if hasattr(match, "queryIdx") else match.idx_a
-            ib = match.trainIdx if hasattr(match, "trainIdx") else match.idx_b
-            pair_samples.append((pts_a[ia], pts_b[ib]))
-        H = compute_homography(pair_samples)
-
-        inliers: List[int] = []
-        for idx, match in enumerate(matches):
-            ia = match.queryIdx if hasattr(match, "queryIdx") else match.idx_a
-            ib = match.trainIdx if hasattr(match, "trainIdx") else match.idx_b
-            pt_a = np.append(pts_a[ia], 1.0)
-            projected = H @ pt_a
-            projected /= projected[2]
-            error = np.linalg.norm(projected[:2] - pts_b[ib])
-            if error < threshold:
-                inliers.append(idx)
-
-        if len(inliers) > len(best_inliers):
-            best_inliers = inliers
-            best_H = H
-
-    return best_H, best_inliers
+    best_mask: np.ndarray | None = None
+    required = math.inf
+    evaluated = 0
+    chunk = max(1, RANSAC_SCORE_BUDGET // len(matches))
+    if adaptive:
+        # Small chunks so little work is wasted once the bound is reached.
+        chunk = min(chunk, 64)
+    for start in range(0, iterations, chunk):
+        if evaluated >= required:
+            break
+        batch = samples[start : start + chunk]
+        hypotheses = compute_homographies(src[batch], dst[batch])
+        masks = _count_inliers(hypotheses, src_float, dst, threshold)
+        counts = masks.sum(axis=1)
+        for local, count in enumerate(counts.tolist()):
+            evaluated = start + local + 1
+            if count > best_count:
+                best_count = count
+                best_H = hypotheses[local]
+                best_mask = masks[local]
+                if adaptive:
+                    required = _required_iterations(best_count / len(matches), confidence)
+            if evaluated >= required:
+                break
+
+    if stats is not None:
+        stats["iterations"] = evaluated
+    if best_mask is None:
+        return None, []
+
+    if refine != "none" and best_count >= 4:
+        refined = fit_homography(src_float[best_mask], dst[best_mask])
+        if refine == "lm":
+            refined = refine_homography_lm(refined, src_float[best_mask], dst[best_mask])
+        refined_mask = _count_inliers(refined[None], src_float, dst, threshold)[0]
+        if np.all(np.isfinite(refined)) and refined_mask.sum() >= best_count:
+            best_H, best_mask = refined, refined_mask
+
+    if stats is not None:
+        stats["rmse"] = reprojection_rmse(best_H, src_float[best_mask], dst[best_mask])
+    return best_H, np.nonzero(best_mask)[0].tolist()
 
 
 def draw_matches(
     img_a: np.ndarray,
     img_b: np.ndarray,
-    keypoints_a: Iterable[Tuple[float, float]],
-    keypoints_b: Iterable[Tuple[float, float]],
+    keypoints_a: np.ndarray | Iterable[Tuple[float, float]],
+    keypoints_b: np.ndarray | Iterable[Tuple[float, float]],
     matches: List[Match] | List[cv2.DMatch],
     inlier_indices: List[int],
 ) -> np.ndarray:
     kp_a = [cv2.KeyPoint(float(x), float(y), 1) for x, y in keypoints_a]
     kp_b = [cv2.KeyPoint(float(x), float(y), 1) for x, y in keypoints_b]
-    if matches and isinstance(matches[0], Match):
-        cv_matches = [
-            cv2.DMatch(_queryIdx=m.idx_a, _trainIdx=m.idx_b, _distance=m.distance)
-            for m in matches
-        ]
-    else:
-        cv_matches = matches  # already cv2.DMatch
-    inlier_matches = [cv_matches[idx] for idx in inlier_indices]
+    inlier_matches = []
+    for idx in inlier_indices:
+        m = matches[idx]
+        if isinstance(m, Match):
+            m = cv2.DMatch(_queryIdx=m.idx_a, _trainIdx=m.idx_b, _distance=m.distance)
+        inlier_matches.append(m)
     vis = cv2.drawMatches(
         img_a,
         kp_a,
@@ -506,86 +2499,556 @@ def draw_matches(
     return vis
 
 
+# ---------------------------------------------------------------------------
+# Feature cache
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Content-addressed on-disk cache of keypoints and descriptors.
+
+    Entries are keyed on the SHA-256 of the image file plus the extraction
+    parameters, and stored as plain ``.npy`` files so they can be memory
+    mapped on load.  Every hit refreshes the entry's timestamp; after each
+    insert the least recently used entries are evicted until the cache fits
+    in ``max_bytes``.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def key(self, image_path: Path, params: Dict[str, object]) -> str:
+        payload = json.dumps(
+            {"version": self.FORMAT_VERSION, "image": file_digest(image_path), **params},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Tuple[np.ndarray, np.ndarray] | None:
+        """Memory-mapped ``(keypoints, descriptors)`` arrays, or None on a miss."""
+        entry = self._entry(key)
+        if not (entry / "descriptors.npy").exists():
+            return None
+        keypoints = np.load(entry / "keypoints.npy", mmap_mode="r")
+        descriptors = np.load(entry / "descriptors.npy", mmap_mode="r")
+        os.utime(entry)
+        return keypoints, descriptors
+
+    def put(self, key: str, keypoints: np.ndarray, descriptors: np.ndarray) -> None:
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-"))
+        try:
+            np.save(staging / "keypoints.npy", np.ascontiguousarray(keypoints))
+            np.save(staging / "descriptors.npy", np.ascontiguousarray(descriptors))
+            if entry.exists():
+                shutil.rmtree(entry)
+            staging.rename(entry)
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging)
+        self._evict(keep=entry)
+
+    def _evict(self, keep: Path | None = None) -> None:
+        """Drop least recently used entries until the cache fits in ``max_bytes``.
+
+        ``keep`` (the entry just written) is never evicted.  Entries removed or
+        replaced by another process while the cache is scanned are skipped.
+        """
+        entries = []
+        for entry in self.root.glob("??/*"):
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            entries.append((mtime, size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def _keypoint_set_to_array(keypoints: KeypointSet) -> np.ndarray:
+    return np.stack([getattr(keypoints, name) for name in KeypointSet.FIELDS], axis=1)
+
+
+def _keypoint_set_from_array(array: np.ndarray) -> KeypointSet:
+    return KeypointSet(*(array[:, column] for column in range(len(KeypointSet.FIELDS))))
+
+
+def _cv_keypoints_to_array(keypoints: Sequence[cv2.KeyPoint]) -> np.ndarray:
+    return np.array(
+        [
+            [kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave, kp.class_id]
+            for kp in keypoints
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 7)
+
+
+def _cv_keypoints_from_array(array: np.ndarray) -> List[cv2.KeyPoint]:
+    return [
+        cv2.KeyPoint(float(x), float(y), float(size), float(angle), float(response), int(octave), int(class_id))
+        for x, y, size, angle, response, octave, class_id in array
+    ]
+
+
+def image_decode_params(args: argparse.Namespace) -> Dict[str, object]:
+    """Parameters that determine the decoded pixels of an input file.
+
+    Headerless ``.raw`` bytes only become an image through ``--raw-shape``
+    and ``--raw-dtype``, so identical bytes read differently must not share
+    cache entries.
+    """
+    return {
+        "resize_width": args.resize_width,
+        "raw_shape": list(args.raw_shape) if args.raw_shape else None,
+        "raw_dtype": np.dtype(args.raw_dtype).name,
+    }
+
+
+def custom_sift_params(args: argparse.Namespace) -> Dict[str, object]:
+    """Parameters that determine the custom SIFT output (the cache key)."""
+    return {
+        **image_decode_params(args),
+        "pipeline": "custom_sift",
+        "octaves": args.octaves,
+        "scales": args.scales,
+        "sigma": args.sigma,
+        "contrast_threshold": args.contrast_threshold,
+        "edge_threshold": args.edge_threshold,
+        "subpixel": args.subpixel,
+        "descriptor": args.descriptor,
+        "tile_size": args.tile_size,
+        "tile_margin": args.tile_margin,
+    }
+
+
+def detect_custom(
+    siftr: SIFTFromScratch, image_path: Path, image_gray: np.ndarray, args: argparse.Namespace
+) -> Tuple[KeypointSet, np.ndarray]:
+    """Whole-image or tiled (``--tile-size``) custom SIFT detection.
+
+    In tiled mode, ``.npy``/``.raw`` inputs that need no resizing are read
+    tile by tile from the memory-mapped file instead of ``image_gray``.
+    """
+    if not args.tile_size:
+        return siftr.detect_and_compute(image_gray)
+    source = image_gray
+    if image_path.suffix.lower() in MEMMAP_SUFFIXES:
+        mapped = open_image_source(image_path, args.raw_shape, args.raw_dtype)
+        if not args.resize_width or mapped.shape[1] <= args.resize_width:
+            source = mapped
+    return siftr.detect_and_compute_tiled(source, args.tile_size, args.tile_margin)
+
+
+def extract_custom_features(
+    siftr: SIFTFromScratch,
+    image_path: Path,
+    image_gray: np.ndarray,
+    args: argparse.Namespace,
+    cache: FeatureCache | None,
+) -> Tuple[KeypointSet, np.ndarray]:
+    if cache is None:
+        return detect_custom(siftr, image_path, image_gray, args)
+    key = cache.key(image_path, custom_sift_params(args))
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"[Task2] Feature cache hit (custom SIFT): {image_path.name}")
+        return _keypoint_set_from_array(cached[0]), cached[1]
+    keypoints, descriptors = detect_custom(siftr, image_path, image_gray, args)
+    cache.put(key, _keypoint_set_to_array(keypoints), descriptors)
+    return keypoints, descriptors
+
+
+def extract_opencv_features(
+    sift: cv2.SIFT,
+    image_path: Path,
+    image_gray: np.ndarray,
+    args: argparse.Namespace,
+    cache: FeatureCache | None,
+) -> Tuple[Sequence[cv2.KeyPoint], np.ndarray]:
+    image_u8 = (image_gray * 255).astype(np.uint8)
+    if cache is None:
+        return sift.detectAndCompute(image_u8, None)
+    key = cache.key(image_path, {**image_decode_params(args), "pipeline": "opencv_sift"})
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"[Task2] Feature cache hit (OpenCV SIFT): {image_path.name}")
+        return _cv_keypoints_from_array(cached[0]), cached[1]
+    keypoints, descriptors = sift.detectAndCompute(image_u8, None)
+    if descriptors is None:
+        descriptors = np.zeros((0, 128), dtype=np.float32)
+    cache.put(key, _cv_keypoints_to_array(keypoints), descriptors)
+    return keypoints, descriptors
+
+
 # ---------------------------------------------------------------------------
 # Script entry point
 
 
-def keypoints_to_array(kps: Sequence[Keypoint]) -> np.ndarray:
-    return np.array([[kp.x, kp.y] for kp in kps], dtype=np.float32)
+def keypoints_to_array(kps: KeypointSet | Sequence[Keypoint]) -> np.ndarray:
+    if isinstance(kps, KeypointSet):
+        return kps.to_array()
+    return np.array([[kp.x, kp.y] for kp in kps], dtype=np.float32).reshape(-1, 2)
 
 
-def run_task(args: argparse.Namespace) -> None:
-    img_a = load_image(args.image_a, args.resize_width)
-    img_b = load_image(args.image_b, args.resize_width)
-    gray_a = to_grayscale_float(img_a)
-    gray_b = to_grayscale_float(img_b)
+def match_with_forest(
+    desc_a: np.ndarray, desc_b: np.ndarray, args: argparse.Namespace
+) -> List[Match]:
+    """Approximate matching through ``KDForestIndex`` using the CLI settings."""
+    index_b = KDForestIndex(desc_b, n_trees=args.kd_trees, leaf_size=args.kd_leaf_size)
+    if not args.cross_check:
+        return match_descriptors_indexed(desc_a, index_b, args.ratio_test)
+    index_a = KDForestIndex(desc_a, n_trees=args.kd_trees, leaf_size=args.kd_leaf_size)
+    return match_descriptors_indexed(
+        desc_a, index_b, args.ratio_test, index_a=index_a, desc_b=desc_b
+    )
+
 
-    siftr = SIFTFromScratch(
+def build_sift(args: argparse.Namespace) -> SIFTFromScratch:
+    return SIFTFromScratch(
         num_octaves=args.octaves,
         num_scales=args.scales,
         sigma=args.sigma,
         contrast_threshold=args.contrast_threshold,
         edge_threshold=args.edge_threshold,
+        extrema_engine=args.extrema_engine,
+        orientation_engine=args.orientation_engine,
+        descriptor_engine=args.descriptor_engine,
+        workers=args.workers,
+        subpixel=args.subpixel,
+        descriptor=args.descriptor,
     )
 
-    print("[Task2] Running custom SIFT pipeline ...")
-    custom_kp_a, custom_desc_a = siftr.detect_and_compute(gray_a)
-    custom_kp_b, custom_desc_b = siftr.detect_and_compute(gray_b)
-    print(
-        f"[Task2] Custom keypoints: image A={len(custom_kp_a)}, image B={len(custom_kp_b)}"
-    )
 
-    custom_matches = match_descriptors(custom_desc_a, custom_desc_b, args.ratio_test)
-    print(f"[Task2] Custom matches before RANSAC: {len(custom_matches)}")
-    custom_pts_a = keypoints_to_array(custom_kp_a)
-    custom_pts_b = keypoints_to_array(custom_kp_b)
-    custom_H, custom_inliers = ransac_homography(
-        custom_pts_a, custom_pts_b, custom_matches, args.ransac_iters, args.ransac_threshold
+def open_feature_cache(args: argparse.Namespace) -> FeatureCache | None:
+    if not args.feature_cache:
+        return None
+    return FeatureCache(args.feature_cache, int(args.cache_max_mb * 1024 * 1024))
+
+
+def match_custom(desc_a: np.ndarray, desc_b: np.ndarray, args: argparse.Namespace) -> List[Match]:
+    if args.descriptor == "binary":
+        return match_binary_descriptors(
+            desc_a,
+            desc_b,
+            args.ratio_test,
+            chunk_size=args.match_chunk_size,
+            cross_check=args.cross_check,
+        )
+    if args.matcher == "kdforest":
+        return match_with_forest(desc_a, desc_b, args)
+    return match_descriptors(
+        desc_a,
+        desc_b,
+        args.ratio_test,
+        chunk_size=args.match_chunk_size,
+        cross_check=args.cross_check,
     )
-    print(f"[Task2] Custom RANSAC inliers: {len(custom_inliers)}")
 
-    print("[Task2] Running OpenCV SIFT baseline ...")
-    reference = cv2.SIFT_create()
-    ref_kp_a, ref_desc_a = reference.detectAndCompute((gray_a * 255).astype(np.uint8), None)
-    ref_kp_b, ref_desc_b = reference.detectAndCompute((gray_b * 255).astype(np.uint8), None)
+
+def match_opencv(
+    desc_a: np.ndarray, desc_b: np.ndarray, args: argparse.Namespace
+) -> List[Match] | List[cv2.DMatch]:
+    if args.matcher == "kdforest":
+        return match_with_forest(desc_a, desc_b, args)
+    if len(desc_a) == 0 or len(desc_b) == 0:
+        return []
     bf = cv2.BFMatcher(cv2.NORM_L2, crossCheck=False)
-    ref_matches_knn = bf.knnMatch(ref_desc_a, ref_desc_b, k=2)
+    ref_matches_knn = bf.knnMatch(desc_a, desc_b, k=2)
     ref_matches = []
-    for m, n in ref_matches_knn:
+    for pair in ref_matches_knn:
+        if len(pair) < 2:
+            continue
+        m, n = pair
         if m.distance < args.ratio_test * n.distance:
             ref_matches.append(m)
-    ref_pts_a = np.array([kp.pt for kp in ref_kp_a], dtype=np.float32)
-    ref_pts_b = np.array([kp.pt for kp in ref_kp_b], dtype=np.float32)
-    ref_H, ref_inliers = ransac_homography(
-        ref_pts_a, ref_pts_b, ref_matches, args.ransac_iters, args.ransac_threshold
+    if args.cross_check and ref_matches:
+        reverse = {m.queryIdx: m.trainIdx for m in bf.match(desc_b, desc_a)}
+        ref_matches = [m for m in ref_matches if reverse.get(m.trainIdx) == m.queryIdx]
+    return ref_matches
+
+
+def estimate_homography(
+    pts_a: np.ndarray,
+    pts_b: np.ndarray,
+    matches: List[Match] | List[cv2.DMatch],
+    args: argparse.Namespace,
+) -> Tuple[np.ndarray | None, List[int], Dict[str, object]]:
+    """RANSAC with the CLI settings; returns ``(H, inliers, stats)``."""
+    stats: Dict[str, object] = {}
+    H, inliers = ransac_homography(
+        pts_a,
+        pts_b,
+        matches,
+        args.ransac_iters,
+        args.ransac_threshold,
+        seed=args.ransac_seed if args.ransac_seed >= 0 else None,
+        adaptive=args.ransac_adaptive,
+        confidence=args.ransac_confidence,
+        sampler=args.ransac_sampler,
+        refine=args.refine,
+        stats=stats,
+    )
+    return H, inliers, stats
+
+
+def descriptor_tradeoff(
+    siftr: SIFTFromScratch,
+    gray_a: np.ndarray,
+    gray_b: np.ndarray,
+    kp_a: KeypointSet,
+    kp_b: KeypointSet,
+    args: argparse.Namespace,
+) -> Dict[str, object]:
+    """Float SIFT vs binary descriptors on the same keypoints.
+
+    Reports descriptor and matching time, descriptor size, matches and RANSAC
+    inliers of both descriptor types, for the ``--descriptor binary``
+    summary.
+    """
+    pts_a, pts_b = keypoints_to_array(kp_a), keypoints_to_array(kp_b)
+    extractors = {
+        kind: SIFTFromScratch(**{**siftr._config(), "descriptor": kind})
+        for kind in DESCRIPTOR_TYPES
+    }
+    descriptors: Dict[str, List[np.ndarray]] = {kind: [] for kind in DESCRIPTOR_TYPES}
+    seconds = dict.fromkeys(DESCRIPTOR_TYPES, 0.0)
+    for gray, keypoints in ((gray_a, kp_a), (gray_b, kp_b)):
+        # Pyramid buffers are reused, so finish one image before the next.
+        gaussian_pyramid, _ = siftr._build_pyramids(gray)
+        for kind, extractor in extractors.items():
+            start = time.perf_counter()
+            descriptors[kind].append(extractor._compute_descriptors(keypoints, gaussian_pyramid))
+            seconds[kind] += time.perf_counter() - start
+
+    report: Dict[str, object] = {}
+    for kind in DESCRIPTOR_TYPES:
+        kind_args = argparse.Namespace(**{**vars(args), "descriptor": kind})
+        desc_a, desc_b = descriptors[kind]
+        start = time.perf_counter()
+        matches = match_custom(desc_a, desc_b, kind_args)
+        match_seconds = time.perf_counter() - start
+        _, inliers, _ = estimate_homography(pts_a, pts_b, matches, kind_args)
+        report.update(
+            {
+                f"tradeoff_{kind}_descriptor_seconds": round(seconds[kind], 3),
+                f"tradeoff_{kind}_descriptor_bytes": desc_a.shape[1] * desc_a.itemsize,
+                f"tradeoff_{kind}_match_seconds": round(match_seconds, 3),
+                f"tradeoff_{kind}_matches": len(matches),
+                f"tradeoff_{kind}_inliers": len(inliers),
+            }
+        )
+    return report
+
+
+def apply_guided_matching(
+    pts_a: np.ndarray,
+    pts_b: np.ndarray,
+    desc_a: np.ndarray,
+    desc_b: np.ndarray,
+    H: np.ndarray,
+    matches: List[Match] | List[cv2.DMatch],
+    inliers: List[int],
+    args: argparse.Namespace,
+) -> Tuple[List[Match] | List[cv2.DMatch], np.ndarray | None, List[int], Dict[str, object]]:
+    """Guided pass around ``H`` followed by RANSAC on the guided matches.
+
+    Returns matches of the same kind as ``matches`` (custom ``Match`` or
+    ``cv2.DMatch``) with the re-estimated homography, its inliers and the
+    RANSAC stats; ``stats["guided_seconds"]`` holds the matching time.  When
+    the guided pass ends with fewer inliers than the global ``inliers`` (a
+    poor ``H`` collapses the search windows), the global result is returned
+    unchanged and ``stats["guided_fallback"]`` is set.
+    """
+    start = time.perf_counter()
+    guided = guided_match_descriptors(
+        pts_a, pts_b, desc_a, desc_b, H, args.guided_radius, args.guided_ratio
+    )
+    guided_seconds = time.perf_counter() - start
+    if matches and not isinstance(matches[0], Match):
+        guided = [
+            cv2.DMatch(_queryIdx=m.idx_a, _trainIdx=m.idx_b, _distance=m.distance)
+            for m in guided
+        ]
+    guided_H, guided_inliers, stats = estimate_homography(pts_a, pts_b, guided, args)
+    stats["guided_seconds"] = guided_seconds
+    stats["guided_fallback"] = len(guided_inliers) < len(inliers)
+    if stats["guided_fallback"]:
+        return matches, H, inliers, stats
+    return guided, guided_H, guided_inliers, stats
+
+
+def run_task(args: argparse.Namespace) -> None:
+    img_a = load_image(args.image_a, args.resize_width, args.raw_shape, args.raw_dtype)
+    img_b = load_image(args.image_b, args.resize_width, args.raw_shape, args.raw_dtype)
+    gray_a = to_grayscale_float(img_a)
+    gray_b = to_grayscale_float(img_b)
+
+    siftr = build_sift(args)
+    cache = open_feature_cache(args)
+    profiler = StageProfiler(profile=args.profile, trace_memory=args.trace_memory)
+    siftr.profiler = profiler
+
+    print(f"[Task2] Running custom SIFT pipeline (extrema engine: {args.extrema_engine}) ...")
+    start = time.perf_counter()
+    with profiler.tags(pipeline="custom", image="A"):
+        custom_kp_a, custom_desc_a = extract_custom_features(
+            siftr, args.image_a, gray_a, args, cache
+        )
+    with profiler.tags(pipeline="custom", image="B"):
+        custom_kp_b, custom_desc_b = extract_custom_features(
+            siftr, args.image_b, gray_b, args, cache
+        )
+    custom_seconds = time.perf_counter() - start
+    print(
+        f"[Task2] Custom keypoints: image A={len(custom_kp_a)}, image B={len(custom_kp_b)}"
     )
+    print(f"[Task2] Custom SIFT time: {custom_seconds:.2f}s")
+
+    with profiler.tags(pipeline="custom"):
+        with profiler.stage("match") as record:
+            custom_matches = match_custom(custom_desc_a, custom_desc_b, args)
+            record["items"] = len(custom_matches)
+        custom_match_seconds = record["seconds"]
+        print(f"[Task2] Custom matches before RANSAC: {len(custom_matches)}")
+        custom_pts_a = keypoints_to_array(custom_kp_a)
+        custom_pts_b = keypoints_to_array(custom_kp_b)
+        with profiler.stage("ransac") as record:
+            custom_H, custom_inliers, custom_ransac = estimate_homography(
+                custom_pts_a, custom_pts_b, custom_matches, args
+            )
+            record["items"] = len(custom_inliers)
+    print(
+        f"[Task2] Custom RANSAC inliers: {len(custom_inliers)} "
+        f"({custom_ransac['iterations']} iterations)"
+    )
+
+    print("[Task2] Running OpenCV SIFT baseline ...")
+    reference = cv2.SIFT_create()
+    with profiler.tags(pipeline="opencv"):
+        with profiler.tags(image="A"), profiler.stage("features") as record:
+            ref_kp_a, ref_desc_a = extract_opencv_features(
+                reference, args.image_a, gray_a, args, cache
+            )
+            record["items"] = len(ref_kp_a)
+        with profiler.tags(image="B"), profiler.stage("features") as record:
+            ref_kp_b, ref_desc_b = extract_opencv_features(
+                reference, args.image_b, gray_b, args, cache
+            )
+            record["items"] = len(ref_kp_b)
+        with profiler.stage("match") as record:
+            ref_matches = match_opencv(ref_desc_a, ref_desc_b, args)
+            record["items"] = len(ref_matches)
+        ref_match_seconds = record["seconds"]
+        ref_pts_a = np.array([kp.pt for kp in ref_kp_a], dtype=np.float32).reshape(-1, 2)
+        ref_pts_b = np.array([kp.pt for kp in ref_kp_b], dtype=np.float32).reshape(-1, 2)
+        with profiler.stage("ransac") as record:
+            ref_H, ref_inliers, ref_ransac = estimate_homography(
+                ref_pts_a, ref_pts_b, ref_matches, args
+            )
+            record["items"] = len(ref_inliers)
     print(f"[Task2] OpenCV keypoints: image A={len(ref_kp_a)}, image B={len(ref_kp_b)}")
     print(f"[Task2] OpenCV matches before RANSAC: {len(ref_matches)}")
-    print(f"[Task2] OpenCV RANSAC inliers: {len(ref_inliers)}")
+    print(
+        f"[Task2] OpenCV RANSAC inliers: {len(ref_inliers)} "
+        f"({ref_ransac['iterations']} iterations)"
+    )
+
+    # Matches/inliers to draw: the guided pass replaces the global ones.
+    drawn = {"custom": (custom_matches, custom_inliers), "opencv": (ref_matches, ref_inliers)}
+    guided_summary: Dict[str, object] = {}
+    if args.guided:
+        for pipeline, label, pts_a, pts_b, desc_a, desc_b, H, matches, inliers in (
+            ("custom", "Custom", custom_pts_a, custom_pts_b, custom_desc_a, custom_desc_b,
+             custom_H, custom_matches, custom_inliers),
+            ("opencv", "OpenCV", ref_pts_a, ref_pts_b, ref_desc_a, ref_desc_b,
+             ref_H, ref_matches, ref_inliers),
+        ):
+            if H is None:
+                continue
+            with profiler.tags(pipeline=pipeline), profiler.stage("guided_match") as record:
+                guided, guided_H, guided_inliers, guided_stats = apply_guided_matching(
+                    pts_a, pts_b, desc_a, desc_b, H, matches, inliers, args
+                )
+                record["items"] = len(guided)
+            drawn[pipeline] = (guided, guided_inliers)
+            guided_summary.update(
+                {
+                    f"{pipeline}_guided_matches": len(guided),
+                    f"{pipeline}_guided_inliers": len(guided_inliers),
+                    f"{pipeline}_guided_seconds": round(guided_stats["guided_seconds"], 3),
+                    f"{pipeline}_guided_fallback": guided_stats["guided_fallback"],
+                    f"{pipeline}_guided_reprojection_rmse": guided_stats["rmse"],
+                    f"{pipeline}_guided_homography": (
+                        guided_H.tolist() if guided_H is not None else None
+                    ),
+                }
+            )
+            print(
+                f"[Task2] {label} guided matches: {len(guided)}, RANSAC inliers: "
+                f"{len(guided_inliers)} ({guided_stats['guided_seconds']:.3f}s)"
+                + (" [kept global matches]" if guided_stats["guided_fallback"] else "")
+            )
+    profiler.close()
 
     args.output_dir.mkdir(parents=True, exist_ok=True)
-    if custom_inliers:
+    if drawn["custom"][1]:
         vis_custom = draw_matches(
             img_a,
             img_b,
-            [(kp.x, kp.y) for kp in custom_kp_a],
-            [(kp.x, kp.y) for kp in custom_kp_b],
-            custom_matches,
-            custom_inliers[:80],
+            custom_pts_a,
+            custom_pts_b,
+            drawn["custom"][0],
+            drawn["custom"][1][:80],
         )
         cv2.imwrite(str(args.output_dir / "custom_sift_matches.jpg"), vis_custom)
-    if ref_inliers:
+    if drawn["opencv"][1]:
         vis_ref = draw_matches(
             img_a,
             img_b,
-            [kp.pt for kp in ref_kp_a],
-            [kp.pt for kp in ref_kp_b],
-            ref_matches,
-            ref_inliers[:80],
+            ref_pts_a,
+            ref_pts_b,
+            drawn["opencv"][0],
+            drawn["opencv"][1][:80],
         )
         cv2.imwrite(str(args.output_dir / "opencv_sift_matches.jpg"), vis_ref)
 
     summary = {
+        "custom_extrema_engine": args.extrema_engine,
+        "custom_orientation_engine": args.orientation_engine,
+        "custom_descriptor_engine": args.descriptor_engine,
+        "custom_workers": args.workers,
+        "custom_subpixel": args.subpixel,
+        "custom_tile_size": args.tile_size,
+        "cross_check": args.cross_check,
+        "matcher": args.matcher,
+        "custom_match_seconds": round(custom_match_seconds, 3),
+        "opencv_match_seconds": round(ref_match_seconds, 3),
+        "custom_sift_seconds": round(custom_seconds, 3),
         "custom_keypoints_A": len(custom_kp_a),
         "custom_keypoints_B": len(custom_kp_b),
         "custom_matches": len(custom_matches),
@@ -594,24 +3057,247 @@ def run_task(args: argparse.Namespace) -> None:
         "opencv_keypoints_B": len(ref_kp_b),
         "opencv_matches": len(ref_matches),
         "opencv_inliers": len(ref_inliers),
+        "ransac_sampler": args.ransac_sampler,
+        "ransac_adaptive": args.ransac_adaptive,
+        "custom_ransac_iterations": custom_ransac["iterations"],
+        "opencv_ransac_iterations": ref_ransac["iterations"],
+        "custom_descriptor": args.descriptor,
+        "homography_refinement": args.refine,
+        "custom_reprojection_rmse": custom_ransac["rmse"],
+        "opencv_reprojection_rmse": ref_ransac["rmse"],
         "custom_homography": custom_H.tolist() if custom_H is not None else None,
         "opencv_homography": ref_H.tolist() if ref_H is not None else None,
+        "guided": args.guided,
+        **guided_summary,
     }
+    if args.descriptor == "binary" and not args.tile_size:
+        summary.update(
+            descriptor_tradeoff(siftr, gray_a, gray_b, custom_kp_a, custom_kp_b, args)
+        )
+        print(
+            "[Task2] Binary vs SIFT descriptors: "
+            f"{summary['tradeoff_binary_descriptor_seconds']:.3f}s vs "
+            f"{summary['tradeoff_sift_descriptor_seconds']:.3f}s to describe, "
+            f"{summary['tradeoff_binary_match_seconds']:.3f}s vs "
+            f"{summary['tradeoff_sift_match_seconds']:.3f}s to match, "
+            f"{summary['tradeoff_binary_inliers']} vs {summary['tradeoff_sift_inliers']} inliers"
+        )
     summary_path = args.output_dir / "summary.txt"
     with summary_path.open("w", encoding="utf-8") as f:
         for key, value in summary.items():
             f.write(f"{key}: {value}\n")
 
+    profiler.write_json(args.output_dir / "stages.json")
+    slowest = profiler.records[profiler.slowest()]
+    print(
+        f"[Task2] Slowest stage: {slowest['stage']} ({slowest.get('pipeline')}) "
+        f"{slowest['seconds']:.3f}s"
+    )
+    if args.profile:
+        prof_path = profiler.dump_slowest(args.output_dir)
+        if prof_path is not None:
+            print(f"[Task2] cProfile stats of the slowest stage written to {prof_path}")
+
     print(f"[Task2] Artefacts written to {args.output_dir.resolve()}")
 
 
+# ---------------------------------------------------------------------------
+# Batch mode
+#
+# Features are extracted once per unique image in the parent process (so the
+# feature cache and the octave workers behave exactly as in single-pair mode),
+# then every pair's matching + RANSAC job is scheduled on a process pool whose
+# workers receive the feature table once through the pool initializer.
+
+
+_BATCH_FEATURES: Dict[str, Dict[str, object]] = {}
+_BATCH_ARGS: argparse.Namespace | None = None
+
+
+def collect_batch_pairs(args: argparse.Namespace) -> List[Tuple[Path, Path]]:
+    if args.batch_manifest:
+        base = args.batch_manifest.parent
+        pairs = []
+        with args.batch_manifest.open(newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if not row or row[0].strip().startswith("#"):
+                    continue
+                if len(row) < 2:
+                    raise ValueError(f"Manifest row needs two image paths: {row}")
+                a, b = (Path(value.strip()) for value in row[:2])
+                if (a.name, b.name) == ("image_a", "image_b"):
+                    continue
+                pairs.append((a if a.is_absolute() else base / a, b if b.is_absolute() else base / b))
+        return pairs
+
+    paths = sorted(args.batch_dir.glob(args.batch_pattern))
+    if args.batch_pairs == "all":
+        return [(a, b) for i, a in enumerate(paths) for b in paths[i + 1 :]]
+    return list(zip(paths, paths[1:]))
+
+
+def extract_batch_features(
+    path: Path,
+    siftr: SIFTFromScratch,
+    reference: cv2.SIFT,
+    args: argparse.Namespace,
+    cache: FeatureCache | None,
+) -> Dict[str, object]:
+    """Both pipelines' points/descriptors for one image, as picklable arrays."""
+    gray = to_grayscale_float(
+        load_image(path, args.resize_width, args.raw_shape, args.raw_dtype)
+    )
+    start = time.perf_counter()
+    custom_kp, custom_desc = extract_custom_features(siftr, path, gray, args, cache)
+    custom_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    ref_kp, ref_desc = extract_opencv_features(reference, path, gray, args, cache)
+    ref_seconds = time.perf_counter() - start
+    if ref_desc is None:
+        ref_desc = np.zeros((0, 128), dtype=np.float32)
+    return {
+        "custom_pts": keypoints_to_array(custom_kp),
+        # Keep the detector's dtype: binary descriptors must stay uint8 so the
+        # matchers and the guided pass use Hamming distances.
+        "custom_desc": np.asarray(custom_desc),
+        "custom_extract_seconds": custom_seconds,
+        "opencv_pts": np.array([kp.pt for kp in ref_kp], dtype=np.float32).reshape(-1, 2),
+        "opencv_desc": np.asarray(ref_desc, dtype=np.float32),
+        "opencv_extract_seconds": ref_seconds,
+    }
+
+
+def _init_batch_worker(features: Dict[str, Dict[str, object]], args: argparse.Namespace) -> None:
+    global _BATCH_FEATURES, _BATCH_ARGS
+    _BATCH_FEATURES = features
+    _BATCH_ARGS = args
+
+
+def _batch_pair_job(key_a: str, key_b: str) -> Dict[str, object]:
+    args = _BATCH_ARGS
+    feat_a = _BATCH_FEATURES[key_a]
+    feat_b = _BATCH_FEATURES[key_b]
+    row: Dict[str, object] = {"image_a": key_a, "image_b": key_b}
+    for pipeline, matcher in (("custom", match_custom), ("opencv", match_opencv)):
+        start = time.perf_counter()
+        matches = matcher(feat_a[f"{pipeline}_desc"], feat_b[f"{pipeline}_desc"], args)
+        match_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        H, inliers, stats = estimate_homography(
+            feat_a[f"{pipeline}_pts"], feat_b[f"{pipeline}_pts"], matches, args
+        )
+        ransac_seconds = time.perf_counter() - start
+        row.update(
+            {
+                f"{pipeline}_keypoints_A": len(feat_a[f"{pipeline}_pts"]),
+                f"{pipeline}_keypoints_B": len(feat_b[f"{pipeline}_pts"]),
+                f"{pipeline}_matches": len(matches),
+                f"{pipeline}_inliers": len(inliers),
+                f"{pipeline}_ransac_iterations": stats["iterations"],
+                f"{pipeline}_reprojection_rmse": stats["rmse"],
+                f"{pipeline}_extract_A_seconds": round(feat_a[f"{pipeline}_extract_seconds"], 3),
+                f"{pipeline}_extract_B_seconds": round(feat_b[f"{pipeline}_extract_seconds"], 3),
+                f"{pipeline}_match_seconds": round(match_seconds, 3),
+                f"{pipeline}_ransac_seconds": round(ransac_seconds, 3),
+                f"{pipeline}_homography": H.tolist() if H is not None else None,
+            }
+        )
+        if args.guided:
+            guided_matches = guided_inliers = guided_seconds = guided_H = fallback = None
+            if H is not None:
+                guided, guided_H, inliers, stats = apply_guided_matching(
+                    feat_a[f"{pipeline}_pts"],
+                    feat_b[f"{pipeline}_pts"],
+                    feat_a[f"{pipeline}_desc"],
+                    feat_b[f"{pipeline}_desc"],
+                    H,
+                    matches,
+                    inliers,
+                    args,
+                )
+                guided_matches, guided_inliers = len(guided), len(inliers)
+                guided_seconds = round(stats["guided_seconds"], 3)
+                fallback = stats["guided_fallback"]
+            row.update(
+                {
+                    f"{pipeline}_guided_matches": guided_matches,
+                    f"{pipeline}_guided_inliers": guided_inliers,
+                    f"{pipeline}_guided_seconds": guided_seconds,
+                    f"{pipeline}_guided_fallback": fallback,
+                    f"{pipeline}_guided_homography": (
+                        guided_H.tolist() if guided_H is not None else None
+                    ),
+                }
+            )
+    return row
+
+
+def run_batch(args: argparse.Namespace) -> List[Dict[str, object]]:
+    pairs = collect_batch_pairs(args)
+    if not pairs:
+        raise FileNotFoundError("Batch mode found no image pairs to process")
+    unique: Dict[str, Path] = {}
+    for a, b in pairs:
+        unique.setdefault(str(a), a)
+        unique.setdefault(str(b), b)
+    print(f"[Task2] Batch mode: {len(pairs)} pairs over {len(unique)} images")
+
+    siftr = build_sift(args)
+    reference = cv2.SIFT_create()
+    cache = open_feature_cache(args)
+    start = time.perf_counter()
+    features = {
+        key: extract_batch_features(path, siftr, reference, args, cache)
+        for key, path in unique.items()
+    }
+    print(f"[Task2] Batch feature extraction: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    jobs = [(str(a), str(b)) for a, b in pairs]
+    workers = max(1, min(args.batch_workers, len(jobs)))
+    if workers == 1:
+        _init_batch_worker(features, args)
+        rows = [_batch_pair_job(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_batch_worker,
+            initargs=(features, args),
+        ) as pool:
+            futures = [pool.submit(_batch_pair_job, *job) for job in jobs]
+            rows = [future.result() for future in futures]
+    print(
+        f"[Task2] Batch matching/RANSAC: {time.perf_counter() - start:.2f}s "
+        f"on {workers} worker(s)"
+    )
+    for row in rows:
+        print(
+            f"[Task2] {Path(row['image_a']).name} -> {Path(row['image_b']).name}: "
+            f"custom inliers={row['custom_inliers']}, opencv inliers={row['opencv_inliers']}"
+        )
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    with (args.output_dir / "batch_summary.json").open("w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2)
+    with (args.output_dir / "batch_summary.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {k: json.dumps(v) if isinstance(v, list) else v for k, v in row.items()}
+            )
+    print(f"[Task2] Batch summary written to {args.output_dir.resolve()}")
+    return rows
+
+
 def main(argv: Sequence[str]) -> int:
     args = parse_args(argv)
+    if args.batch_manifest or args.batch_dir:
+        run_batch(args)
+        return 0
     run_task(args)
     return 0
 
 
 if __name__ == "__main__":
     raise SystemExit(main(sys.argv[1:]))
-
-
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ASSIGNMENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ASSIGNMENT_DIR))
+
+IMAGES_DIR = ASSIGNMENT_DIR / "images"
+
+
+@pytest.fixture
+def blob_image() -> np.ndarray:
+    """Small float32 grayscale image of Gaussian blobs (clear DoG extrema)."""
+    rng = np.random.default_rng(0)
+    size = 128
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32)
+    image = np.zeros((size, size), dtype=np.float32)
+    for _ in range(25):
+        cx, cy = rng.uniform(12, size - 12, size=2)
+        sigma = rng.uniform(2.0, 5.0)
+        image += rng.uniform(0.3, 1.0) * np.exp(
+            -((xx - cx) ** 2 + (yy - cy) ** 2) / (2 * sigma**2)
+        )
+    return (image / image.max()).astype(np.float32)
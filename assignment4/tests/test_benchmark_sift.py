@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+
+import benchmark_sift
+
+
+def _write_blob_image(directory, blob_image):
+    path = directory / "blobs.png"
+    cv2.imwrite(str(path), np.round(blob_image * 255).astype(np.uint8))
+    return path
+
+
+def _engine_args(directory):
+    return benchmark_sift.parse_args(
+        ["--images", str(directory), "--pattern", "*.png", "--resize-width", "128"]
+    )
+
+
+def test_engine_benchmark_compares_nonempty_keypoints(tmp_path, blob_image):
+    _write_blob_image(tmp_path, blob_image)
+    rows = benchmark_sift.run_benchmark(_engine_args(tmp_path))
+    assert [row["engines"] for row in rows] == ["loop", "vectorized"]
+    assert all(row["keypoints"] > 0 for row in rows)
+    assert all(row["same_keypoints"] for row in rows)
+    assert benchmark_sift.engine_check_failures(rows) == []
+
+
+def test_engine_benchmark_fails_without_keypoints(tmp_path):
+    cv2.imwrite(str(tmp_path / "flat.png"), np.full((128, 128), 128, np.uint8))
+    assert benchmark_sift.main(
+        ["--images", str(tmp_path), "--pattern", "*.png", "--resize-width", "128"]
+    ) == 1
+
+
+def test_engine_check_flags_descriptor_mismatch():
+    rows = [
+        {"image": "a.png", "engines": "loop", "keypoints": 3,
+         "same_keypoints": True, "max_descriptor_diff": 0.0},
+        {"image": "a.png", "engines": "vectorized", "keypoints": 3,
+         "same_keypoints": True, "max_descriptor_diff": float("inf")},
+    ]
+    failures = benchmark_sift.engine_check_failures(rows)
+    assert len(failures) == 1 and "descriptors differ" in failures[0]
+
+
+def _suite_argv(images, pattern):
+    return ["--images", str(images), "--pattern", pattern, "--suite", "--widths", "480",
+            "--synthetic", "1", "--subpixel", "on"]
+
+
+def test_suite_meets_thresholds_on_bundled_images():
+    from conftest import IMAGES_DIR
+
+    rows = benchmark_sift.run_suite(benchmark_sift.parse_args(_suite_argv(IMAGES_DIR, "*.JPG")))
+    assert {row["pipeline"] for row in rows} == {"custom", "opencv"}
+    for row in rows:
+        assert row["min_keypoints"] >= benchmark_sift.SUITE_MIN_KEYPOINTS
+        assert row["solved"] == row["pairs"] > 0
+        assert row["median_corner_err_px"] <= benchmark_sift.SUITE_MAX_CORNER_ERROR
+        assert row["status"] == "ok"
+
+
+def test_suite_fails_when_detector_finds_nothing(tmp_path):
+    cv2.imwrite(str(tmp_path / "flat.png"), np.full((360, 480), 128, np.uint8))
+    argv = _suite_argv(tmp_path, "*.png")
+    rows = benchmark_sift.run_suite(benchmark_sift.parse_args(argv))
+    custom = next(row for row in rows if row["pipeline"] == "custom")
+    assert custom["min_keypoints"] == 0
+    assert "keypoints" in custom["status"]
+    assert benchmark_sift.main(argv) == 1
@@ -0,0 +1,225 @@
+import json
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+import task1_stitch
+from conftest import IMAGES_DIR
+
+
+@pytest.fixture(scope="module")
+def pan_paths(tmp_path_factory):
+    """Three overlapping crops of a bundled photo, in capture order."""
+    image = cv2.imread(str(IMAGES_DIR / "IMG_01.JPG"))
+    width = 1200
+    image = cv2.resize(
+        image, (width, image.shape[0] * width // image.shape[1]), interpolation=cv2.INTER_AREA
+    )
+    directory = tmp_path_factory.mktemp("pan")
+    paths = []
+    for idx in range(3):
+        path = directory / f"C_{idx}.png"
+        cv2.imwrite(str(path), image[:, idx * 300 : idx * 300 + 600])
+        paths.append(path)
+    return paths
+
+
+def test_iter_images_caps_prefetch(monkeypatch, pan_paths):
+    lock = threading.Lock()
+    state = {"loaded": 0, "consumed": 0, "resident": 0}
+    real_load = task1_stitch.load_image
+
+    def counting_load(*args, **kwargs):
+        image = real_load(*args, **kwargs)
+        with lock:
+            state["loaded"] += 1
+            state["resident"] = max(state["resident"], state["loaded"] - state["consumed"])
+        return image
+
+    monkeypatch.setattr(task1_stitch, "load_image", counting_load)
+    paths = pan_paths * 4
+    for frame in task1_stitch.iter_images(paths, workers=4, prefetch=2):
+        assert frame is not None
+        with lock:
+            state["consumed"] += 1
+    assert state["consumed"] == len(paths)
+    assert state["resident"] <= 2
+
+
+def test_composite_tiled_streams_frames_and_removes_accumulator(tmp_path, pan_paths):
+    images = task1_stitch.load_images(pan_paths)
+    registration = task1_stitch.register_images(images)
+    assert len(registration.component) == 3
+    seams = task1_stitch.estimate_seams(images, registration)
+    sizes = [(image.shape[1], image.shape[0]) for image in images]
+    frames = task1_stitch.iter_images(pan_paths, workers=2, prefetch=1)
+    panorama = task1_stitch.composite_tiled(
+        frames, sizes, registration, seams, tmp_path, tile_size=256
+    )
+    assert not (tmp_path / "accumulator.npy").exists()
+    assert panorama.shape[2] == 3 and panorama.max() > 0
+    np.testing.assert_array_equal(np.load(tmp_path / "panorama.npy"), panorama)
+
+
+def test_tiled_output_redecodes_registration_proxies(tmp_path, pan_paths):
+    tiled = tmp_path / "tiled"
+    # Registration uses OpenCV's RNG (RANSAC); seed it so both runs agree.
+    cv2.setRNGSeed(0)
+    task1_stitch.main(
+        ["--images", str(pan_paths[0].parent), "--pattern", "*.png", "--tiled-output",
+         str(tiled), "--tile-size", "256", "--load-workers", "4"]
+    )
+    images = task1_stitch.load_images(pan_paths)
+    cv2.setRNGSeed(0)
+    registration = task1_stitch.register_images(images)
+    seams = task1_stitch.estimate_seams(images, registration)
+    frames = [images[idx] for idx in registration.component]
+    expected = task1_stitch.composite_tiled(
+        frames, [(f.shape[1], f.shape[0]) for f in frames], registration, seams,
+        tmp_path / "in_memory", tile_size=256,
+    )
+    np.testing.assert_array_equal(np.load(tiled / "panorama.npy"), expected)
+
+
+def _sphere_view(texture, focal, yaw_deg, size):
+    """Pinhole view (centred principal point) of an equirectangular texture."""
+    width, height = size
+    xs, ys = np.meshgrid(
+        np.arange(width) - width / 2 + 0.5, np.arange(height) - height / 2 + 0.5
+    )
+    rays = np.stack([xs, ys, np.full_like(xs, focal)], axis=-1)
+    yaw = np.radians(yaw_deg)
+    rotation = np.array(
+        [[np.cos(yaw), 0, np.sin(yaw)], [0, 1, 0], [-np.sin(yaw), 0, np.cos(yaw)]]
+    )
+    rays = rays @ rotation.T
+    lon = np.arctan2(rays[..., 0], rays[..., 2])
+    lat = np.arctan2(rays[..., 1], np.hypot(rays[..., 0], rays[..., 2]))
+    map_x = (lon / (2 * np.pi)) % 1.0 * texture.shape[1]
+    map_y = (lat / (np.pi / 2) + 0.5) * texture.shape[0]
+    return cv2.remap(
+        texture, map_x.astype(np.float32), map_y.astype(np.float32), cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_WRAP,
+    )
+
+
+@pytest.fixture(scope="module")
+def sphere_texture():
+    """Equirectangular texture: 360 degrees of longitude, +-45 of latitude."""
+    height = 1000
+    photos = []
+    for name in ("IMG_01.JPG", "IMG_04.JPG"):
+        photo = cv2.imread(str(IMAGES_DIR / name))
+        photos.append(
+            cv2.resize(photo, (photo.shape[1] * height // photo.shape[0], height),
+                       interpolation=cv2.INTER_AREA)
+        )
+    return np.hstack(photos + [photo[:, ::-1] for photo in photos])
+
+
+def test_incremental_stitcher_recovers_known_focal(sphere_texture):
+    focal, step = 700.0, 12.0
+    views = [_sphere_view(sphere_texture, focal, step * idx, (1280, 960)) for idx in range(6)]
+    # The matcher's RANSAC draws from OpenCV's RNG; a single-pair estimate
+    # was far off for some of these seeds.
+    for seed in range(4):
+        cv2.setRNGSeed(seed)
+        stitcher = task1_stitch.IncrementalStitcher()
+        assert all(stitcher.add(view) for view in views)
+
+        assert stitcher.focal / stitcher.work_scale == pytest.approx(focal, rel=0.02)
+        for previous, current in zip(stitcher.rotations, stitcher.rotations[1:]):
+            relative = previous.T @ current
+            yaw = np.degrees(np.arctan2(relative[0, 2], relative[2, 2]))
+            assert yaw == pytest.approx(step, abs=0.3)
+    assert stitcher.panorama().shape[1] > 1280
+
+
+def test_registration_cache_hit_skips_registration(tmp_path, monkeypatch, pan_paths):
+    cache = tmp_path / "cache"
+    argv = ["--images", str(pan_paths[0].parent), "--pattern", "*.png",
+            "--registration-cache", str(cache)]
+    task1_stitch.main([*argv, "--output", str(tmp_path / "first.png")])
+    (entry,) = cache.glob("*.json")
+    pairs = json.loads(entry.read_text())["pairs"]
+    assert {(pair["src"], pair["dst"]) for pair in pairs} >= {(0, 1), (1, 2)}
+    assert all(pair["inliers"] > 0 and len(pair["H"]) == 3 for pair in pairs)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("registration ran despite a cache hit")
+
+    monkeypatch.setattr(task1_stitch, "_register", fail)
+    task1_stitch.main([*argv, "--output", str(tmp_path / "second.png")])
+    np.testing.assert_array_equal(
+        cv2.imread(str(tmp_path / "second.png")), cv2.imread(str(tmp_path / "first.png"))
+    )
+
+
+def test_parallel_reduced_decode_keeps_order_and_size():
+    paths = [IMAGES_DIR / "IMG_01.JPG", IMAGES_DIR / "IMG_04.JPG", IMAGES_DIR / "IMG_01.JPG"]
+    # 4284 px on the short side: a quarter-size decode is still 600 px wide.
+    assert task1_stitch.reduced_decode_flag(paths[0], 600) == cv2.IMREAD_REDUCED_COLOR_4
+    assert task1_stitch.reduced_decode_flag(paths[0], 2000) == cv2.IMREAD_REDUCED_COLOR_2
+    assert task1_stitch.reduced_decode_flag(paths[0], 0) == cv2.IMREAD_COLOR
+    frames = task1_stitch.load_images(paths, 600, workers=2, reduced_decode=True)
+    reference = task1_stitch.load_images(paths, 600)
+    assert [f.shape for f in frames] == [r.shape for r in reference]
+    assert frames[0].shape[1] == 600
+    np.testing.assert_array_equal(frames[0], frames[2])
+    assert not np.array_equal(frames[0], frames[1])
+    for frame, full in zip(frames, reference):
+        assert np.abs(frame.astype(np.int16) - full).mean() < 2.0
+
+
+def test_full_res_compose_from_proxies(tmp_path, sphere_texture):
+    # The bundled JPEGs store 5712x4284 pixels with an EXIF rotation.
+    proxy = task1_stitch.load_image(IMAGES_DIR / "IMG_01.JPG", 600, reduced_decode=True)
+    size = task1_stitch.decoded_size(IMAGES_DIR / "IMG_01.JPG", (proxy.shape[1], proxy.shape[0]))
+    assert size == (4284, 5712)
+
+    frames = tmp_path / "frames"
+    frames.mkdir()
+    for idx in range(3):
+        view = _sphere_view(sphere_texture, 700.0, 12.0 * idx, (1280, 960))
+        cv2.imwrite(str(frames / f"V_{idx}.png"), view)
+    shapes = {}
+    for name, extra in (
+        ("proxy", ["--resize-max-width", "640"]),
+        ("full", ["--resize-max-width", "640", "--full-res-compose"]),
+        ("native", ["--resize-max-width", "0"]),
+    ):
+        cv2.setRNGSeed(0)
+        output = tmp_path / f"{name}.png"
+        task1_stitch.main(["--images", str(frames), "--pattern", "*.png", "--output",
+                           str(output), *extra])
+        shapes[name] = np.array(cv2.imread(str(output)).shape[:2])
+    # Registered on half-size proxies, composed at the native size.
+    assert np.all(np.abs(shapes["full"] - shapes["native"]) <= 4)
+    assert np.all(np.abs(shapes["full"] - 2 * shapes["proxy"]) <= 4)
+
+
+def test_sequential_match_graph(sphere_texture):
+    def pairs(mask):
+        return {(int(i), int(j)) for i, j in zip(*np.nonzero(mask))}
+
+    window = {(0, 1), (0, 2), (1, 2), (1, 3), (2, 3), (2, 4), (3, 4)}
+    assert pairs(task1_stitch.sequential_match_mask(5, 2)) == window
+    closed = pairs(task1_stitch.sequential_match_mask(5, 2, loop_closure=True))
+    assert closed == window | {(0, 3), (0, 4), (1, 4)}
+
+    views = [_sphere_view(sphere_texture, 700.0, 12.0 * idx, (960, 720)) for idx in range(4)]
+    cv2.setRNGSeed(0)
+    registration, stats = task1_stitch.register_images_sequential(
+        views, neighbours=1, compare_full=True
+    )
+    assert (stats["pairs"], stats["full_pairs"]) == (3, 6)
+    assert registration.component == [0, 1, 2, 3]
+    matched = {(pair["src"], pair["dst"]) for pair in registration.pairs}
+    assert matched == {(0, 1), (1, 2), (2, 3)}
+    rotations = [camera.R for camera in registration.cameras]
+    for previous, current in zip(rotations, rotations[1:]):
+        relative = previous.T @ current
+        yaw = np.degrees(np.arctan2(relative[0, 2], relative[2, 2]))
+        assert yaw == pytest.approx(12.0, abs=0.5)
@@ -0,0 +1,467 @@
+import ast
+import random
+import tracemalloc
+import warnings
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import IMAGES_DIR
+from task2_sift import (
+    FeatureCache,
+    Keypoint,
+    KeypointSet,
+    KDForestIndex,
+    Match,
+    SIFTFromScratch,
+    StageProfiler,
+    _batch_pair_job,
+    _project,
+    _init_batch_worker,
+    build_sift,
+    compute_homography,
+    extract_batch_features,
+    extract_custom_features,
+    guided_match_descriptors,
+    load_image,
+    match_binary_descriptors,
+    match_descriptors,
+    match_descriptors_indexed,
+    open_feature_cache,
+    parse_args,
+    ransac_homography,
+    run_batch,
+    run_task,
+    to_grayscale_float,
+)
+
+
+def test_edge_test_keeps_blob_responses():
+    sift = SIFTFromScratch()
+    # A blob has tr^2/det close to 4 and must survive; the threshold itself
+    # (r + 1)^2 / r is the boundary and is rejected.
+    assert not sift._edge_rejected(2.0, 1.0)
+    r = sift.edge_threshold
+    assert sift._edge_rejected(r + 1.0, r)
+    assert sift._edge_rejected(1.0, 0.0)
+
+
+def test_detector_finds_keypoints(blob_image):
+    keypoints, descriptors = SIFTFromScratch().detect_and_compute(blob_image)
+    assert len(keypoints) > 0
+    assert descriptors.shape == (len(keypoints), 128)
+
+
+def test_extrema_engines_agree_on_nonempty_set(blob_image):
+    results = {}
+    for engine in ("loop", "vectorized"):
+        keypoints, _ = SIFTFromScratch(extrema_engine=engine).detect_and_compute(blob_image)
+        results[engine] = keypoints
+    assert len(results["vectorized"]) > 0
+    assert results["loop"] == results["vectorized"]
+
+
+def test_descriptor_engines_agree_on_nonempty_set(blob_image):
+    results = {}
+    for engine in ("loop", "vectorized"):
+        sift = SIFTFromScratch(descriptor_engine=engine)
+        results[engine] = sift.detect_and_compute(blob_image)
+    (kps_loop, desc_loop), (kps_vec, desc_vec) = results["loop"], results["vectorized"]
+    assert len(kps_vec) > 0
+    assert kps_loop == kps_vec
+    assert desc_loop.shape == desc_vec.shape == (len(kps_vec), 128)
+    np.testing.assert_allclose(desc_loop, desc_vec, atol=1e-5)
+
+
+def test_stage_profiler_traces_memory_only_on_request():
+    assert not tracemalloc.is_tracing()
+    profiler = StageProfiler()
+    assert not tracemalloc.is_tracing()
+    with profiler.stage("plain"):
+        np.ones(1000)
+    profiler.close()
+    assert profiler.records[0]["peak_bytes"] is None
+    assert profiler.records[0]["seconds"] >= 0
+
+    for kwargs in ({"trace_memory": True}, {"profile": True}):
+        profiler = StageProfiler(**kwargs)
+        assert tracemalloc.is_tracing()
+        with profiler.stage("traced"):
+            np.ones(100_000)
+        profiler.close()
+        assert not tracemalloc.is_tracing()
+        assert profiler.records[0]["peak_bytes"] >= 800_000
+
+
+def _batch_args(tmp_path, *extra):
+    return parse_args(
+        ["--batch-dir", str(IMAGES_DIR), "--resize-width", "480", "--batch-workers", "1",
+         "--descriptor", "binary", "--output-dir", str(tmp_path), *extra]
+    )
+
+
+def test_batch_features_keep_binary_descriptors(tmp_path):
+    args = _batch_args(tmp_path)
+    siftr, reference = build_sift(args), cv2.SIFT_create()
+    paths = sorted(IMAGES_DIR.glob("*.JPG"))
+    features = {
+        str(path): extract_batch_features(path, siftr, reference, args, None) for path in paths
+    }
+    desc_a, desc_b = (features[str(path)]["custom_desc"] for path in paths)
+    assert desc_a.dtype == np.uint8 and len(desc_a) > 0
+    assert features[str(paths[0])]["opencv_desc"].dtype == np.float32
+
+    _init_batch_worker(features, args)
+    row = _batch_pair_job(str(paths[0]), str(paths[1]))
+    expected = match_binary_descriptors(desc_a, desc_b, args.ratio_test)
+    assert row["custom_matches"] == len(expected) > 0
+
+
+def test_batch_guided_pass_uses_hamming_on_binary_descriptors(tmp_path):
+    args = _batch_args(tmp_path, "--guided")
+    siftr, reference = build_sift(args), cv2.SIFT_create()
+    paths = sorted(IMAGES_DIR.glob("*.JPG"))
+    features = {
+        str(path): extract_batch_features(path, siftr, reference, args, None) for path in paths
+    }
+    feat_a, feat_b = (features[str(path)] for path in paths)
+    _init_batch_worker(features, args)
+    row = _batch_pair_job(str(paths[0]), str(paths[1]))
+    assert row["custom_homography"] is not None
+
+    guided = guided_match_descriptors(
+        feat_a["custom_pts"], feat_b["custom_pts"], feat_a["custom_desc"],
+        feat_b["custom_desc"], np.array(row["custom_homography"]),
+        args.guided_radius, args.guided_ratio,
+    )
+    assert guided
+    # Hamming distances are whole bit counts bounded by the descriptor length.
+    bits = 8 * feat_a["custom_desc"].shape[1]
+    assert all(m.distance == int(m.distance) and 0 <= m.distance <= bits for m in guided)
+    if not row["custom_guided_fallback"]:
+        assert row["custom_guided_matches"] == len(guided)
+
+
+def test_feature_cache_key_tracks_raw_layout(tmp_path, blob_image, capsys):
+    raw_path = tmp_path / "blobs.raw"
+    np.round(blob_image * 255).astype(np.uint8).tofile(raw_path)
+    results = []
+    for shape in (["128", "128"], ["64", "256"], ["128", "128"]):
+        args = parse_args(
+            ["--image-a", str(raw_path), "--image-b", str(raw_path), "--raw-shape", *shape,
+             "--feature-cache", str(tmp_path / "cache"), "--output-dir", str(tmp_path)]
+        )
+        gray = to_grayscale_float(load_image(raw_path, None, args.raw_shape, args.raw_dtype))
+        results.append(
+            extract_custom_features(build_sift(args), raw_path, gray, args,
+                                    open_feature_cache(args))
+        )
+    hits = capsys.readouterr().out.count("Feature cache hit")
+    # Same bytes read with another shape is a miss; the original shape hits.
+    assert hits == 1
+    assert len(results[0][0]) > 0
+    assert results[0][0] == results[2][0]
+    assert results[0][0] != results[1][0]
+
+
+H_TRUE = np.array([[0.9, 0.05, 30.0], [-0.04, 1.05, -12.0], [2e-4, -1e-4, 1.0]])
+GRID = np.stack(np.meshgrid(np.linspace(0, 640, 9), np.linspace(0, 480, 7)), -1).reshape(-1, 2)
+
+
+def _synthetic_matches(seed, count=200, outliers=0.3, noise=1.0):
+    """Noisy correspondences under ``H_TRUE``; outliers get the worst distances."""
+    rng = np.random.default_rng(seed)
+    pts_a = rng.uniform([0, 0], [640, 480], size=(count, 2))
+    pts_b = _project(H_TRUE, pts_a) + rng.normal(0.0, noise, size=(count, 2))
+    bad = rng.random(count) < outliers
+    pts_b[bad] = rng.uniform([0, 0], [640, 480], size=(int(bad.sum()), 2))
+    matches = [Match(i, i, float(rng.random() + bad[i])) for i in range(count)]
+    return pts_a, pts_b, matches
+
+
+def _true_transfer_error(H):
+    residuals = _project(H, GRID) - _project(H_TRUE, GRID)
+    return float(np.sqrt(np.mean(np.sum(residuals**2, axis=1))))
+
+
+def test_refinement_lowers_true_transfer_error():
+    for seed in range(3):
+        pts_a, pts_b, matches = _synthetic_matches(seed)
+        errors, rmse = {}, {}
+        for refine in ("none", "lsq", "lm"):
+            stats = {}
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                H, _ = ransac_homography(
+                    pts_a, pts_b, matches, 500, 3.0, seed=0, refine=refine, stats=stats
+                )
+            errors[refine] = _true_transfer_error(H)
+            rmse[refine] = stats["rmse"]
+        assert errors["lsq"] < 0.5 * errors["none"]
+        assert errors["lm"] < 0.5 * errors["none"]
+        # LM minimises exactly the inlier reprojection error that lsq only approximates.
+        assert rmse["lm"] <= rmse["lsq"] + 1e-9
+
+
+def test_feature_cache_eviction_keeps_new_entry(tmp_path):
+    cache = FeatureCache(tmp_path, max_bytes=1)
+    keypoints, descriptors = np.zeros((3, 4), np.float32), np.ones((3, 128), np.float32)
+    # An entry deleted by another process mid-scan shows up as a dangling link.
+    (tmp_path / "zz").mkdir()
+    (tmp_path / "zz" / "gone").symlink_to(tmp_path / "missing")
+    cache.put("aa-old", keypoints, descriptors)
+    cache.put("bb-new", keypoints, descriptors)
+    # Both entries exceed the budget; only the one just written survives.
+    assert cache.get("aa-old") is None
+    cached = cache.get("bb-new")
+    assert cached is not None
+    np.testing.assert_array_equal(cached[1], descriptors)
+
+
+def test_batch_rows_match_single_pair_runs(tmp_path, capsys):
+    image = cv2.imread(str(IMAGES_DIR / "IMG_01.JPG"))
+    image = cv2.resize(image, (640, image.shape[0] * 640 // image.shape[1]))
+    paths = [tmp_path / "left.png", tmp_path / "right.png"]
+    cv2.imwrite(str(paths[0]), image[:, :400])
+    cv2.imwrite(str(paths[1]), image[:, 240:])
+    manifest = tmp_path / "pairs.csv"
+    manifest.write_text(f"{paths[0]},{paths[1]}\n{paths[1]},{paths[0]}\n", encoding="utf-8")
+    common = ["--feature-cache", str(tmp_path / "cache")]
+    # Cold cache, pair jobs on a process pool.
+    rows = run_batch(parse_args(
+        ["--batch-manifest", str(manifest), "--batch-workers", "2",
+         "--output-dir", str(tmp_path / "batch"), *common]
+    ))
+    assert capsys.readouterr().out.count("Feature cache hit") == 0
+    assert len(rows) == 2
+    for idx, row in enumerate(rows):
+        out = tmp_path / f"pair{idx}"
+        run_task(parse_args(
+            ["--image-a", row["image_a"], "--image-b", row["image_b"],
+             "--output-dir", str(out), *common]
+        ))
+        summary = dict(
+            line.split(": ", 1) for line in (out / "summary.txt").read_text().splitlines()
+        )
+        for pipeline in ("custom", "opencv"):
+            for field in ("keypoints_A", "keypoints_B", "matches", "inliers"):
+                assert row[f"{pipeline}_{field}"] == int(summary[f"{pipeline}_{field}"])
+            np.testing.assert_allclose(
+                row[f"{pipeline}_homography"],
+                ast.literal_eval(summary[f"{pipeline}_homography"]),
+            )
+        assert row["custom_inliers"] > 0
+    # The single-pair runs were served from the cache the batch filled.
+    assert capsys.readouterr().out.count("Feature cache hit") == 8
+
+
+def _octave_features(keypoints, descriptors, octave):
+    keep = np.nonzero(keypoints.octave == octave)[0]
+    keep = keep[np.lexsort((keypoints.y[keep], keypoints.x[keep]))]
+    points = np.stack([keypoints.x[keep], keypoints.y[keep], keypoints.sigma[keep]], axis=1)
+    return points, descriptors[keep]
+
+
+def test_tiled_detection_matches_whole_image():
+    gray = to_grayscale_float(load_image(IMAGES_DIR / "IMG_01.JPG", 640, None, None))
+    # With two octaves the default margin at 224 px tiles covers every octave;
+    # with four it covers octaves 0-1 only, which must still match exactly.
+    for octaves, tile_size, exact in ((2, 224, 2), (4, 256, 2)):
+        sift = SIFTFromScratch(num_octaves=octaves)
+        assert 2 * sift.tile_margin(exact - 1) <= tile_size
+        whole = sift.detect_and_compute(gray)
+        tiled = sift.detect_and_compute_tiled(gray, tile_size)
+        for octave in range(exact):
+            (pts_whole, desc_whole), (pts_tiled, desc_tiled) = (
+                _octave_features(*result, octave) for result in (whole, tiled)
+            )
+            assert len(pts_whole) > 0
+            np.testing.assert_allclose(pts_tiled, pts_whole)
+            np.testing.assert_allclose(desc_tiled, desc_whole, atol=1e-5)
+
+
+def test_tile_margin_is_bounded_by_tile_size(tmp_path):
+    argv = ["--image-a", "a.png", "--image-b", "b.png", "--output-dir", str(tmp_path)]
+    assert parse_args([*argv, "--tile-size", "256", "--tile-margin", "128"]).tile_margin == 128
+    with pytest.raises(SystemExit):
+        parse_args([*argv, "--tile-size", "256", "--tile-margin", "200"])
+
+
+def test_orientation_engines_agree(blob_image):
+    results = {}
+    for engine in ("loop", "batched"):
+        sift = SIFTFromScratch(orientation_engine=engine)
+        results[engine] = sift.detect_and_compute(blob_image)
+    (kps_loop, desc_loop), (kps_batched, desc_batched) = results["loop"], results["batched"]
+    assert len(kps_batched) > 0
+    # Same keypoints with the same (peak >= 0.8) orientations, hence descriptors.
+    assert kps_loop == kps_batched
+    np.testing.assert_allclose(desc_batched, desc_loop, atol=1e-5)
+
+
+def test_octave_workers_match_serial_order(blob_image):
+    kps_serial, desc_serial = SIFTFromScratch().detect_and_compute(blob_image)
+    kps_parallel, desc_parallel = SIFTFromScratch(workers=2).detect_and_compute(blob_image)
+    assert len(kps_serial) > 0
+    # Octaves are merged in order, so keypoint indices are stable.
+    assert kps_parallel == kps_serial
+    np.testing.assert_array_equal(desc_parallel, desc_serial)
+
+
+def _noisy_descriptor_pair(seed, count=300, kept=200, noise=0.05):
+    """``desc_b`` holds noisy copies of ``kept`` rows of ``desc_a`` plus distractors."""
+    rng = np.random.default_rng(seed)
+    desc_a = rng.random((count, 128), dtype=np.float32)
+    order = rng.permutation(count)[:kept]
+    copies = desc_a[order] + rng.normal(0, noise, (kept, 128)).astype(np.float32)
+    desc_b = np.vstack([copies, rng.random((count - kept, 128), dtype=np.float32)])
+    return desc_a, desc_b, order
+
+
+def test_chunked_matcher_matches_row_loop():
+    desc_a, desc_b, _ = _noisy_descriptor_pair(0)
+    expected = []
+    for idx_a, vector in enumerate(desc_a):
+        distances = np.linalg.norm(desc_b - vector, axis=1)
+        best_idx = int(np.argmin(distances))
+        best = distances[best_idx]
+        distances[best_idx] = np.inf
+        if best < 0.75 * np.min(distances):
+            expected.append((idx_a, best_idx, float(best)))
+    assert len(expected) > 100
+    for chunk_size in (1, 7, 1024):
+        matches = match_descriptors(desc_a, desc_b, 0.75, chunk_size=chunk_size)
+        assert [(m.idx_a, m.idx_b) for m in matches] == [(a, b) for a, b, _ in expected]
+        np.testing.assert_allclose(
+            [m.distance for m in matches], [d for _, _, d in expected], rtol=1e-5
+        )
+
+    nearest_a = np.argmin(
+        np.linalg.norm(desc_a[:, None, :] - desc_b[None, :, :], axis=2), axis=0
+    )
+    mutual = match_descriptors(desc_a, desc_b, 0.75, chunk_size=7, cross_check=True)
+    assert [(m.idx_a, m.idx_b) for m in mutual] == [
+        (a, b) for a, b, _ in expected if nearest_a[b] == a
+    ]
+
+
+def test_kd_forest_recall_against_exact_matcher():
+    desc_a, desc_b, _ = _noisy_descriptor_pair(1, count=3000, kept=3000, noise=0.15)
+    index = KDForestIndex(desc_b)
+    # Each query re-ranks at most n_trees * leaf_size candidates, not all 3000.
+    assert index._leaf_members(desc_a[:1]).shape[1] <= 8 * 32
+    exact = {(m.idx_a, m.idx_b) for m in match_descriptors(desc_a, desc_b, 0.8)}
+    approx = {(m.idx_a, m.idx_b) for m in match_descriptors_indexed(desc_a, index, 0.8)}
+    assert len(exact) > 2500
+    assert len(approx & exact) >= 0.95 * len(exact)
+    assert len(approx - exact) <= 0.01 * len(exact)
+
+
+def test_vectorized_ransac_matches_sequential_loop():
+    pts_a, pts_b, matches = _synthetic_matches(3, count=120)
+    rng = random.Random(42)
+    best_H, best_inliers = None, []
+    for _ in range(300):
+        sample = rng.sample(range(len(matches)), 4)
+        H = compute_homography([(pts_a[matches[i].idx_a], pts_b[matches[i].idx_b]) for i in sample])
+        inliers = []
+        for idx, match in enumerate(matches):
+            projected = H @ np.append(pts_a[match.idx_a], 1.0)
+            if np.linalg.norm(projected[:2] / projected[2] - pts_b[match.idx_b]) < 3.0:
+                inliers.append(idx)
+        if len(inliers) > len(best_inliers):
+            best_H, best_inliers = H, inliers
+
+    H, inliers = ransac_homography(pts_a, pts_b, matches, 300, 3.0, seed=42)
+    assert len(inliers) > 60
+    assert inliers == best_inliers
+    np.testing.assert_allclose(H, best_H, rtol=1e-6, atol=1e-9)
+
+
+def test_adaptive_and_prosac_ransac_stop_early():
+    for seed in range(3):
+        pts_a, pts_b, matches = _synthetic_matches(seed)
+        used = {}
+        for sampler in ("uniform", "prosac"):
+            stats = {}
+            H, inliers = ransac_homography(
+                pts_a, pts_b, matches, 2000, 3.0, adaptive=True, sampler=sampler, stats=stats
+            )
+            used[sampler] = stats["iterations"]
+            assert 0 < used[sampler] < 100
+            assert len(inliers) > 100
+            assert _true_transfer_error(H) < 3.0
+        # Outliers carry the worst distances, so PROSAC reaches a clean sample first.
+        assert used["prosac"] <= used["uniform"]
+
+
+def test_keypoint_set_indexing_and_adapters():
+    points = [Keypoint(10.5, 20.25, 1, 2, 3.2, 0.5), Keypoint(1.0, 2.0, 0, 1, 1.6, 1.5)]
+    keypoints = KeypointSet.from_keypoints(points)
+    assert len(keypoints) == 2
+    assert keypoints[0] == points[0] and list(keypoints) == points
+    assert keypoints == points
+    assert keypoints[1:] == points[1:]
+    assert keypoints[np.array([False, True])] == points[1:]
+    assert KeypointSet.concatenate([keypoints[:1], keypoints[1:]]) == keypoints
+    np.testing.assert_array_equal(keypoints.to_array(), [[10.5, 20.25], [1.0, 2.0]])
+    first = keypoints.to_cv2()[0]
+    assert first.pt == (10.5, 20.25) and first.octave == 1
+    assert first.size == pytest.approx(6.4) and first.angle == pytest.approx(np.degrees(0.5))
+
+
+def test_reused_pyramid_buffers_match_fresh_pyramids(blob_image):
+    fresh = SIFTFromScratch(reuse_buffers=False)
+    reused = SIFTFromScratch(reuse_buffers=True)
+    gauss_fresh, dog_fresh = fresh._build_pyramids(blob_image)
+    gauss_reused, dog_reused = reused._build_pyramids(blob_image)
+    for fresh_levels, reused_levels in zip(gauss_fresh + dog_fresh, gauss_reused + dog_reused):
+        for level_fresh, level_reused in zip(fresh_levels, reused_levels):
+            assert level_reused.dtype == np.float32
+            np.testing.assert_allclose(level_reused, level_fresh, atol=1e-6)
+
+    expected = fresh.detect_and_compute(blob_image)
+    buffers = reused._buffers
+    reused.detect_and_compute(blob_image[::-1].copy())
+    kps, desc = reused.detect_and_compute(blob_image)
+    # Same-size frames are built into the same stacks, overwriting the last one.
+    assert reused._buffers is buffers
+    assert kps == expected[0]
+    np.testing.assert_allclose(desc, expected[1], atol=1e-5)
+
+
+def _shifted_blobs(shift, size=160):
+    """Gaussian blobs rendered analytically with their centres moved by ``shift``."""
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float64)
+    image = np.zeros((size, size))
+    for _ in range(30):
+        cx, cy = rng.uniform(16, size - 16, size=2) + shift
+        sigma = rng.uniform(2.0, 5.0)
+        image += rng.uniform(0.3, 1.0) * np.exp(
+            -((xx - cx) ** 2 + (yy - cy) ** 2) / (2 * sigma**2)
+        )
+    return (image / image.max()).astype(np.float32)
+
+
+def test_subpixel_refinement_recovers_fractional_shift():
+    shift = np.array([0.37, -0.29])
+    errors = {}
+    for subpixel in (False, True):
+        sift = SIFTFromScratch(subpixel=subpixel)
+        base, _ = sift.detect_and_compute(_shifted_blobs(np.zeros(2)))
+        moved, _ = sift.detect_and_compute(_shifted_blobs(shift))
+        pts_base = np.stack([base.x, base.y], axis=1)
+        pts_moved = np.stack([moved.x, moved.y], axis=1)
+        step = 2.0 ** base.octave[:, None]
+        on_grid = np.all(pts_base / step == np.round(pts_base / step), axis=1)
+        # Refined coordinates leave the octave's sample grid.
+        assert on_grid.mean() < 0.1 if subpixel else on_grid.all()
+        residual = np.linalg.norm(pts_base[:, None] + shift - pts_moved[None], axis=2)
+        nearest = residual.argmin(axis=1)
+        paired = (residual.min(axis=1) < 1.5) & (base.octave == moved.octave[nearest])
+        assert paired.sum() > 50
+        offsets = pts_moved[nearest[paired]] - pts_base[paired]
+        errors[subpixel] = float(np.median(np.linalg.norm(offsets - shift, axis=1)))
+    assert errors[True] < 0.1 < errors[False]